@@ -0,0 +1,305 @@
+# app/catalogo.py
+"""
+Catálogo público en memoria: código → emprendedor con sus servicios y su
+patrón semanal de horario, para que las lecturas públicas por código
+(ficha, servicios, horarios) no toquen la base.
+
+- Se precarga al arrancar (precargar: tres consultas para todo el
+  catálogo, hasta MAXIMO entradas) y lo que falte se carga al primer
+  pedido (tres consultas por emprendedor). Un código inexistente no se
+  guarda: sigue yendo a la base, así no se llena de basura.
+- Cada entrada es inmutable y lleva la versión del catálogo con que se
+  armó. Los cambios de perfil, servicios u horarios (cualquier camino ORM,
+  vía before_flush; los masivos llaman a tocado()) rearman al commit sólo
+  las entradas de esos emprendedores, en una sesión aparte; los demás
+  workers las descartan al recibir el aviso (app/invalidaciones.py).
+- Memoria acotada: a lo sumo MAXIMO entradas y MAXIMO_MB megabytes
+  aproximados (el logo puede ser un DataURL); se desaloja por entrada, la
+  usada hace más tiempo primero.
+- Las excepciones de horario por fecha no están: cambian por día y se
+  siguen consultando (compilar_agenda). Igual sus cambios, los de series y
+  los de recursos rearman la entrada: así `version` cambia con todo lo que
+  mueve la disponibilidad salvo los turnos y las retenciones, y el ETag
+  del bundle público sale de ahí sin recalcularla.
+"""
+from __future__ import annotations
+import itertools
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import invalidaciones
+from app.models import Emprendedor, Horario, HorarioExcepcion, Recurso, Servicio, TurnoSerie, TurnoSerieExcepcion
+
+log = logging.getLogger("turnera.catalogo")
+
+MAXIMO = int(os.getenv("CATALOGO_MAX", "10000"))
+MAXIMO_MB = float(os.getenv("CATALOGO_MAX_MB", "64"))
+_CLAVE = "catalogo_tocados"
+
+Bloque = Tuple[int, int]   # como en crud/horarios.py
+
+
+@dataclass(frozen=True)
+class ServicioCat:
+    """Lo que las rutas públicas leen de un Servicio (mismos nombres de atributo)."""
+    id: int
+    emprendedor_id: int
+    nombre: str
+    duracion_min: int
+    precio: float
+    activo: bool
+    capacidad: int
+    color: Optional[str] = None
+
+    def a_publico(self) -> dict:
+        """Formato de GET /publico/servicios/{codigo}."""
+        return {
+            "id": self.id,
+            "nombre": self.nombre,
+            "descripcion": None,
+            "duracion_min": self.duracion_min,
+            "precio": self.precio,
+            "activo": self.activo,
+            "capacidad": self.capacidad,
+            "emprendedor_id": self.emprendedor_id,
+        }
+
+
+@dataclass(frozen=True)
+class EntradaCatalogo:
+    id: int
+    codigo: str
+    version: int
+    perfil: dict                       # columnas públicas del Emprendedor
+    zona_horaria: Optional[str]
+    servicios: Tuple[ServicioCat, ...]   # todos, activos o no (por id)
+    horarios: Tuple[dict, ...]         # filas de Horario: id, dia_semana, inicio, fin (minutos)
+    tamano: int                        # bytes aproximados, para el tope de memoria
+
+    def servicio(self, servicio_id: int) -> Optional[ServicioCat]:
+        return next((s for s in self.servicios if s.id == servicio_id), None)
+
+    def activos(self) -> List[ServicioCat]:
+        return [s for s in self.servicios if s.activo]
+
+    def semanal(self) -> Dict[int, List[Bloque]]:
+        """Patrón semanal 0=Dom..6=Sáb → bloques ordenados (como AgendaCompilada.semanal)."""
+        out: Dict[int, List[Bloque]] = {}
+        for h in self.horarios:
+            out.setdefault(h["dia_semana"], []).append((h["inicio"], h["fin"]))
+        for bs in out.values():
+            bs.sort()
+        return out
+
+
+# columnas del perfil: las de EmprendedorOut (GET /emprendedores/by-codigo) y la ficha pública
+_PERFIL = ("id", "usuario_id", "nombre", "descripcion", "codigo_cliente", "cuit", "telefono", "direccion",
+           "rubro", "redes", "web", "email_contacto", "logo_url", "zona_horaria", "created_at")
+
+
+_SERVICIO = (Servicio.id, Servicio.emprendedor_id, Servicio.nombre, Servicio.duracion_min, Servicio.precio,
+             Servicio.activo, Servicio.capacidad, Servicio.color)
+_HORARIO = (Horario.id, Horario.emprendedor_id, Horario.dia_semana, Horario.inicio, Horario.fin)
+
+
+def _minutos(t) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _armar(e, servicios: Iterable, horarios: Iterable, version: int) -> EntradaCatalogo:
+    """Entrada a partir de filas (sólo columnas) de Emprendedor, Servicio y Horario."""
+    perfil = {k: getattr(e, k, None) for k in _PERFIL}
+    servs = tuple(
+        ServicioCat(id=s.id, emprendedor_id=s.emprendedor_id, nombre=s.nombre, duracion_min=int(s.duracion_min),
+                    precio=float(s.precio or 0.0), activo=bool(s.activo), capacidad=int(s.capacidad or 1),
+                    color=s.color)
+        for s in sorted(servicios, key=lambda s: s.id)
+    )
+    hs = tuple(
+        {"id": h.id, "dia_semana": int(h.dia_semana), "inicio": _minutos(h.inicio), "fin": _minutos(h.fin)}
+        for h in sorted(horarios, key=lambda h: h.id)
+    )
+    tamano = 512 + sum(len(v) for v in perfil.values() if isinstance(v, str)) \
+        + sum(128 + len(s.nombre) for s in servs) + 96 * len(hs)
+    return EntradaCatalogo(id=e.id, codigo=e.codigo_cliente, version=version, perfil=perfil,
+                           zona_horaria=e.zona_horaria, servicios=servs, horarios=hs, tamano=tamano)
+
+
+# ===== Store =====
+class Catalogo:
+    def __init__(self, maximo: int = MAXIMO, maximo_mb: float = MAXIMO_MB):
+        self.maximo = maximo
+        self.maximo_bytes = int(maximo_mb * 1024 * 1024)
+        self._por_codigo: "OrderedDict[str, EntradaCatalogo]" = OrderedDict()
+        self._codigo_de: Dict[int, str] = {}
+        self._bytes = 0
+        self._versiones = itertools.count(1)
+        # emprendedor → versión de su último cambio: una carga que empezó antes no se guarda
+        self._cambio: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    # --- lectura ---
+    def por_codigo(self, db: Session, codigo: str) -> Optional[EntradaCatalogo]:
+        with self._lock:
+            e = self._por_codigo.get(codigo)
+            if e is not None:
+                self._por_codigo.move_to_end(codigo)
+                self.aciertos += 1
+                return e
+            self.fallos += 1
+        return self._cargar(db, Emprendedor.codigo_cliente == codigo)
+
+    def por_id(self, db: Session, emp_id: int) -> Optional[EntradaCatalogo]:
+        with self._lock:
+            codigo = self._codigo_de.get(emp_id)
+            e = self._por_codigo.get(codigo) if codigo else None
+            if e is not None:
+                self._por_codigo.move_to_end(codigo)
+                self.aciertos += 1
+                return e
+            self.fallos += 1
+        return self._cargar(db, Emprendedor.id == emp_id)
+
+    # --- carga ---
+    def _cargar(self, db: Session, filtro) -> Optional[EntradaCatalogo]:
+        version = next(self._versiones)
+        emp = db.execute(select(*(getattr(Emprendedor, k) for k in _PERFIL)).where(filtro)).first()
+        if emp is None or not emp.codigo_cliente:
+            return None
+        e = _armar(
+            emp,
+            db.execute(select(*_SERVICIO).where(Servicio.emprendedor_id == emp.id)).all(),
+            db.execute(select(*_HORARIO).where(Horario.emprendedor_id == emp.id)).all(),
+            version,
+        )
+        self._poner(e)
+        return e
+
+    def precargar(self, db: Session) -> int:
+        """Arma el catálogo entero (hasta `maximo` emprendedores) con tres consultas."""
+        version = next(self._versiones)
+        emps = db.execute(
+            select(*(getattr(Emprendedor, k) for k in _PERFIL))
+            .where(Emprendedor.codigo_cliente.isnot(None)).order_by(Emprendedor.id.desc()).limit(self.maximo)
+        ).all()
+        if not emps:
+            return 0
+        desde = min(e.id for e in emps)
+        servs: Dict[int, list] = {}
+        for s in db.execute(select(*_SERVICIO).where(Servicio.emprendedor_id >= desde)):
+            servs.setdefault(s.emprendedor_id, []).append(s)
+        hors: Dict[int, list] = {}
+        for h in db.execute(select(*_HORARIO).where(Horario.emprendedor_id >= desde)):
+            hors.setdefault(h.emprendedor_id, []).append(h)
+        for emp in reversed(emps):   # los más nuevos quedan como los más recientes del LRU
+            self._poner(_armar(emp, servs.get(emp.id, ()), hors.get(emp.id, ()), version))
+        return len(emps)
+
+    def _poner(self, e: EntradaCatalogo) -> None:
+        with self._lock:
+            if self._cambio.get(e.id, 0) > e.version:
+                return   # se leyó antes de un cambio que se commiteó mientras tanto
+            self._quitar(e.id)
+            otro = self._por_codigo.get(e.codigo)
+            if otro is not None:   # el código pasó a otro emprendedor
+                self._quitar(otro.id)
+            self._por_codigo[e.codigo] = e
+            self._codigo_de[e.id] = e.codigo
+            self._bytes += e.tamano
+            while len(self._por_codigo) > self.maximo or (self._bytes > self.maximo_bytes and len(self._por_codigo) > 1):
+                _, viejo = self._por_codigo.popitem(last=False)
+                self._codigo_de.pop(viejo.id, None)
+                self._bytes -= viejo.tamano
+
+    def _quitar(self, emp_id: int) -> bool:
+        """Saca la entrada del emprendedor (con el lock tomado)."""
+        codigo = self._codigo_de.pop(emp_id, None)
+        e = self._por_codigo.pop(codigo, None) if codigo else None
+        if e is not None:
+            self._bytes -= e.tamano
+        return e is not None
+
+    # --- cambios ---
+    def refrescar(self, db: Session, emp_ids: Iterable[int]) -> None:
+        """Rearma las entradas de esos emprendedores que estaban cargadas (las demás se
+        cargan cuando se pidan)."""
+        for emp_id in emp_ids:
+            with self._lock:
+                self._cambio[emp_id] = next(self._versiones)
+                estaba = self._quitar(emp_id)
+            if estaba:
+                self._cargar(db, Emprendedor.id == emp_id)
+
+    def descartar(self, emp_ids: Iterable[int]) -> None:
+        """Saca las entradas sin rearmarlas (se cargan al próximo pedido)."""
+        with self._lock:
+            for emp_id in emp_ids:
+                self._cambio[emp_id] = next(self._versiones)
+                self._quitar(emp_id)
+
+    def vaciar(self) -> None:
+        with self._lock:
+            self._por_codigo.clear()
+            self._codigo_de.clear()
+            self._bytes = 0
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {"entradas": len(self._por_codigo), "bytes": self._bytes,
+                    "aciertos": self.aciertos, "fallos": self.fallos}
+
+
+catalogo = Catalogo()
+
+
+# ===== Avisos de cambios =====
+def tocado(db: Session, emp_id: int) -> None:
+    """Anota un emprendedor cuyo catálogo (o agenda: excepciones, series, recursos) cambia en
+    esta transacción (para escrituras masivas) y avisa a los demás workers (app/invalidaciones.py)."""
+    db.info.setdefault(_CLAVE, set()).add(emp_id)
+    invalidaciones.publicar(db, "catalogo", emp_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _anotar(session: Session, flush_context, instances) -> None:
+    for o in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(o, Emprendedor) and o.id is not None:
+            tocado(session, o.id)
+        elif isinstance(o, (Servicio, Horario, HorarioExcepcion, Recurso, TurnoSerie)) and o.emprendedor_id:
+            tocado(session, o.emprendedor_id)
+        elif isinstance(o, TurnoSerieExcepcion) and o.serie_id:
+            with session.no_autoflush:
+                s = session.get(TurnoSerie, o.serie_id)
+            if s is not None:
+                tocado(session, s.emprendedor_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _refrescar(session: Session) -> None:
+    emps: Optional[Set[int]] = session.info.pop(_CLAVE, None)
+    if not emps:
+        return
+    try:
+        with Session(bind=session.get_bind()) as s2:
+            catalogo.refrescar(s2, sorted(emps))
+    except Exception:
+        log.exception("No se pudo refrescar el catálogo de %s", emps)
+        catalogo.descartar(emps)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
+
+
+# en los otros workers la entrada se descarta y se recarga al próximo pedido
+invalidaciones.al_recibir("catalogo", catalogo.descartar)
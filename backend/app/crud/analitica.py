@@ -0,0 +1,303 @@
+# app/crud/analitica.py
+"""
+Analítica de toda la plataforma para el admin: ranking de emprendedores
+(turnos, ingresos, crecimiento contra el período anterior), desglose por
+rubro y actividad mensual por cohorte de alta.
+
+- Cada reporte es una sola consulta SQL. Los turnos se agregan primero por
+  (emprendedor, servicio) recorriendo sólo el índice cubriente
+  ix_turnos_emp_min (estado y servicio_id están en el índice, no se lee la
+  tabla); recién ese agregado chico se une a servicios para el precio.
+  Los puestos salen de funciones de ventana (RANK() OVER ...), así que con
+  10k emprendedores no hay un loop de Python por emprendedor.
+- Los resultados quedan en una cache en memoria (CACHE) por reporte y
+  parámetros, con invalidación explícita: cada escritura ORM de turnos,
+  emprendedores, servicios y usuarios marca la sesión (before_flush) y al
+  commit sube la generación; los caminos masivos (batch, cierres, bajas)
+  llaman a tocado() ellos mismos.
+  Una entrada de una generación vieja se sigue sirviendo tal cual hasta
+  ATRASO_MAX_S segundos (una ráfaga de reservas no recalcula en cada
+  pedido); pasado eso se devuelve igual y se recalcula en un hilo aparte,
+  así el admin sólo espera el cálculo cuando no hay nada guardado. POST
+  /admin/analitica/invalidar descarta todo. Con varios workers la marca
+  llega a los demás por app/invalidaciones.py.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, event, extract, func, literal, select
+from sqlalchemy.orm import Session
+
+from app import invalidaciones
+from app.models import Emprendedor, Servicio, Turno, Usuario
+from app.tiempo import MIN_DIA, min_de_dia
+
+log = logging.getLogger("turnera.analitica")
+
+ATRASO_MAX_S = float(os.getenv("ANALITICA_ATRASO_MAX_S", "15"))
+CACHE_MAX = int(os.getenv("ANALITICA_CACHE_MAX", "64"))
+ORDENES = ("turnos", "ingresos", "crecimiento")
+SIN_RUBRO = "(sin rubro)"
+_CLAVE = "analitica_tocada"
+
+
+# ===== Cache =====
+class CacheAnalitica:
+    """Resultados por clave, válidos para la generación en que se calcularon."""
+
+    def __init__(self, maximo: int = CACHE_MAX):
+        self.maximo = maximo
+        self.generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._calculando: Set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def invalidar(self, forzar: bool = False) -> None:
+        """Sube la generación; con forzar además descarta lo guardado."""
+        with self._lock:
+            self.generacion += 1
+            if forzar:
+                self._datos.clear()
+
+    def obtener(self, db: Session, clave: Hashable, calcular: Callable[[Session], Any]) -> Any:
+        """Valor de `clave`. Si lo guardado es de una generación vieja se devuelve igual y
+        se recalcula en un hilo con sesión propia; sólo sin nada guardado se espera."""
+        with self._lock:
+            e = self._datos.get(clave)
+            if e is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                if e[0] == self.generacion or time.monotonic() - e[1] < ATRASO_MAX_S or clave in self._calculando:
+                    return e[2]
+            else:
+                self.fallos += 1
+            self._calculando.add(clave)
+            gen = self.generacion
+        if e is None:
+            return self._calcular(db, clave, calcular, gen)
+        threading.Thread(target=self._en_fondo, args=(db.get_bind(), clave, calcular, gen), daemon=True).start()
+        return e[2]
+
+    def _en_fondo(self, bind, clave: Hashable, calcular: Callable[[Session], Any], gen: int) -> None:
+        try:
+            with Session(bind=bind) as db:
+                self._calcular(db, clave, calcular, gen)
+        except Exception:
+            log.exception("No se pudo recalcular la analítica %s", clave)
+
+    def _calcular(self, db: Session, clave: Hashable, calcular: Callable[[Session], Any], gen: int) -> Any:
+        t0 = time.perf_counter()
+        try:
+            valor = calcular(db)
+        finally:
+            with self._lock:
+                self._calculando.discard(clave)
+        with self._lock:
+            self._datos[clave] = (gen, time.monotonic(), valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+        log.debug("Analítica %s recalculada en %.1f ms", clave, (time.perf_counter() - t0) * 1000)
+        return valor
+
+    def estado(self) -> Dict[str, int]:
+        with self._lock:
+            return {"generacion": self.generacion, "entradas": len(self._datos),
+                    "aciertos": self.aciertos, "fallos": self.fallos}
+
+
+CACHE = CacheAnalitica()
+
+
+def tocado(db: Session) -> None:
+    """Anota que la transacción cambia datos de la analítica (se invalida al commit, también
+    en los demás workers)."""
+    db.info[_CLAVE] = True
+    invalidaciones.publicar(db, "analitica")
+
+
+@event.listens_for(Session, "before_flush")
+def _anotar(session: Session, flush_context, instances) -> None:
+    for o in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(o, (Turno, Emprendedor, Servicio, Usuario)):
+            tocado(session)
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar(session: Session) -> None:
+    if session.info.pop(_CLAVE, None):
+        CACHE.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
+
+
+invalidaciones.al_recibir("analitica", lambda _claves: CACHE.invalidar())
+
+
+# ===== Períodos =====
+def periodo_mes(hoy: date) -> Tuple[date, date]:
+    """Del 1° del mes de `hoy` al último día, inclusive."""
+    d0 = hoy.replace(day=1)
+    d1 = (d0 + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return d0, d1
+
+
+def _meses(desde: date, hasta: date) -> List[Tuple[str, int]]:
+    """Meses que toca [desde, hasta]: (YYYY-MM, minuto en que empieza el mes o `desde`)."""
+    out, d = [], desde
+    while d <= hasta:
+        out.append((f"{d.year:04d}-{d.month:02d}", min_de_dia(d)))
+        d = periodo_mes(d)[1] + timedelta(days=1)
+    return out
+
+
+def _minutos(desde: date, hasta: date) -> Tuple[int, int, int]:
+    """[a, b) del período en minutos y el inicio p del período anterior de igual largo."""
+    a, b = min_de_dia(desde), min_de_dia(hasta) + MIN_DIA
+    return a, b, a - (b - a)
+
+
+def _por_emprendedor(a: int, b: int, p: int):
+    """Subconsulta emprendedor → turnos e ingresos de [a, b) y de [p, a), y cancelados de [a, b)."""
+    vivo = Turno.estado != "cancelado"
+    actual = Turno.inicio_min >= a
+    por_servicio = select(
+        Turno.emprendedor_id.label("emp"),
+        Turno.servicio_id.label("sid"),
+        func.sum(case((and_(actual, vivo), 1), else_=0)).label("n"),
+        func.sum(case((and_(~actual, vivo), 1), else_=0)).label("n_prev"),
+        func.sum(case((and_(actual, ~vivo), 1), else_=0)).label("canc"),
+    ).where(
+        # IN (ids) hace que SQLite recorra el índice con un rango por emprendedor en lugar de
+        # leerlo entero: sólo se tocan los turnos del período, no toda la historia
+        Turno.emprendedor_id.in_(select(Emprendedor.id)), Turno.inicio_min >= p, Turno.inicio_min < b,
+    ).group_by(Turno.emprendedor_id, Turno.servicio_id).subquery()
+    precio = func.coalesce(Servicio.precio, 0)
+    return select(
+        por_servicio.c.emp,
+        func.sum(por_servicio.c.n).label("turnos"),
+        func.sum(por_servicio.c.n_prev).label("turnos_prev"),
+        func.sum(por_servicio.c.canc).label("cancelados"),
+        func.sum(por_servicio.c.n * precio).label("ingresos"),
+        func.sum(por_servicio.c.n_prev * precio).label("ingresos_prev"),
+    ).outerjoin(Servicio, Servicio.id == por_servicio.c.sid).group_by(por_servicio.c.emp).subquery()
+
+
+# ===== Reportes =====
+def ranking(db: Session, desde: date, hasta: date, orden: str = "turnos",
+            rubro: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Emprendedores con turnos en el período o el anterior, con su puesto en cada
+    métrica (y dentro de su rubro), ordenados por el puesto de `orden`."""
+    def calcular(db: Session) -> List[Dict[str, Any]]:
+        a, b, p = _minutos(desde, hasta)
+        e = _por_emprendedor(a, b, p)
+        rubro_col = func.coalesce(Emprendedor.rubro, SIN_RUBRO)
+        crec = (e.c.turnos - e.c.turnos_prev) * 1.0 / func.nullif(e.c.turnos_prev, 0)
+        puestos = {
+            "turnos": func.rank().over(order_by=e.c.turnos.desc()),
+            "ingresos": func.rank().over(order_by=e.c.ingresos.desc()),
+            "crecimiento": func.rank().over(order_by=crec.desc()),
+        }
+        t = select(
+            Emprendedor.id, Emprendedor.nombre, Emprendedor.codigo_cliente, rubro_col.label("rubro"),
+            e.c.turnos, e.c.turnos_prev, e.c.cancelados, e.c.ingresos, e.c.ingresos_prev,
+            crec.label("crecimiento"),
+            *(v.label(f"puesto_{k}") for k, v in puestos.items()),
+            func.rank().over(partition_by=rubro_col, order_by=e.c.ingresos.desc()).label("puesto_rubro"),
+        ).join(e, e.c.emp == Emprendedor.id).subquery()
+        # el filtro por rubro va por fuera: los puestos siguen siendo los de toda la plataforma
+        q = select(t).order_by(t.c[f"puesto_{orden}"], t.c.id)
+        if rubro is not None:
+            q = q.where(t.c.rubro == rubro)
+        return [
+            {
+                "emprendedor_id": r.id, "nombre": r.nombre, "codigo_cliente": r.codigo_cliente, "rubro": r.rubro,
+                "turnos": int(r.turnos), "turnos_prev": int(r.turnos_prev), "cancelados": int(r.cancelados),
+                "ingresos": float(r.ingresos or 0), "ingresos_prev": float(r.ingresos_prev or 0),
+                "crecimiento": None if r.crecimiento is None else round(float(r.crecimiento), 4),
+                "puesto_turnos": r.puesto_turnos, "puesto_ingresos": r.puesto_ingresos,
+                "puesto_crecimiento": r.puesto_crecimiento, "puesto_rubro": r.puesto_rubro,
+            }
+            for r in db.execute(q)
+        ]
+
+    return CACHE.obtener(db, ("ranking", desde, hasta, orden, rubro), calcular)
+
+
+def rubros(db: Session, desde: date, hasta: date) -> List[Dict[str, Any]]:
+    """Por rubro: emprendedores (todos y con turnos en el período), turnos, ingresos,
+    crecimiento y participación en el total de la plataforma."""
+    def calcular(db: Session) -> List[Dict[str, Any]]:
+        a, b, p = _minutos(desde, hasta)
+        e = _por_emprendedor(a, b, p)
+        rubro_col = func.coalesce(Emprendedor.rubro, SIN_RUBRO)
+        turnos = func.coalesce(func.sum(e.c.turnos), 0)
+        turnos_prev = func.coalesce(func.sum(e.c.turnos_prev), 0)
+        ingresos = func.coalesce(func.sum(e.c.ingresos), 0)
+        q = select(
+            rubro_col.label("rubro"),
+            func.count(Emprendedor.id).label("emprendedores"),
+            func.sum(case((e.c.turnos > 0, 1), else_=0)).label("activos"),
+            turnos.label("turnos"),
+            turnos_prev.label("turnos_prev"),
+            ingresos.label("ingresos"),
+            (ingresos * 1.0 / func.nullif(func.sum(ingresos).over(), 0)).label("participacion"),
+            func.rank().over(order_by=ingresos.desc()).label("puesto"),
+        ).outerjoin(e, e.c.emp == Emprendedor.id).group_by(rubro_col).order_by("puesto", "rubro")
+        return [
+            {
+                "rubro": r.rubro, "emprendedores": r.emprendedores, "activos": int(r.activos or 0),
+                "turnos": int(r.turnos), "turnos_prev": int(r.turnos_prev), "ingresos": float(r.ingresos),
+                "crecimiento": round((r.turnos - r.turnos_prev) / r.turnos_prev, 4) if r.turnos_prev else None,
+                "participacion": round(float(r.participacion or 0), 4), "puesto": r.puesto,
+            }
+            for r in db.execute(q)
+        ]
+
+    return CACHE.obtener(db, ("rubros", desde, hasta), calcular)
+
+
+def cohortes(db: Session, desde: date, hasta: date) -> List[Dict[str, Any]]:
+    """Cohortes por mes de alta del emprendedor: tamaño y, por cada mes de
+    [desde, hasta], cuántos tuvieron al menos un turno no cancelado.
+    Sin funciones de fecha propias de un motor: el mes del turno sale de
+    comparar inicio_min con los bordes de mes (calculados acá, el período
+    está acotado) y el de alta de EXTRACT."""
+    def calcular(db: Session) -> List[Dict[str, Any]]:
+        a, b = min_de_dia(desde), min_de_dia(hasta) + MIN_DIA
+        meses = _meses(desde, hasta)
+        bordes = [(Turno.inicio_min < borde, m) for (m, _), (_, borde) in zip(meses, meses[1:])]
+        mes = case(*bordes, else_=meses[-1][0]) if bordes else literal(meses[0][0])
+        activos = select(Turno.emprendedor_id.label("emp"), mes.label("mes")).where(
+            Turno.emprendedor_id.in_(select(Emprendedor.id)), Turno.inicio_min >= a, Turno.inicio_min < b,
+            Turno.estado != "cancelado",
+        ).distinct().subquery()
+        cohorte = extract("year", Emprendedor.created_at) * 100 + extract("month", Emprendedor.created_at)
+        altas = select(
+            Emprendedor.id.label("emp"), cohorte.label("cohorte"),
+            func.count().over(partition_by=cohorte).label("tam"),
+        ).subquery()
+        q = select(altas.c.cohorte, altas.c.tam, activos.c.mes, func.count().label("activos")).join(
+            activos, activos.c.emp == altas.c.emp,
+        ).group_by(altas.c.cohorte, altas.c.tam, activos.c.mes).order_by(altas.c.cohorte, activos.c.mes)
+        out: Dict[int, Dict[str, Any]] = {}
+        for r in db.execute(q):
+            k = int(r.cohorte)
+            c = out.setdefault(k, {"cohorte": f"{k // 100:04d}-{k % 100:02d}", "emprendedores": r.tam,
+                                   "meses": []})
+            c["meses"].append({"mes": r.mes, "activos": r.activos, "tasa": round(r.activos / r.tam, 4)})
+        return list(out.values())
+
+    return CACHE.obtener(db, ("cohortes", desde, hasta), calcular)
@@ -0,0 +1,206 @@
+# app/crud/borrado.py
+"""
+Bajas de servicios, emprendedores y usuarios por conjunto, sin cargar la
+historia en la sesión.
+
+`db.delete(obj)` con cascade ORM trae cada Turno hijo a memoria y lo borra
+de a uno, todo en una transacción: con años de historia es un pico de
+memoria y un lock de escritura largo. Acá:
+
+- Primero se da de baja lógica (servicio inactivo, emprendedor sin código
+  público) y se commitea: nadie más reserva mientras se borra.
+- Las tablas grandes se vacían por lotes (`DELETE ... WHERE id IN (ids del
+  lote)`, sólo columnas) con un commit por lote, así el lock se suelta entre
+  lotes y otras escrituras pueden pasar.
+- Lo que queda chico (horarios, recursos, series...) lo borra la base con
+  sus ON DELETE CASCADE / SET NULL al borrar la fila padre (en SQLite hace
+  falta PRAGMA foreign_keys, ver app/database.py).
+- Como nada pasa por before_flush, acá se reservan los seq del delta-sync,
+  se dejan los tombstones y se anotan huecos y lista de espera (mismo
+  esquema que crud/cierres.py).
+
+Las cuentas muy grandes se borran en segundo plano (programar) con una
+sesión propia; el endpoint contesta 202 apenas quedó la baja lógica.
+"""
+from __future__ import annotations
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.eventos import bus
+from app.models import Emprendedor, EsperaTurno, HuecoLibre, Servicio, Turno, TurnoBorrado, Usuario
+from app import catalogo
+from app.crud import analitica, espera, huecos
+from app.crud.cambios import reservar_seq
+from app.tiempo import ahora_emprendedor
+
+log = logging.getLogger("turnera.borrado")
+
+LOTE = int(os.getenv("BORRADO_LOTE", "2000"))
+# con más turnos que esto el endpoint borra en segundo plano
+UMBRAL_FONDO = int(os.getenv("BORRADO_FONDO_TURNOS", "20000"))
+
+# tablas por emprendedor que pueden ser grandes: se vacían por lotes antes de la fila padre
+_TABLAS_EMP = (Turno, TurnoBorrado, HuecoLibre, EsperaTurno)
+
+_en_curso: Set[Tuple[str, int]] = set()
+
+
+def contar_turnos(db: Session, *filtros) -> int:
+    return db.execute(select(func.count(Turno.id)).where(*filtros)).scalar_one()
+
+
+def _vaciar(db: Session, modelo, *filtros, lote: int = LOTE) -> int:
+    """DELETE por lotes de ids (commit por lote); devuelve las filas borradas."""
+    n = 0
+    while True:
+        ids = db.scalars(select(modelo.id).where(*filtros).order_by(modelo.id).limit(lote)).all()
+        if not ids:
+            return n
+        db.execute(delete(modelo).where(modelo.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        n += len(ids)
+
+
+# ===== Servicio =====
+def desactivar_servicio(db: Session, servicio_id: int) -> Optional[int]:
+    """Baja lógica (no se reserva más); devuelve el emprendedor o None si no existe. Hace commit."""
+    emp_id = db.execute(select(Servicio.emprendedor_id).where(Servicio.id == servicio_id)).scalar_one_or_none()
+    if emp_id is not None:
+        db.execute(update(Servicio).where(Servicio.id == servicio_id).values(activo=False)
+                   .execution_options(synchronize_session=False))
+        catalogo.tocado(db, emp_id)
+        db.commit()
+    return emp_id
+
+
+def borrar_servicio(db: Session, servicio_id: int, lote: int = LOTE) -> int:
+    """Borra el servicio y sus turnos; devuelve cuántos turnos se borraron. Hace commit."""
+    emp_id = desactivar_servicio(db, servicio_id)
+    if emp_id is None:
+        return 0
+
+    ahora = ahora_emprendedor(db, emp_id)
+    n = 0
+    while True:
+        filas = db.execute(
+            select(Turno.id, Turno.inicio, Turno.fin, Turno.estado)
+            .where(Turno.servicio_id == servicio_id).order_by(Turno.id).limit(lote)
+        ).all()
+        if not filas:
+            break
+        seq = reservar_seq(db, emp_id, len(filas))
+        analitica.tocado(db)
+        db.execute(insert(TurnoBorrado), [
+            {"emprendedor_id": emp_id, "turno_id": f.id, "seq": seq + k} for k, f in enumerate(filas)
+        ])
+        db.execute(delete(Turno).where(Turno.id.in_([f.id for f in filas]))
+                   .execution_options(synchronize_session=False))
+        libres = [f for f in filas if f.estado == "reservado" and f.fin > ahora]
+        if libres:
+            huecos.marcar(db, emp_id, min(f.inicio for f in libres).date(), max(f.inicio for f in libres).date())
+            for f in libres:
+                espera.liberado(db, emp_id, f.inicio, f.fin)
+        db.commit()
+        n += len(filas)
+
+    # lista de espera del servicio: ON DELETE CASCADE; series: SET NULL
+    db.execute(delete(Servicio).where(Servicio.id == servicio_id).execution_options(synchronize_session=False))
+    catalogo.tocado(db, emp_id)
+    db.commit()
+    if n:
+        bus.publicar(emp_id, "reset", {"motivo": "servicio_borrado", "servicio_id": servicio_id, "turnos": n})
+    return n
+
+
+# ===== Emprendedor =====
+def desactivar_emprendedor(db: Session, emp_id: int) -> bool:
+    """Baja lógica: sin código público ni servicios activos. Hace commit."""
+    if db.execute(select(Emprendedor.id).where(Emprendedor.id == emp_id)).scalar_one_or_none() is None:
+        return False
+    db.execute(update(Emprendedor).where(Emprendedor.id == emp_id).values(codigo_cliente=None)
+               .execution_options(synchronize_session=False))
+    db.execute(update(Servicio).where(Servicio.emprendedor_id == emp_id).values(activo=False)
+               .execution_options(synchronize_session=False))
+    analitica.tocado(db)
+    catalogo.tocado(db, emp_id)
+    db.commit()
+    bus.publicar(emp_id, "reset", {"motivo": "emprendedor_borrado"})
+    return True
+
+
+def borrar_emprendedor(db: Session, emp_id: int, lote: int = LOTE) -> int:
+    """Borra el emprendedor con toda su agenda; devuelve cuántos turnos se borraron. Hace commit."""
+    if not desactivar_emprendedor(db, emp_id):
+        return 0
+
+    n = 0
+    for modelo in _TABLAS_EMP:
+        borradas = _vaciar(db, modelo, modelo.emprendedor_id == emp_id, lote=lote)
+        if modelo is Turno:
+            n = borradas
+    # servicios, horarios, excepciones, recursos, series y retenciones: ON DELETE CASCADE
+    db.execute(delete(Emprendedor).where(Emprendedor.id == emp_id).execution_options(synchronize_session=False))
+    analitica.tocado(db)
+    catalogo.tocado(db, emp_id)
+    db.commit()
+    db.expire_all()
+    return n
+
+
+# ===== Usuario =====
+def borrar_usuario(db: Session, usuario_id: int, lote: int = LOTE) -> int:
+    """Borra al usuario (y su emprendedor, si tiene). Los turnos que cargó en agendas
+    ajenas quedan, sin autor. Devuelve los turnos borrados con el emprendedor."""
+    emp_id = db.execute(select(Emprendedor.id).where(Emprendedor.usuario_id == usuario_id)).scalar_one_or_none()
+    n = borrar_emprendedor(db, emp_id, lote=lote) if emp_id is not None else 0
+
+    # lo mismo que haría ON DELETE SET NULL, pero por lotes y avisando al delta-sync
+    while True:
+        filas = db.execute(
+            select(Turno.id, Turno.emprendedor_id)
+            .where(Turno.creado_por_user_id == usuario_id).order_by(Turno.id).limit(lote)
+        ).all()
+        if not filas:
+            break
+        por_emp: Dict[int, List[int]] = {}
+        for f in filas:
+            por_emp.setdefault(f.emprendedor_id, []).append(f.id)
+        for e, ids in por_emp.items():
+            seq = reservar_seq(db, e, len(ids))
+            db.execute(update(Turno), [{"id": tid, "creado_por_user_id": None, "seq": seq + k}
+                                       for k, tid in enumerate(ids)])
+        db.commit()
+
+    db.execute(delete(Usuario).where(Usuario.id == usuario_id).execution_options(synchronize_session=False))
+    analitica.tocado(db)
+    db.commit()
+    db.expire_all()
+    return n
+
+
+# ===== Segundo plano =====
+def en_curso(tipo: str, id_: int) -> bool:
+    return (tipo, id_) in _en_curso
+
+
+def programar(tareas, bind, tipo: str, id_: int, fn: Callable[[Session, int], int]) -> None:
+    """Agenda fn(sesión nueva, id_) en BackgroundTasks, una sola vez por (tipo, id)."""
+    if (tipo, id_) in _en_curso:
+        return
+    _en_curso.add((tipo, id_))
+    tareas.add_task(_correr, bind, tipo, id_, fn)
+
+
+def _correr(bind, tipo: str, id_: int, fn: Callable[[Session, int], int]) -> None:
+    try:
+        with Session(bind=bind) as db:
+            n = fn(db, id_)
+        log.info("Baja de %s %s terminada: %s turnos", tipo, id_, n)
+    except Exception:
+        log.exception("No se pudo terminar la baja de %s %s", tipo, id_)
+    finally:
+        _en_curso.discard((tipo, id_))
@@ -0,0 +1,139 @@
+# app/crud/cambios.py
+"""
+Secuencia de cambios por emprendedor para el delta-sync de la agenda.
+
+Cada alta/modificación de un Turno le pone `seq` = siguiente valor de
+`emprendedores.cambios_seq`; cada baja deja un tombstone (TurnoBorrado) con
+su propio seq. El contador se incrementa con un UPDATE sobre la fila del
+emprendedor dentro de la misma transacción: la fila queda bloqueada hasta
+el commit, así dos escrituras concurrentes del mismo dueño no pueden
+commitear con los seq invertidos (un cliente nunca "salta" un cambio).
+
+Se engancha en before_flush de cualquier Session, así cubre todos los
+caminos ORM. Los UPDATE/DELETE masivos (query.update/delete, SQL crudo)
+no pasan por acá y tienen que llamar a reservar_seq() ellos mismos.
+
+Los tombstones de más de TOMBSTONES_DIAS días los borra un hilo de fondo
+(purgador) al arrancar y cada TOMBSTONES_PURGA_S segundos; el horizonte
+de cada emprendedor sube con ellos y un cursor por debajo recibe reset.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Emprendedor, Turno, TurnoBorrado
+
+log = logging.getLogger("turnera.cambios")
+
+# Tombstones más viejos que esto se purgan (ver purgar_tombstones)
+TOMBSTONES_DIAS = int(os.getenv("TOMBSTONES_DIAS", "90"))
+PURGA_S = int(os.getenv("TOMBSTONES_PURGA_S", "3600"))   # 0 = sin hilo de fondo
+
+
+def reservar_seq(db: Session, emp_id: int, n: int = 1) -> int:
+    """Reserva n valores consecutivos y devuelve el primero."""
+    db.execute(
+        update(Emprendedor)
+        .where(Emprendedor.id == emp_id)
+        .values(cambios_seq=Emprendedor.cambios_seq + n)
+        .execution_options(synchronize_session=False)
+    )
+    ultimo = db.execute(select(Emprendedor.cambios_seq).where(Emprendedor.id == emp_id)).scalar_one()
+    return ultimo - n + 1
+
+
+@event.listens_for(Session, "before_flush")
+def _marcar_cambios(session: Session, flush_context, instances) -> None:
+    emps_borrados = {o.id for o in session.deleted if isinstance(o, Emprendedor)}
+    pendientes: Dict[int, List[object]] = {}
+
+    for o in session.new:
+        if isinstance(o, Turno) and o.emprendedor_id:
+            pendientes.setdefault(o.emprendedor_id, []).append(o)
+    for o in session.dirty:
+        if isinstance(o, Turno) and o.emprendedor_id and session.is_modified(o, include_collections=False):
+            pendientes.setdefault(o.emprendedor_id, []).append(o)
+    for o in session.deleted:
+        if isinstance(o, Turno) and o.id and o.emprendedor_id not in emps_borrados:
+            pendientes.setdefault(o.emprendedor_id, []).append(
+                TurnoBorrado(emprendedor_id=o.emprendedor_id, turno_id=o.id)
+            )
+
+    for emp_id, objs in pendientes.items():
+        primero = reservar_seq(session, emp_id, len(objs))
+        for k, o in enumerate(objs):
+            o.seq = primero + k
+            if isinstance(o, TurnoBorrado):
+                session.add(o)
+
+
+def purgar_tombstones(db: Session, dias: int = TOMBSTONES_DIAS) -> int:
+    """Borra tombstones viejos y sube el horizonte de cada emprendedor afectado.
+
+    Un cliente con cursor por debajo del horizonte ya no puede sincronizar
+    incremental: el endpoint le pide un reset (snapshot completo).
+    """
+    limite = datetime.utcnow() - timedelta(days=dias)
+    horizontes = db.execute(
+        select(TurnoBorrado.emprendedor_id, TurnoBorrado.seq)
+        .where(TurnoBorrado.borrado_at < limite)
+        .order_by(TurnoBorrado.emprendedor_id, TurnoBorrado.seq.desc())
+    ).all()
+    if not horizontes:
+        return 0
+    max_por_emp: Dict[int, int] = {}
+    for emp_id, seq in horizontes:
+        max_por_emp.setdefault(emp_id, seq)
+    for emp_id, seq in max_por_emp.items():
+        db.execute(
+            update(Emprendedor)
+            .where(Emprendedor.id == emp_id, Emprendedor.cambios_horizonte < seq)
+            .values(cambios_horizonte=seq)
+            .execution_options(synchronize_session=False)
+        )
+    db.execute(delete(TurnoBorrado).where(TurnoBorrado.borrado_at < limite))
+    db.commit()
+    return len(horizontes)
+
+
+class Purgador:
+    """Hilo que corre purgar_tombstones() al arrancar y después cada `intervalo_s`."""
+
+    def __init__(self, intervalo_s: int = PURGA_S):
+        self.intervalo_s = intervalo_s
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self, engine) -> None:
+        if self.intervalo_s <= 0 or self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(engine,), name="tombstones", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
+            self._hilo = None
+
+    def _bucle(self, engine) -> None:
+        while True:
+            try:
+                with Session(bind=engine) as db:
+                    n = purgar_tombstones(db)
+                if n:
+                    log.info("Tombstones purgados: %s", n)
+            except Exception:
+                log.exception("No se pudieron purgar los tombstones")
+            if self._parar.wait(self.intervalo_s):
+                return
+
+
+purgador = Purgador()
@@ -0,0 +1,228 @@
+# app/crud/capacidad.py
+"""
+Capacidad: varios recursos (sillas, boxes, profesionales) y lugares por turno.
+
+- Recursos: un emprendedor con N recursos activos puede atender N turnos a
+  la vez (sin recursos, N = 1: el comportamiento de siempre). Un turno sin
+  recurso_id ocupa "alguno": alcanza con que la concurrencia no supere N
+  (en intervalos, concurrencia ≤ N garantiza que existe una asignación).
+  Un turno con recurso_id además exige que ese recurso esté libre.
+- Lugares: un servicio con capacidad > 1 (clase grupal) arma una sesión por
+  (servicio, inicio); la sesión ocupa UN recurso y admite `capacidad`
+  inscriptos.
+
+La ocupación de una ventana se arma una vez con un sweep-line (eventos
++1/-1 ordenados, O(n log n)) y queda como función escalón: cada consulta
+es un bisect más los escalones que caen dentro del intervalo. Todo va en
+minutos enteros (app/tiempo.py): las filas llegan de la base como
+inicio_min/fin_min y los datetime se convierten una vez en el borde
+(libres/ocupar/tramos); las variantes *_min trabajan directo con enteros.
+"""
+from __future__ import annotations
+from bisect import bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Recurso, Servicio
+from app.tiempo import a_min, de_min
+
+Intervalo = Tuple[datetime, datetime]
+IntervaloMin = Tuple[int, int]
+
+
+def _m(x: Union[int, datetime]) -> int:
+    return x if isinstance(x, int) else a_min(x)
+
+
+class PerfilOcupacion:
+    """Concurrencia en función del tiempo (escalones ts[k] → niveles[k], en minutos)."""
+
+    def __init__(self, intervalos: Iterable[IntervaloMin] = ()):
+        eventos = []
+        for a, b in intervalos:
+            if a < b:
+                eventos.append((a, 1))
+                eventos.append((b, -1))
+        eventos.sort()   # en empate, primero los -1: [a, b) no choca con [b, c)
+        self.ts: List[int] = []
+        self.niveles: List[int] = []
+        nivel = 0
+        for t, d in eventos:
+            nivel += d
+            if self.ts and self.ts[-1] == t:
+                self.niveles[-1] = nivel
+            else:
+                self.ts.append(t)
+                self.niveles.append(nivel)
+
+    def nivel_en(self, t: int) -> int:
+        k = bisect_right(self.ts, t) - 1
+        return self.niveles[k] if k >= 0 else 0
+
+    def max_en(self, a: int, b: int) -> int:
+        """Concurrencia máxima dentro de [a, b)."""
+        k = bisect_right(self.ts, a) - 1
+        m = self.niveles[k] if k >= 0 else 0
+        k += 1
+        while k < len(self.ts) and self.ts[k] < b:
+            if self.niveles[k] > m:
+                m = self.niveles[k]
+            k += 1
+        return m
+
+    def tramos_bajo(self, a: int, b: int, tope: int) -> Iterable[IntervaloMin]:
+        """Tramos maximales de [a, b) con concurrencia < tope (huecos con lugar)."""
+        k = bisect_right(self.ts, a) - 1
+        ini = a if (self.niveles[k] if k >= 0 else 0) < tope else None
+        k += 1
+        while k < len(self.ts) and self.ts[k] < b:
+            libre = self.niveles[k] < tope
+            if ini is None and libre:
+                ini = self.ts[k]
+            elif ini is not None and not libre:
+                if ini < self.ts[k]:
+                    yield ini, self.ts[k]
+                ini = None
+            k += 1
+        if ini is not None and ini < b:
+            yield ini, b
+
+    def _escalon(self, t: int) -> int:
+        """Índice del escalón que empieza exactamente en t (lo crea si hace falta)."""
+        k = bisect_right(self.ts, t) - 1
+        if k >= 0 and self.ts[k] == t:
+            return k
+        self.ts.insert(k + 1, t)
+        self.niveles.insert(k + 1, self.niveles[k] if k >= 0 else 0)
+        return k + 1
+
+    def agregar(self, a: int, b: int) -> None:
+        if a >= b:
+            return
+        i = self._escalon(a)
+        j = self._escalon(b)
+        for k in range(i, j):
+            self.niveles[k] += 1
+
+    def copia(self) -> "PerfilOcupacion":
+        p = PerfilOcupacion()
+        p.ts, p.niveles = list(self.ts), list(self.niveles)
+        return p
+
+
+@dataclass
+class Ocupacion:
+    """Ocupación de un emprendedor en una ventana, lista para consultar muchos huecos."""
+    recursos: int
+    perfil: PerfilOcupacion
+    sesiones: Dict[Tuple[int, int], int] = field(default_factory=dict)   # (servicio, inicio_min) → inscriptos
+    por_recurso: Dict[int, List[IntervaloMin]] = field(default_factory=dict)
+
+    def _recurso_libre(self, recurso_id: int, a: int, b: int) -> bool:
+        return not any(x < b and y > a for x, y in self.por_recurso.get(recurso_id, ()))
+
+    def libres_min(self, servicio_id: Optional[int], cupo: int, a: int, b: int,
+                   recurso_id: Optional[int] = None) -> int:
+        """Lugares que quedan para un turno [a, b) del servicio (cupo = Servicio.capacidad)."""
+        if cupo > 1:
+            n = self.sesiones.get((servicio_id, a))
+            if n:
+                return max(0, cupo - n)
+        if recurso_id and not self._recurso_libre(recurso_id, a, b):
+            return 0
+        nivel = self.perfil.max_en(a, b)
+        if nivel >= self.recursos:
+            return 0
+        if cupo > 1:
+            return cupo              # sesión nueva
+        return 1 if recurso_id else self.recursos - nivel
+
+    def libres(self, servicio_id: Optional[int], cupo: int, a: datetime, b: datetime,
+               recurso_id: Optional[int] = None) -> int:
+        return self.libres_min(servicio_id, cupo, a_min(a), a_min(b), recurso_id)
+
+    def hay_lugar(self, servicio_id: Optional[int], cupo: int, a: datetime, b: datetime,
+                  recurso_id: Optional[int] = None) -> bool:
+        return self.libres(servicio_id, cupo, a, b, recurso_id) > 0
+
+    def inscriptos(self, servicio_id: Optional[int], a: Union[int, datetime]) -> int:
+        """Inscriptos en la sesión grupal (servicio, inicio); 0 si no hay sesión."""
+        return self.sesiones.get((servicio_id, _m(a)), 0)
+
+    def ocupar(self, servicio_id: Optional[int], cupo: int, a: datetime, b: datetime,
+               recurso_id: Optional[int] = None) -> None:
+        a, b = _m(a), _m(b)
+        if cupo > 1:
+            clave = (servicio_id, a)
+            if self.sesiones.get(clave):
+                self.sesiones[clave] += 1
+                return
+            self.sesiones[clave] = 1
+        self.perfil.agregar(a, b)
+        if recurso_id:
+            insort(self.por_recurso.setdefault(recurso_id, []), (a, b))
+
+    def tramos(self, a: datetime, b: datetime) -> List[Intervalo]:
+        """Tramos de [a, b) donde queda algún recurso libre, como datetime."""
+        return [(de_min(x), de_min(y)) for x, y in self.perfil.tramos_bajo(a_min(a), a_min(b), self.recursos)]
+
+    def copia(self) -> "Ocupacion":
+        return Ocupacion(
+            self.recursos, self.perfil.copia(), dict(self.sesiones),
+            {k: list(v) for k, v in self.por_recurso.items()},
+        )
+
+
+def armar_ocupacion(
+    recursos: int,
+    cupos: Dict[int, int],
+    turnos: Iterable[Tuple[Optional[int], Optional[int], Union[int, datetime], Union[int, datetime]]],
+    otros: Iterable[Tuple[Optional[int], Union[int, datetime], Union[int, datetime]]] = (),
+) -> Ocupacion:
+    """turnos: (servicio_id, recurso_id, inicio, fin); otros: (servicio_id, inicio, fin) sin recurso.
+    inicio/fin en minutos (o datetime, que se convierte).
+
+    Los de servicios grupales se colapsan en una sesión por (servicio, inicio)
+    antes del sweep: la sesión cuenta una sola vez en la concurrencia.
+    """
+    sesiones: Dict[Tuple[int, int], int] = {}
+    por_recurso: Dict[int, List[IntervaloMin]] = {}
+    intervalos: List[IntervaloMin] = []
+    filas = [(s, r, _m(a), _m(b)) for s, r, a, b in turnos] + [(s, None, _m(a), _m(b)) for s, a, b in otros]
+    for sid, rid, a, b in filas:
+        if cupos.get(sid, 1) > 1:
+            clave = (sid, a)
+            sesiones[clave] = sesiones.get(clave, 0) + 1
+            if sesiones[clave] > 1:
+                continue
+        intervalos.append((a, b))
+        if rid:
+            por_recurso.setdefault(rid, []).append((a, b))
+    for xs in por_recurso.values():
+        xs.sort()
+    return Ocupacion(max(1, recursos), PerfilOcupacion(intervalos), sesiones, por_recurso)
+
+
+# ===== Consultas =====
+def recursos_activos(db: Session, emp_id: int) -> int:
+    n = db.query(func.count(Recurso.id)).filter(Recurso.emprendedor_id == emp_id, Recurso.activo == True).scalar()  # noqa: E712
+    return max(1, int(n or 0))
+
+
+def cupos_servicios(db: Session, emp_id: int) -> Dict[int, int]:
+    """servicio_id → capacidad, sólo los grupales (el resto vale 1)."""
+    return {
+        sid: int(c) for sid, c in db.query(Servicio.id, Servicio.capacidad).filter(
+            Servicio.emprendedor_id == emp_id, Servicio.capacidad > 1,
+        )
+    }
+
+
+def recurso_del_emprendedor(db: Session, emp_id: int, recurso_id: int) -> Optional[Recurso]:
+    return db.query(Recurso).filter(
+        Recurso.id == recurso_id, Recurso.emprendedor_id == emp_id, Recurso.activo == True,  # noqa: E712
+    ).first()
@@ -0,0 +1,177 @@
+# app/crud/cierres.py
+"""
+Cierre de un rango de la agenda (el dueño se enfermó, cortó la luz...):
+cancela o corre todos los turnos reservados que empiezan en [desde, hasta)
+por conjunto, no turno por turno.
+
+- Una consulta trae las filas afectadas (sólo columnas); los corridos se
+  revalidan juntos contra la agenda compilada del destino y una ocupación
+  armada una vez (sin los propios turnos que se mueven), como validar_lote.
+- Las escrituras son UPDATE por clave primaria en executemany (una
+  sentencia por lote); como no pasan por before_flush ni por el modelo, acá
+  se reservan los seq del delta-sync, se recalculan inicio_min/fin_min y se
+  anotan el índice de huecos y la lista de espera.
+- Con cerrar_agenda, el rango queda además como excepción de horario (el
+  día entero cerrado o los bloques que sobran), así nadie vuelve a reservar.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from app import catalogo
+from app.models import HorarioExcepcion, Turno
+from app.crud.cambios import reservar_seq
+from app.crud.capacidad import cupos_servicios
+from app.crud.horarios import AgendaCompilada, compilar_agenda
+from app.crud import analitica, espera, huecos
+from app.crud.turnos import cargar_ocupacion
+from app.tiempo import a_min
+
+LOTE = 500
+
+
+@dataclass
+class ResultadoCierre:
+    cancelados: List[int] = field(default_factory=list)
+    movidos: List[int] = field(default_factory=list)
+    dejados: List[int] = field(default_factory=list)
+    fallidos: List[dict] = field(default_factory=list)     # {id, inicio, error} de los que no entran
+    fechas_cerradas: List[date] = field(default_factory=list)
+
+
+def _restar(bloques: List[Tuple[int, int]], a: int, b: int) -> List[Tuple[int, int]]:
+    """Bloques del día menos el tramo [a, b) (en minutos)."""
+    out = []
+    for x, y in bloques:
+        if y <= a or x >= b:
+            out.append((x, y))
+            continue
+        if x < a:
+            out.append((x, a))
+        if y > b:
+            out.append((b, y))
+    return out
+
+
+def _cerrar_agenda(db: Session, emp_id: int, desde: datetime, hasta: datetime, motivo: Optional[str]) -> List[date]:
+    """Reemplaza las excepciones de los días tocados por lo que queda abierto fuera del rango."""
+    d0, d1 = desde.date(), (hasta - timedelta(microseconds=1)).date()
+    agenda = compilar_agenda(db, emp_id, d0, d1)
+    filas, dias = [], []
+    dia = d0
+    while dia <= d1:
+        base = datetime.combine(dia, dt_time.min)
+        a = max(0, int((desde - base).total_seconds() // 60))
+        b = min(24 * 60, int((hasta - base).total_seconds() // 60))
+        quedan = _restar(agenda.bloques(dia), a, b)
+        if quedan != agenda.bloques(dia):
+            dias.append(dia)
+            if quedan:
+                filas += [{"emprendedor_id": emp_id, "fecha": dia, "cerrado": False, "motivo": motivo,
+                           "inicio": dt_time(x // 60, x % 60), "fin": dt_time(y // 60, y % 60) if y < 24 * 60 else dt_time.max}
+                          for x, y in quedan]
+            else:
+                filas.append({"emprendedor_id": emp_id, "fecha": dia, "cerrado": True,
+                              "inicio": None, "fin": None, "motivo": motivo})
+        dia += timedelta(days=1)
+    if dias:
+        db.execute(delete(HorarioExcepcion).where(
+            HorarioExcepcion.emprendedor_id == emp_id, HorarioExcepcion.fecha.in_(dias),
+        ))
+        db.execute(insert(HorarioExcepcion), filas)
+        catalogo.tocado(db, emp_id)
+    return dias
+
+
+def cerrar_rango(
+    db: Session,
+    emp_id: int,
+    desde: datetime,
+    hasta: datetime,
+    mover_min: Optional[int] = None,
+    sin_lugar: str = "error",
+    cerrar_agenda: bool = False,
+    motivo: Optional[str] = None,
+) -> ResultadoCierre:
+    """Cancela (mover_min=None) o corre mover_min minutos los turnos de [desde, hasta).
+
+    sin_lugar (sólo al mover): "error" → no se toca nada y se devuelven los
+    fallidos; "cancelar" → los que no entran se cancelan; "dejar" → quedan
+    donde estaban. No hace commit: con fallidos y sin_lugar="error" el que
+    llama tiene que hacer rollback (la agenda ya pudo quedar cerrada).
+    """
+    res = ResultadoCierre()
+    filas = db.query(Turno.id, Turno.servicio_id, Turno.recurso_id, Turno.inicio, Turno.fin).filter(
+        Turno.emprendedor_id == emp_id, Turno.inicio >= desde, Turno.inicio < hasta, Turno.estado == "reservado",
+    ).order_by(Turno.inicio, Turno.id).all()
+
+    if cerrar_agenda:
+        res.fechas_cerradas = _cerrar_agenda(db, emp_id, desde, hasta, motivo)
+
+    movs: Dict[int, Tuple[datetime, datetime]] = {}
+    if mover_min is None:
+        res.cancelados = [f.id for f in filas]
+    elif filas:
+        delta = timedelta(minutes=mover_min)
+        nuevos = [(f, f.inicio + delta, f.fin + delta) for f in filas]
+        agenda: AgendaCompilada = compilar_agenda(db, emp_id, min(a for _, a, _ in nuevos).date(),
+                                                  max(a for _, a, _ in nuevos).date())
+        cupos = cupos_servicios(db, emp_id)
+        # con "dejar", un turno que no entra sigue ocupando su lugar: si otro ya se había corrido
+        # encima, se vuelve a repartir con ese fijo (a lo sumo una vuelta más por cada dejado)
+        fijos: Dict[int, dict] = {}
+        while True:
+            movs, fallidos = {}, {}
+            oc = cargar_ocupacion(db, emp_id, min(a for _, a, _ in nuevos), max(b for _, _, b in nuevos),
+                                  excluir={f.id for f in filas if f.id not in fijos})
+            for f, a, b in nuevos:
+                if f.id in fijos:
+                    continue
+                cupo = cupos.get(f.servicio_id, 1)
+                if not agenda.contiene(a, b):
+                    error = "Fuera de horario"
+                elif not oc.hay_lugar(f.servicio_id, cupo, a, b, f.recurso_id):
+                    error = "Horario no disponible"
+                else:
+                    oc.ocupar(f.servicio_id, cupo, a, b, f.recurso_id)
+                    movs[f.id] = (a, b)
+                    continue
+                fallidos[f.id] = {"id": f.id, "inicio": a, "error": error}
+            if sin_lugar != "dejar" or not fallidos:
+                break
+            fijos.update(fallidos)
+        fallidos.update(fijos)
+        res.fallidos = sorted(fallidos.values(), key=lambda x: (x["inicio"], x["id"]))
+        if sin_lugar == "cancelar":
+            res.cancelados = list(fallidos)
+        elif sin_lugar == "dejar":
+            res.dejados = sorted(fijos)
+        if res.fallidos and sin_lugar == "error":
+            return res
+        res.movidos = list(movs)
+
+    n = len(res.cancelados) + len(res.movidos)
+    if n:
+        seq = reservar_seq(db, emp_id, n)
+        analitica.tocado(db)
+        cambios = [{"id": tid, "estado": "cancelado", "seq": seq + k} for k, tid in enumerate(res.cancelados)]
+        seq += len(cambios)
+        corridos = [{"id": tid, "inicio": a, "fin": b, "inicio_min": a_min(a), "fin_min": a_min(b), "seq": seq + k}
+                    for k, (tid, (a, b)) in enumerate(movs.items())]
+        for lote in (cambios, corridos):
+            for i in range(0, len(lote), LOTE):
+                db.execute(update(Turno), lote[i:i + LOTE])
+
+        cancelados = set(res.cancelados)
+        tocados = [f for f in filas if f.id in movs or f.id in cancelados]
+        dias = [f.inicio.date() for f in tocados] + [a.date() for a, _ in movs.values()]
+        huecos.marcar(db, emp_id, min(dias), max(dias))
+        for f in tocados:
+            espera.liberado(db, emp_id, f.inicio, f.fin)
+    if res.fechas_cerradas:
+        huecos.marcar(db, emp_id, min(res.fechas_cerradas), max(res.fechas_cerradas))
+    return res
@@ -0,0 +1,81 @@
+# app/crud/combos.py
+"""
+Reservas encadenadas: varios servicios seguidos ("corte + color") como
+un solo bloque contiguo [t, t + Σ duraciones).
+
+La búsqueda recorre una sola vez, por bloque de horario, los tramos con
+lugar del perfil de ocupación (Ocupacion.tramos) y propone los inicios donde la
+cadena entera entra en un tramo; cada eslabón se confirma después contra
+la ocupación (recurso/capacidad), que ya está en memoria. Con servicios
+grupales en la cadena no se filtra por tramo: una sesión con lugar puede
+caer en un tramo "lleno" del perfil.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Servicio
+from app.crud.capacidad import Ocupacion
+from app.crud.horarios import AgendaCompilada
+
+MAX_SERVICIOS_CADENA = 6
+Eslabon = Tuple[Servicio, datetime, datetime]
+
+
+@dataclass
+class Cadena:
+    servicios: List[Servicio]
+
+    @property
+    def duracion(self) -> timedelta:
+        return sum((timedelta(minutes=int(s.duracion_min or 30)) for s in self.servicios), timedelta())
+
+    def eslabones(self, inicio: datetime) -> List[Eslabon]:
+        out, t = [], inicio
+        for s in self.servicios:
+            f = t + timedelta(minutes=int(s.duracion_min or 30))
+            out.append((s, t, f))
+            t = f
+        return out
+
+    def entra(self, oc: Ocupacion, inicio: datetime) -> bool:
+        """¿Hay lugar para cada eslabón? (no modifica `oc`)."""
+        return all(oc.hay_lugar(s.id, int(s.capacidad or 1), a, b) for s, a, b in self.eslabones(inicio))
+
+
+def cargar_cadena(db: Session, emp_id: int, servicio_ids: List[int]) -> Optional[Cadena]:
+    """Servicios en el orden pedido (pueden repetirse); None si alguno no es del emprendedor."""
+    por_id = {s.id: s for s in db.query(Servicio).filter(
+        Servicio.emprendedor_id == emp_id, Servicio.id.in_(set(servicio_ids)),
+    )}
+    if not servicio_ids or any(i not in por_id for i in servicio_ids):
+        return None
+    return Cadena([por_id[i] for i in servicio_ids])
+
+
+def buscar_inicios(cadena: Cadena, agenda: AgendaCompilada, oc: Ocupacion,
+                   desde: date, hasta: date, paso_min: int) -> List[datetime]:
+    """Inicios (en la grilla de `paso_min` de cada bloque) donde la cadena entra contigua."""
+    total = cadena.duracion
+    paso = timedelta(minutes=paso_min)
+    grupal = any(int(s.capacidad or 1) > 1 for s in cadena.servicios)
+    out: List[datetime] = []
+    dia = desde
+    while dia <= hasta:
+        base = datetime.combine(dia, dt_time.min)
+        for m0, m1 in agenda.bloques(dia):
+            b0, b1 = base + timedelta(minutes=m0), base + timedelta(minutes=m1)
+            tramos = [(b0, b1)] if grupal else oc.tramos(b0, b1)
+            for h0, h1 in tramos:
+                # primer punto de la grilla del bloque dentro del tramo
+                k = -(-(h0 - b0) // paso)
+                t = b0 + k * paso
+                while t + total <= h1:
+                    if cadena.entra(oc, t):
+                        out.append(t)
+                    t += paso
+        dia += timedelta(days=1)
+    return out
@@ -0,0 +1,63 @@
+# app/crud/empaque.py
+"""
+Ranking de horarios por empaque: cuánto tiempo invendible deja cada inicio.
+
+Un turno [a, b) que cae dentro de un hueco libre [h0, h1) lo parte en dos
+restos, h0..a y b..h1. De cada resto se puede vender lo que se arma con las
+duraciones de los servicios del emprendedor (mochila no acotada); lo que
+sobra es desperdicio. Ej.: servicios de 30 y 60, un resto de 45 → 15 min
+perdidos; un resto de 90 → 0.
+
+La tabla vendible(minutos) se arma una vez por pedido en unidades del MCD
+de las duraciones (O(día/mcd · servicios)); después cada candidato es un
+bisect para encontrar su hueco más dos lecturas de la tabla. Huecos e
+inicios van en minutos enteros (app/tiempo.py).
+"""
+from __future__ import annotations
+from bisect import bisect_right
+from math import gcd
+from typing import Iterable, List, Tuple
+
+from app.crud.capacidad import IntervaloMin
+
+MINUTOS_DIA = 24 * 60
+
+
+class Empaque:
+    def __init__(self, duraciones: Iterable[int], tope_min: int = MINUTOS_DIA):
+        durs = sorted({int(d) for d in duraciones if d and int(d) > 0})
+        self.unidad = 0
+        for d in durs:
+            self.unidad = gcd(self.unidad, d)
+        self.unidad = self.unidad or 1
+        n = tope_min // self.unidad
+        piezas = [d // self.unidad for d in durs]
+        # alcanzable[u]: se llena exactamente u unidades; vendible[u]: máximo ≤ u
+        alcanzable = [False] * (n + 1)
+        alcanzable[0] = True
+        for u in range(1, n + 1):
+            alcanzable[u] = any(p <= u and alcanzable[u - p] for p in piezas)
+        self.vendible = [0] * (n + 1)
+        for u in range(1, n + 1):
+            self.vendible[u] = u if alcanzable[u] else self.vendible[u - 1]
+
+    def desperdicio(self, minutos: int) -> int:
+        """Minutos de un resto libre que no se pueden vender con ningún combo de servicios."""
+        if minutos <= 0:
+            return 0
+        u = min(minutos // self.unidad, len(self.vendible) - 1)
+        return minutos - self.vendible[u] * self.unidad
+
+    def puntaje(self, hueco: IntervaloMin, a: int, b: int) -> Tuple[int, int]:
+        """(desperdicio total, cantidad de restos): menor es mejor empaquetado."""
+        izq = a - hueco[0]
+        der = hueco[1] - b
+        return self.desperdicio(izq) + self.desperdicio(der), (izq > 0) + (der > 0)
+
+
+def hueco_de(huecos: List[IntervaloMin], inicios: List[int], a: int, b: int):
+    """Hueco (de una lista ordenada y disjunta) que contiene [a, b), o None."""
+    k = bisect_right(inicios, a) - 1
+    if k >= 0 and huecos[k][1] >= b:
+        return huecos[k]
+    return None
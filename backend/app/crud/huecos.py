@@ -0,0 +1,278 @@
+# app/crud/huecos.py
+"""
+Índice de huecos libres para la búsqueda del directorio ("¿quién tiene un
+turno libre hoy después de las 18?") sin calcular la disponibilidad de
+cada emprendedor en cada búsqueda.
+
+- Tabla `huecos_libres`: tramos maximales libres (agenda efectiva menos
+  ocupación, con capacidad) de los próximos HORIZONTE_DIAS días, sólo los
+  que alcanzan para el servicio más corto del emprendedor. Acotada:
+  a lo sumo MAX_POR_DIA tramos por día y emprendedor.
+- Refresco incremental: un before_flush anota qué (emprendedor, días)
+  tocó la transacción (turnos, series, horarios, excepciones, recursos,
+  servicios) y al commit se recalculan sólo esos días, en otra sesión.
+  Los caminos masivos (executemany, query.delete) llaman a marcar().
+- Los días que van entrando al horizonte se agregan con extender(), en un
+  hilo de fondo que arranca con la app y repite cada EXTENDER_S segundos
+  (la búsqueda sólo lee; scripts/indexar_huecos.py reconstruye todo). "Hoy"
+  es el de la zona de cada emprendedor, igual que en refrescar().
+- Las retenciones de checkout no entran: duran minutos.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, inspect, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Emprendedor, Horario, HorarioExcepcion, HuecoLibre, Recurso, Servicio,
+    Turno, TurnoSerie, TurnoSerieExcepcion,
+)
+from app.crud.horarios import compilar_agenda
+from app.crud.turnos import cargar_ocupacion
+from app.tiempo import ahora_emprendedor, ahora_en
+
+log = logging.getLogger("turnera.huecos")
+
+HORIZONTE_DIAS = int(os.getenv("HUECOS_DIAS", "14"))
+MAX_POR_DIA = 48
+EXTENDER_LOTE = int(os.getenv("HUECOS_EXTENDER", "200"))
+EXTENDER_S = int(os.getenv("HUECOS_EXTENDER_S", "600"))   # 0 = sin hilo de fondo
+_CLAVE = "huecos_pendientes"
+Rango = Tuple[Optional[date], Optional[date]]   # (None, None) = todo el horizonte
+
+
+def _tope(hoy: date) -> date:
+    return hoy + timedelta(days=HORIZONTE_DIAS - 1)
+
+
+# ===== Cálculo =====
+def refrescar(db: Session, emp_id: int, desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+    """Recalcula los huecos de [desde, hasta] ∩ horizonte. Sin rango: todo el horizonte.
+
+    No hace commit. Devuelve la cantidad de tramos insertados.
+    """
+    ahora = ahora_emprendedor(db, emp_id)
+    hoy = ahora.date()
+    tope = _tope(hoy)
+    d0, d1 = max(desde or hoy, hoy), min(hasta or tope, tope)
+    a = datetime.combine(d0, dt_time.min)
+    b = datetime.combine(d1 + timedelta(days=1), dt_time.min)
+
+    db.execute(delete(HuecoLibre).where(
+        HuecoLibre.emprendedor_id == emp_id,
+        or_(HuecoLibre.fin <= ahora, and_(HuecoLibre.inicio >= a, HuecoLibre.inicio < b)),
+    ))
+    filas: List[dict] = []
+    min_dur = db.query(func.min(Servicio.duracion_min)).filter(
+        Servicio.emprendedor_id == emp_id, Servicio.activo == True,  # noqa: E712
+    ).scalar()
+    if d0 <= d1 and min_dur:
+        agenda = compilar_agenda(db, emp_id, d0, d1)
+        oc = cargar_ocupacion(db, emp_id, a, b, con_retenciones=False)
+        minimo = timedelta(minutes=int(min_dur))
+        dia = d0
+        while dia <= d1:
+            base = datetime.combine(dia, dt_time.min)
+            n = 0
+            for m0, m1 in agenda.bloques(dia):
+                x0 = max(base + timedelta(minutes=m0), ahora)
+                x1 = base + timedelta(minutes=m1)
+                if x1 - x0 < minimo:
+                    continue
+                for i, f in oc.tramos(x0, x1):
+                    if f - i >= minimo and n < MAX_POR_DIA:
+                        filas.append({"emprendedor_id": emp_id, "inicio": i, "fin": f,
+                                      "minutos": int((f - i).total_seconds() // 60)})
+                        n += 1
+            dia += timedelta(days=1)
+    if filas:
+        db.execute(insert(HuecoLibre), filas)
+    if desde is None and hasta is None:
+        db.execute(update(Emprendedor).where(Emprendedor.id == emp_id).values(huecos_hasta=tope)
+                   .execution_options(synchronize_session=False))
+    return len(filas)
+
+
+def extender(db: Session, limite: Optional[int] = None) -> int:
+    """Completa el horizonte de los emprendedores atrasados (los más atrasados primero). Hace commit.
+
+    El horizonte de cada uno termina en su propio hoy (zona del emprendedor):
+    el SELECT trae los atrasados respecto del día más adelantado posible y
+    los que ya están al día en su zona se saltean. Devuelve cuántos extendió.
+    """
+    lejano = _tope(datetime.now(timezone.utc).date() + timedelta(days=1))
+    q = select(Emprendedor.id, Emprendedor.huecos_hasta, Emprendedor.zona_horaria).where(
+        or_(Emprendedor.huecos_hasta.is_(None), Emprendedor.huecos_hasta < lejano)
+    ).order_by(Emprendedor.huecos_hasta.is_not(None), Emprendedor.huecos_hasta, Emprendedor.id)
+    hechos = 0
+    for emp_id, hasta, zona in db.execute(q).all():
+        if limite and hechos >= limite:
+            break
+        hoy = ahora_en(zona).date()
+        tope = _tope(hoy)
+        if hasta is not None and hasta >= tope:
+            continue
+        if hasta is None or hasta < hoy:
+            refrescar(db, emp_id)
+        else:
+            refrescar(db, emp_id, hasta + timedelta(days=1), tope)
+            db.execute(update(Emprendedor).where(Emprendedor.id == emp_id).values(huecos_hasta=tope)
+                       .execution_options(synchronize_session=False))
+        hechos += 1
+    db.commit()
+    return hechos
+
+
+class Extensor:
+    """Hilo que corre extender() por lotes al arrancar y después cada `intervalo_s`."""
+
+    def __init__(self, intervalo_s: int = EXTENDER_S, lote: int = EXTENDER_LOTE):
+        self.intervalo_s = intervalo_s
+        self.lote = lote
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self, engine) -> None:
+        if self.intervalo_s <= 0 or self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(engine,), name="huecos", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
+            self._hilo = None
+
+    def pasada(self, engine) -> int:
+        n = 0
+        with Session(bind=engine) as db:
+            while not self._parar.is_set():
+                hechos = extender(db, limite=self.lote)
+                n += hechos
+                if hechos < self.lote:
+                    break
+        return n
+
+    def _bucle(self, engine) -> None:
+        while True:
+            try:
+                n = self.pasada(engine)
+                if n:
+                    log.info("Índice de huecos extendido: %s emprendedores", n)
+            except Exception:
+                log.exception("No se pudo extender el índice de huecos")
+            if self._parar.wait(self.intervalo_s):
+                return
+
+
+extensor = Extensor()
+
+
+# ===== Refresco incremental =====
+def marcar(db: Session, emp_id: int, desde: Optional[date] = None, hasta: Optional[date] = None) -> None:
+    """Anota días a recalcular al commit (para UPDATE/INSERT/DELETE masivos)."""
+    pend: Dict[int, List[Rango]] = db.info.setdefault(_CLAVE, {})
+    pend.setdefault(emp_id, []).append((desde, desde if hasta is None and desde else hasta))
+
+
+def _dias_turno(o: Turno) -> List[date]:
+    dias = [o.inicio.date()] if o.inicio else []
+    hist = inspect(o).attrs.inicio.history
+    dias += [x.date() for x in (hist.deleted or ()) if x]
+    return dias
+
+
+@event.listens_for(Session, "before_flush")
+def _anotar(session: Session, flush_context, instances) -> None:
+    for o in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(o, Turno) and o.emprendedor_id:
+            for d in _dias_turno(o):
+                marcar(session, o.emprendedor_id, d)
+        elif isinstance(o, HorarioExcepcion) and o.emprendedor_id and o.fecha:
+            marcar(session, o.emprendedor_id, o.fecha)
+        elif isinstance(o, (TurnoSerie, Horario, Recurso, Servicio)) and o.emprendedor_id:
+            marcar(session, o.emprendedor_id)
+        elif isinstance(o, TurnoSerieExcepcion) and o.serie_id:
+            with session.no_autoflush:
+                s = session.get(TurnoSerie, o.serie_id)
+            if s is not None and o.fecha:
+                marcar(session, s.emprendedor_id, o.fecha)
+
+
+def _unir(rangos: List[Rango]) -> Rango:
+    if any(d is None for d, _ in rangos):
+        return None, None
+    return min(d for d, _ in rangos), max(h for _, h in rangos)
+
+
+@event.listens_for(Session, "after_commit")
+def _refrescar_pendientes(session: Session) -> None:
+    pend = session.info.pop(_CLAVE, None)
+    if not pend:
+        return
+    # después del commit esta sesión no puede emitir SQL: se usa otra sobre el mismo engine
+    try:
+        with Session(bind=session.get_bind()) as s2:
+            for emp_id, rangos in pend.items():
+                d0, d1 = _unir(rangos)
+                if d0 is None:
+                    refrescar(s2, emp_id)
+                else:
+                    refrescar(s2, emp_id, d0, d1)
+            s2.commit()
+    except Exception:
+        log.exception("No se pudo refrescar el índice de huecos de %s", list(pend))
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
+
+
+# ===== Búsqueda =====
+def buscar(
+    db: Session,
+    desde: datetime,
+    hasta: datetime,
+    q: Optional[str] = None,
+    rubro: Optional[str] = None,
+    duracion_min: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Tuple[Emprendedor, datetime]]:
+    """Emprendedores con un hueco en [desde, hasta), ordenados por el primero.
+
+    Un solo GROUP BY sobre el índice (inicio): los tramos duran a lo sumo un
+    día, así que alcanza con mirar los que empiezan desde `desde - 1 día`.
+    El primer hueco útil de cada uno es max(min(inicio), desde).
+    """
+    dur = timedelta(minutes=int(duracion_min or 0))
+    conds = [
+        HuecoLibre.inicio >= desde - timedelta(days=1),
+        HuecoLibre.inicio <= hasta - dur,
+        HuecoLibre.fin > desde,
+        HuecoLibre.fin >= desde + dur,
+    ]
+    if duracion_min:
+        conds.append(HuecoLibre.minutos >= int(duracion_min))
+    primero = func.min(HuecoLibre.inicio)
+    efectivo = case((primero < desde, literal(desde, HuecoLibre.inicio.type)), else_=primero)
+    qry = (
+        db.query(Emprendedor, primero)
+        .join(HuecoLibre, HuecoLibre.emprendedor_id == Emprendedor.id)
+        .filter(*conds)
+    )
+    if q:
+        like = f"%{q.strip()}%"
+        qry = qry.filter(or_(Emprendedor.nombre.ilike(like), Emprendedor.rubro.ilike(like)))
+    if rubro:
+        qry = qry.filter(Emprendedor.rubro == rubro)
+    filas = qry.group_by(Emprendedor.id).order_by(efectivo, Emprendedor.id).offset(offset).limit(limit).all()
+    return [(e, max(p, desde)) for e, p in filas]
@@ -0,0 +1,198 @@
+# app/crud/series.py
+"""
+Series de turnos recurrentes (TurnoSerie).
+
+Las ocurrencias NO se materializan: se calculan para la ventana que se
+consulta (mis_turnos, disponibilidad pública, hay_conflicto). La expansión
+salta directo a la primera semana/día de la ventana, así el costo depende
+del tamaño de la ventana y no de la antigüedad de la serie.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app import retenciones
+from app.crud.capacidad import armar_ocupacion, cupos_servicios, recursos_activos
+from app.crud.horarios import compilar_agenda
+from app.models import Turno, TurnoSerie, TurnoSerieExcepcion
+
+FRECUENCIAS = ("diaria", "semanal")
+MAX_OCURRENCIAS = 1000          # tope para 'conteo'
+VALIDAR_SEMANAS = 52            # horizonte de validación de una serie sin fin
+
+
+@dataclass
+class Ocurrencia:
+    serie: TurnoSerie
+    inicio: datetime
+    fin: datetime
+
+
+# ===== Regla =====
+def dias_python(serie: TurnoSerie) -> List[int]:
+    """Días de la regla en convención Python (0=Lun). dias_semana usa 0=Dom como Horario."""
+    if serie.dias_semana:
+        dom0 = {int(x) for x in serie.dias_semana.split(",") if x.strip() != ""}
+    else:
+        dom0 = {(serie.inicio.weekday() + 1) % 7}
+    return sorted((d - 1) % 7 for d in dom0)
+
+
+def regla_rrule(serie: TurnoSerie) -> str:
+    """Representación RRULE (informativa) de la serie."""
+    nombres = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+    partes = [f"FREQ={'WEEKLY' if serie.frecuencia == 'semanal' else 'DAILY'}", f"INTERVAL={serie.intervalo}"]
+    if serie.frecuencia == "semanal":
+        partes.append("BYDAY=" + ",".join(nombres[d] for d in dias_python(serie)))
+    if serie.hasta:
+        partes.append(f"UNTIL={serie.hasta:%Y%m%d}")
+    return ";".join(partes)
+
+
+def expandir(
+    serie: TurnoSerie,
+    desde: datetime,
+    hasta: datetime,
+    excepciones: Optional[Set[date]] = None,
+) -> Iterator[Tuple[datetime, datetime]]:
+    """Ocurrencias (inicio, fin) que se superponen con [desde, hasta)."""
+    dur = timedelta(minutes=int(serie.duracion_min))
+    hora = serie.inicio.time()
+    d0 = serie.inicio.date()
+    n = max(1, int(serie.intervalo or 1))
+    ultimo = hasta.date()
+    if serie.hasta and serie.hasta < ultimo:
+        ultimo = serie.hasta
+    excepciones = excepciones or set()
+    primero = (desde - dur).date()   # una ocurrencia que empezó antes puede seguir dentro
+
+    def _emitir(dia: date):
+        if dia < d0 or dia > ultimo or dia in excepciones:
+            return None
+        ini = datetime.combine(dia, hora)
+        if ini < hasta and ini + dur > desde:
+            return ini, ini + dur
+        return None
+
+    if serie.frecuencia == "diaria":
+        k = max(0, -(-(primero - d0).days // n))   # ceil
+        dia = d0 + timedelta(days=k * n)
+        while dia <= ultimo:
+            oc = _emitir(dia)
+            if oc:
+                yield oc
+            dia += timedelta(days=n)
+        return
+
+    # semanal: semanas ancladas al lunes de DTSTART, cada `n` semanas
+    lunes0 = d0 - timedelta(days=d0.weekday())
+    semana = max(0, (primero - lunes0).days // 7)
+    semana = -(-semana // n) * n                     # redondeo hacia arriba al múltiplo de n
+    dias = dias_python(serie)
+    lunes = lunes0 + timedelta(weeks=semana)
+    while lunes <= ultimo:
+        for wd in dias:
+            oc = _emitir(lunes + timedelta(days=wd))
+            if oc:
+                yield oc
+        lunes += timedelta(weeks=n)
+
+
+def hasta_por_conteo(serie: TurnoSerie, conteo: int) -> date:
+    """Fecha de la ocurrencia número `conteo` (COUNT → UNTIL)."""
+    conteo = max(1, min(int(conteo), MAX_OCURRENCIAS))
+    desde = serie.inicio
+    paso = timedelta(days=7 * max(1, serie.intervalo) * (conteo + 1)) if serie.frecuencia == "semanal" \
+        else timedelta(days=max(1, serie.intervalo) * (conteo + 1))
+    ultimo = None
+    for k, (ini, _) in enumerate(expandir(serie, desde, desde + paso), start=1):
+        ultimo = ini.date()
+        if k == conteo:
+            break
+    return ultimo or serie.inicio.date()
+
+
+# ===== Consultas =====
+def series_en_rango(db: Session, emp_id: int, desde: datetime, hasta: datetime,
+                    excluir: Optional[int] = None) -> List[TurnoSerie]:
+    q = db.query(TurnoSerie).filter(
+        TurnoSerie.emprendedor_id == emp_id,
+        TurnoSerie.inicio < hasta,
+        or_(TurnoSerie.hasta.is_(None), TurnoSerie.hasta >= (desde - timedelta(days=1)).date()),
+    )
+    if excluir:
+        q = q.filter(TurnoSerie.id != excluir)
+    return q.all()
+
+
+def _excepciones(db: Session, series: Sequence[TurnoSerie], desde: datetime, hasta: datetime) -> Dict[int, Set[date]]:
+    if not series:
+        return {}
+    out: Dict[int, Set[date]] = {}
+    filas = db.query(TurnoSerieExcepcion.serie_id, TurnoSerieExcepcion.fecha).filter(
+        TurnoSerieExcepcion.serie_id.in_([s.id for s in series]),
+        TurnoSerieExcepcion.fecha >= (desde - timedelta(days=1)).date(),
+        TurnoSerieExcepcion.fecha <= hasta.date(),
+    )
+    for sid, f in filas:
+        out.setdefault(sid, set()).add(f)
+    return out
+
+
+def ocurrencias_en_rango(db: Session, emp_id: int, desde: datetime, hasta: datetime,
+                         excluir: Optional[int] = None) -> List[Ocurrencia]:
+    series = series_en_rango(db, emp_id, desde, hasta, excluir)
+    exc = _excepciones(db, series, desde, hasta)
+    out = [
+        Ocurrencia(s, ini, fin)
+        for s in series
+        for ini, fin in expandir(s, desde, hasta, exc.get(s.id))
+    ]
+    out.sort(key=lambda o: o.inicio)
+    return out
+
+
+def hay_conflicto_series(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> bool:
+    return bool(ocurrencias_en_rango(db, emp_id, inicio, fin))
+
+
+# ===== Validación en lote de una serie nueva =====
+def validar_serie(db: Session, serie: TurnoSerie, horizonte: Optional[date] = None) -> Tuple[List[datetime], List[datetime]]:
+    """Valida todas las ocurrencias de una vez. Devuelve (fuera_de_horario, en_conflicto).
+
+    Cantidad fija de consultas (horarios y excepciones, turnos, otras series
+    del rango, recursos), sin importar cuántas ocurrencias tenga la serie; la
+    ocupación se arma una vez (sweep-line de crud/capacidad.py).
+    """
+    desde = serie.inicio
+    fin_val = serie.hasta or horizonte or (desde.date() + timedelta(weeks=VALIDAR_SEMANAS))
+    hasta = datetime.combine(fin_val + timedelta(days=1), datetime.min.time())
+    ocs = list(expandir(serie, desde, hasta))
+    if not ocs:
+        return [], []
+
+    a0, b0 = ocs[0][0], ocs[-1][1]
+    agenda = compilar_agenda(db, serie.emprendedor_id, a0.date(), b0.date())
+
+    turnos = db.query(Turno.servicio_id, Turno.recurso_id, Turno.inicio, Turno.fin).filter(
+        Turno.emprendedor_id == serie.emprendedor_id,
+        Turno.inicio < b0, Turno.fin > a0, Turno.estado == "reservado",
+    ).all()
+    otros = [(o.serie.servicio_id, o.inicio, o.fin)
+             for o in ocurrencias_en_rango(db, serie.emprendedor_id, a0, b0, excluir=serie.id)]
+    otros += [(r.servicio_id, r.inicio, r.fin) for r in retenciones.store.activas(db, serie.emprendedor_id, None, None)]
+    cupos = cupos_servicios(db, serie.emprendedor_id)
+    oc = armar_ocupacion(recursos_activos(db, serie.emprendedor_id), cupos, turnos, otros)
+    cupo = cupos.get(serie.servicio_id, 1)
+
+    fuera, conflicto = [], []
+    for ini, fin in ocs:
+        if not agenda.contiene(ini, fin):
+            fuera.append(ini)
+        elif not oc.hay_lugar(serie.servicio_id, cupo, ini, fin):
+            conflicto.append(ini)
+    return fuera, conflicto
@@ -1,18 +1,130 @@
 from __future__ import annotations
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Collection, Dict, List, Optional
 from sqlalchemy.orm import Session
 
-from app.models import Turno
+from app.models import Recurso, Servicio, Turno
+from app import retenciones
+from app.tiempo import MAX_TURNO_MIN, a_min
+from app.crud.horarios import compilar_agenda
+from app.crud.capacidad import Ocupacion, armar_ocupacion, cupos_servicios, recursos_activos
+from app.crud.series import hay_conflicto_series, ocurrencias_en_rango
 
-def hay_conflicto(db: Session, emp_id: int, inicio: datetime, fin: datetime) -> bool:
+def solapan_min(emp_id: int, a: int, b: int) -> tuple:
+    """Filtros de "turno que se superpone con [a, b)" en minutos, acotados para el índice
+    ix_turnos_emp_min: un turno no dura más de un día, así que empieza después de a - MAX_TURNO_MIN."""
+    return (Turno.emprendedor_id == emp_id, Turno.inicio_min > a - MAX_TURNO_MIN,
+            Turno.inicio_min < b, Turno.fin_min > a)
+
+
+def cargar_ocupacion(db: Session, emp_id: int, desde: datetime, hasta: datetime,
+                     retencion: Optional[str] = None, recursos: Optional[int] = None,
+                     cupos: Optional[Dict[int, int]] = None, con_retenciones: bool = True,
+                     excluir: Collection[int] = ()) -> Ocupacion:
+    """Ocupación de [desde, hasta): turnos reservados (salvo los ids de `excluir`),
+    ocurrencias de series y retenciones vigentes (salvo la del token `retencion`),
+    en un solo sweep."""
+    if recursos is None:
+        recursos = recursos_activos(db, emp_id)
+    if cupos is None:
+        cupos = cupos_servicios(db, emp_id)
+    a, b = a_min(desde), a_min(hasta)
+    turnos = [
+        (sid, rid, x, y) for tid, sid, rid, x, y in db.query(
+            Turno.id, Turno.servicio_id, Turno.recurso_id, Turno.inicio_min, Turno.fin_min,
+        ).filter(*solapan_min(emp_id, a, b), Turno.estado == "reservado")
+        if tid not in excluir
+    ]
+    otros = [(o.serie.servicio_id, o.inicio, o.fin) for o in ocurrencias_en_rango(db, emp_id, desde, hasta)]
+    if con_retenciones:
+        otros += [
+            (r.servicio_id, r.inicio, r.fin) for r in retenciones.store.activas(db, emp_id, None, None)
+            if r.token != retencion and r.inicio < hasta and r.fin > desde
+        ]
+    return armar_ocupacion(recursos, cupos, turnos, otros)
+
+
+def hay_conflicto(db: Session, emp_id: int, inicio: datetime, fin: datetime,
+                  retencion: Optional[str] = None, servicio: Optional[Servicio] = None,
+                  recurso_id: Optional[int] = None) -> bool:
     """
     Superposición de intervalos:
     A.inicio < B.fin  y  A.fin > B.inicio
+    También cuentan las retenciones vigentes, salvo la del token `retencion`
+    (la de quien está confirmando), y las ocurrencias de series recurrentes.
+    Con varios recursos, un servicio grupal o un recurso pedido, el conflicto
+    es "no queda lugar" (ver crud/capacidad.py).
     """
-    q = db.query(Turno).filter(Turno.emprendedor_id == emp_id)
-    q = q.filter(Turno.inicio < fin, Turno.fin > inicio)
-    try:
-        q = q.filter(Turno.estado == "reservado")
-    except Exception:
-        pass
+    cupo = int(getattr(servicio, "capacidad", 1) or 1)
+    recursos = recursos_activos(db, emp_id)
+    if recursos > 1 or cupo > 1 or recurso_id:
+        oc = cargar_ocupacion(db, emp_id, inicio, fin, retencion, recursos=recursos)
+        return not oc.hay_lugar(getattr(servicio, "id", None), cupo, inicio, fin, recurso_id)
+
+    if retenciones.store.solapa(db, emp_id, inicio, fin, retencion):
+        return True
+    if hay_conflicto_series(db, emp_id, inicio, fin):
+        return True
+    q = db.query(Turno.id).filter(*solapan_min(emp_id, a_min(inicio), a_min(fin)), Turno.estado == "reservado")
     return db.query(q.exists()).scalar()
+
+
+# ===== Lote (POST /turnos/batch) =====
+@dataclass
+class Candidato:
+    servicio_id: int
+    inicio: datetime
+    recurso_id: Optional[int] = None
+    fin: Optional[datetime] = None
+    error: Optional[str] = None
+    status: int = 200
+
+
+def validar_lote(db: Session, emp_id: int, candidatos: List[Candidato]) -> List[Candidato]:
+    """Valida N candidatos juntos y completa fin/error/status de cada uno.
+
+    Carga servicios, recursos y la agenda compilada (horarios + excepciones)
+    una vez, la ocupación del rango total con un solo sweep (turnos, series y
+    retenciones) y detecta también falta de lugar causada por el mismo lote
+    (el primero en la lista gana).
+    """
+    svcs = {s.id: s for s in db.query(Servicio).filter(Servicio.emprendedor_id == emp_id)}
+    recs = {rid for (rid,) in db.query(Recurso.id).filter(Recurso.emprendedor_id == emp_id, Recurso.activo == True)}  # noqa: E712
+    agenda = None
+    if candidatos:
+        agenda = compilar_agenda(db, emp_id, min(c.inicio for c in candidatos).date(),
+                                 max(c.inicio for c in candidatos).date())
+
+    for c in candidatos:
+        s = svcs.get(c.servicio_id)
+        if not s:
+            c.error, c.status = "Servicio no encontrado", 404
+            continue
+        if c.recurso_id and c.recurso_id not in recs:
+            c.error, c.status = "Recurso no encontrado", 404
+            continue
+        c.fin = c.inicio + timedelta(minutes=int(s.duracion_min))
+        if not agenda.contiene(c.inicio, c.fin):
+            c.error, c.status = "Fuera de horario", 409
+
+    validos = [c for c in candidatos if c.error is None]
+    if not validos:
+        return candidatos
+    a0 = min(c.inicio for c in validos)
+    b0 = max(c.fin for c in validos)
+    cupos = {sid: int(x.capacidad or 1) for sid, x in svcs.items()}
+    base = cargar_ocupacion(db, emp_id, a0, b0, recursos=max(1, len(recs)),
+                            cupos={k: v for k, v in cupos.items() if v > 1})
+
+    # lo aceptado del lote se va sumando a una copia de la ocupación
+    oc = base.copia()
+    for c in validos:
+        cupo = cupos.get(c.servicio_id, 1)
+        if oc.hay_lugar(c.servicio_id, cupo, c.inicio, c.fin, c.recurso_id):
+            oc.ocupar(c.servicio_id, cupo, c.inicio, c.fin, c.recurso_id)
+        elif not base.hay_lugar(c.servicio_id, cupo, c.inicio, c.fin, c.recurso_id):
+            c.error, c.status = "Horario no disponible", 409
+        else:
+            c.error, c.status = "Se superpone con otro turno del lote", 409
+    return candidatos
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from .database import SessionLocal
 from .models import Usuario
 from .auth import decode_access_token
+from .perfilado import medir_auth
 
 
 def get_db():
@@ -33,7 +34,13 @@ def get_current_user(
     """Compatibilidad total:
     - Tokens 'dev-*' para desarrollo.
     - JWT real (producción) si existe decode_access_token.
+    El tiempo se reporta como 'auth' en Server-Timing.
     """
+    with medir_auth():
+        return _resolver_usuario(authorization, db)
+
+
+def _resolver_usuario(authorization: str | None, db: Session) -> Usuario:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Falta token")
 
@@ -59,3 +66,12 @@ def get_current_user(
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
     return user
+
+
+def require_roles(roles: list[str]):
+    """Dependencia: exige que el usuario autenticado tenga alguno de los roles dados."""
+    def _dep(user: Usuario = Depends(get_current_user)) -> Usuario:
+        if (user.rol or "cliente") not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
+        return user
+    return _dep
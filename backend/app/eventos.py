@@ -0,0 +1,170 @@
+# app/eventos.py
+"""
+Pub/sub en proceso para eventos de agenda por emprendedor (SSE).
+
+- publicar(): se llama DESPUÉS del commit desde handlers sync (threadpool)
+  o async; es thread-safe y no bloquea.
+- suscribir()/desuscribir(): una cola asyncio por conexión SSE. Una
+  conexión ociosa es sólo una corrutina esperando en su cola: escala a
+  miles por worker.
+- Cada emprendedor guarda los últimos N eventos (ring buffer) para que un
+  cliente que reconecta con Last-Event-ID reciba lo que se perdió; si ya
+  no están en el buffer se le manda "reset" (refrescar todo).
+- El id SSE es "<época>-<seq>": la época se sortea al crear el bus, así que
+  un Last-Event-ID de antes de un reinicio (o de otro worker, donde el mismo
+  seq es otro evento) no se confunde con uno propio y también da "reset".
+
+Alcance: un proceso. Con varios workers cada uno tiene su propio bus.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+log = logging.getLogger("turnera.eventos")
+
+BUFFER_POR_EMP = int(os.getenv("EVENTOS_BUFFER", "256"))
+MAX_EMPS_BUFFER = int(os.getenv("EVENTOS_MAX_EMPS", "10000"))
+COLA_MAX = 1000
+
+Evento = Tuple[int, str, Dict[str, Any]]  # (id, tipo, data)
+
+
+@dataclass(eq=False)
+class Suscriptor:
+    emp_id: int
+    loop: asyncio.AbstractEventLoop
+    cola: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(COLA_MAX))
+    desbordado: bool = False
+
+
+@dataclass
+class _Buffer:
+    eventos: Deque[Evento] = field(default_factory=lambda: deque(maxlen=BUFFER_POR_EMP))
+    descartado_hasta: int = 0      # id del último evento que se cayó del buffer
+
+
+class BusEventos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.epoca = secrets.token_hex(4)   # distinta en cada arranque: los seq vuelven a 1
+        self._seq = 0
+        self._buffers: "OrderedDict[int, _Buffer]" = OrderedDict()
+        self._descartado_global = 0    # último id de buffers desalojados por LRU
+        self._subs: Dict[int, Set[Suscriptor]] = {}
+
+    # ----- publicar -----
+    def publicar(self, emp_id: int, tipo: str, data: Dict[str, Any]) -> int:
+        with self._lock:
+            self._seq += 1
+            ev: Evento = (self._seq, tipo, data)
+            buf = self._buffers.get(emp_id)
+            if buf is None:
+                buf = self._buffers[emp_id] = _Buffer()
+                if len(self._buffers) > MAX_EMPS_BUFFER:
+                    _, viejo = self._buffers.popitem(last=False)
+                    if viejo.eventos:
+                        self._descartado_global = max(self._descartado_global, viejo.eventos[-1][0])
+            else:
+                self._buffers.move_to_end(emp_id)
+            if len(buf.eventos) == buf.eventos.maxlen:
+                buf.descartado_hasta = buf.eventos[0][0]
+            buf.eventos.append(ev)
+            subs = list(self._subs.get(emp_id, ()))
+
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(_entregar, sub, ev)
+            except RuntimeError:  # loop cerrado
+                self.desuscribir(sub)
+        return ev[0]
+
+    # ----- suscripción -----
+    def suscribir(self, emp_id: int, ultimo_id: Optional[str]) -> Tuple[Suscriptor, List[Evento], bool]:
+        """Registra la conexión y devuelve (suscriptor, eventos a reenviar, reset?).
+
+        `ultimo_id` es el Last-Event-ID tal cual ("<época>-<seq>"). reset=True
+        cuando no se puede garantizar la continuidad desde ahí: eventos ya
+        descartados, o un id de otra época (reinicio u otro proceso).
+        """
+        sub = Suscriptor(emp_id=emp_id, loop=asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(emp_id, set()).add(sub)
+            buf = self._buffers.get(emp_id)
+            eventos = list(buf.eventos) if buf else []
+            descartado = buf.descartado_hasta if buf else self._descartado_global
+            seq = self._seq
+        if not ultimo_id:
+            return sub, [], False
+        epoca, _, seq_raw = ultimo_id.strip().rpartition("-")
+        if epoca != self.epoca or not seq_raw.isdigit():
+            return sub, [], True
+        ultimo = int(seq_raw)
+        if ultimo > seq or ultimo < descartado:
+            return sub, [], True
+        return sub, [ev for ev in eventos if ev[0] > ultimo], False
+
+    def desuscribir(self, sub: Suscriptor) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.emp_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    self._subs.pop(sub.emp_id, None)
+
+    def conexiones(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+
+def _entregar(sub: Suscriptor, ev: Evento) -> None:
+    try:
+        sub.cola.put_nowait(ev)
+    except asyncio.QueueFull:
+        sub.desbordado = True
+
+
+bus = BusEventos()
+
+
+# ===== Helpers de dominio =====
+def _iso(x: Any) -> Any:
+    return x.isoformat() if isinstance(x, datetime) else x
+
+
+def publicar_turno(tipo: str, t: Any) -> None:
+    """tipo: 'ocupado' | 'liberado'. Payload compacto y sin datos del cliente."""
+    try:
+        bus.publicar(t.emprendedor_id, tipo, {
+            "id": t.id,
+            "servicio_id": t.servicio_id,
+            "inicio": _iso(t.inicio),
+            "fin": _iso(t.fin),
+        })
+    except Exception:
+        log.exception("No se pudo publicar el evento %s del turno %s", tipo, getattr(t, "id", None))
+
+
+def publicar_retencion(tipo: str, r: Any) -> None:
+    """tipo: 'retenido' | 'liberado'. El id lleva prefijo 'r' para no chocar con turnos."""
+    try:
+        bus.publicar(r.emprendedor_id, tipo, {
+            "id": f"r{r.id}",
+            "inicio": _iso(r.inicio),
+            "fin": _iso(r.fin),
+            "expira": _iso(r.expira),
+        })
+    except Exception:
+        log.exception("No se pudo publicar el evento %s de la retención %s", tipo, getattr(r, "id", None))
+
+
+def formato_sse(ev: Evento, epoca: str) -> str:
+    ev_id, tipo, data = ev
+    return f"id: {epoca}-{ev_id}\nevent: {tipo}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
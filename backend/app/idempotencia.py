@@ -0,0 +1,224 @@
+# app/idempotencia.py
+"""
+Idempotency-Key para los POST de reserva.
+
+Un cliente que reintenta (red inestable) manda el mismo header
+`Idempotency-Key`; la primera respuesta se guarda y los reintentos la
+reciben tal cual, sin volver a ejecutar validaciones ni crear otro turno.
+
+- Store en dos niveles: LRU en memoria (acotado) + tabla `idempotencia`
+  con vencimiento (`expira_at`), compartida entre workers.
+- Duplicados concurrentes en el mismo proceso esperan a la ejecución en
+  curso (un Future por clave). Entre workers, la fila "en_curso" hace de
+  candado: el segundo recibe 409 con Retry-After.
+- La clave se combina con método, ruta y Authorization; si se reusa con
+  otro body → 422. Las respuestas 5xx no se guardan (se pueden reintentar).
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.models import IdempotenciaRegistro
+
+log = logging.getLogger("turnera.idempotencia")
+
+HEADER = "idempotency-key"
+RUTAS = {
+    ("POST", "/publico/turnos"),
+    ("POST", "/publico/turnos/cadena"),
+    ("POST", "/turnos"),
+    ("POST", "/turnos/publico"),
+    ("POST", "/turnos/batch"),
+}
+TTL = timedelta(hours=int(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24")))
+TTL_EN_CURSO = timedelta(seconds=60)   # si el worker murió a mitad, otro puede retomar
+LRU_MAX = int(os.getenv("IDEMPOTENCIA_LRU", "10000"))
+MAX_CLAVE = 255
+
+
+@dataclass
+class Guardada:
+    huella_body: str
+    status: int
+    body: bytes
+    media_type: Optional[str]
+    expira: datetime
+
+
+def _clave(request: Request, key: str) -> str:
+    auth = request.headers.get("authorization", "")
+    base = f"{request.method} {request.url.path}\n{auth}\n{key}"
+    return hashlib.sha256(base.encode()).hexdigest()
+
+
+def _huella(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+# ===== Nivel 1: LRU en memoria =====
+class _LRU:
+    def __init__(self, maximo: int):
+        self._max = maximo
+        self._d: "OrderedDict[str, Guardada]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[Guardada]:
+        with self._lock:
+            g = self._d.get(clave)
+            if g is None:
+                return None
+            if g.expira <= datetime.utcnow():
+                self._d.pop(clave, None)
+                return None
+            self._d.move_to_end(clave)
+            return g
+
+    def put(self, clave: str, g: Guardada) -> None:
+        with self._lock:
+            self._d[clave] = g
+            self._d.move_to_end(clave)
+            while len(self._d) > self._max:
+                self._d.popitem(last=False)
+
+
+lru = _LRU(LRU_MAX)
+_en_vuelo: Dict[str, "asyncio.Future[Guardada]"] = {}
+
+
+# ===== Nivel 2: tabla =====
+def _tomar(clave: str, huella: str) -> Tuple[str, Optional[Guardada]]:
+    """Intenta reservar la clave en la tabla.
+
+    Devuelve ("nueva", None) si este request la ejecuta, ("hecha", g) si ya
+    hay respuesta guardada o ("en_curso", None) si otro worker la está
+    ejecutando.
+    """
+    ahora = datetime.utcnow()
+    with SessionLocal() as db:
+        # una sola fila por clave: las vencidas se reemplazan al llegar
+        db.execute(delete(IdempotenciaRegistro).where(
+            IdempotenciaRegistro.clave == clave, IdempotenciaRegistro.expira_at <= ahora
+        ))
+        db.add(IdempotenciaRegistro(
+            clave=clave, huella_body=huella, estado="en_curso", expira_at=ahora + TTL_EN_CURSO,
+        ))
+        try:
+            db.commit()
+            return "nueva", None
+        except IntegrityError:
+            db.rollback()
+        r = db.scalars(select(IdempotenciaRegistro).where(IdempotenciaRegistro.clave == clave)).first()
+        if r is None:                       # se borró entre medio: que reintente
+            return "en_curso", None
+        if r.estado != "hecha":
+            return "en_curso", None
+        return "hecha", Guardada(r.huella_body, r.status, r.body or b"", r.media_type, r.expira_at)
+
+
+def _completar(clave: str, g: Optional[Guardada]) -> None:
+    with SessionLocal() as db:
+        if g is None:
+            db.execute(delete(IdempotenciaRegistro).where(IdempotenciaRegistro.clave == clave))
+        else:
+            db.execute(update(IdempotenciaRegistro).where(IdempotenciaRegistro.clave == clave).values(
+                estado="hecha", status=g.status, body=g.body, media_type=g.media_type, expira_at=g.expira,
+            ))
+        db.commit()
+
+
+def purgar_vencidas() -> int:
+    with SessionLocal() as db:
+        n = db.execute(delete(IdempotenciaRegistro).where(
+            IdempotenciaRegistro.expira_at <= datetime.utcnow()
+        )).rowcount
+        db.commit()
+        return n or 0
+
+
+# ===== Middleware =====
+def _replay(g: Guardada, huella: str) -> Response:
+    if g.huella_body != huella:
+        return JSONResponse(
+            status_code=422,
+            content={"detail": "Idempotency-Key reutilizada con otro contenido"},
+        )
+    return Response(content=g.body, status_code=g.status, media_type=g.media_type,
+                    headers={"Idempotent-Replayed": "true"})
+
+
+async def _ejecutar(request: Request, call_next, clave: str, huella: str) -> Tuple[Response, Optional[Guardada]]:
+    response = await call_next(request)
+    body = b"".join([c async for c in response.body_iterator])
+    g = None
+    if response.status_code < 500:
+        g = Guardada(huella, response.status_code, body, response.media_type or response.headers.get("content-type"),
+                     datetime.utcnow() + TTL)
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return Response(content=body, status_code=response.status_code, headers=headers), g
+
+
+async def middleware_idempotencia(request: Request, call_next):
+    key = request.headers.get(HEADER)
+    if not key or (request.method, request.url.path.rstrip("/") or "/") not in RUTAS:
+        return await call_next(request)
+    if len(key) > MAX_CLAVE:
+        return JSONResponse(status_code=400, content={"detail": "Idempotency-Key demasiado larga"})
+
+    huella = _huella(await request.body())
+    clave = _clave(request, key)
+
+    g = lru.get(clave)
+    if g is not None:
+        return _replay(g, huella)
+
+    # mismo proceso: colgarse de la ejecución en curso
+    fut = _en_vuelo.get(clave)
+    if fut is not None:
+        try:
+            g = await asyncio.shield(fut)
+        except Exception:
+            g = None
+        if g is not None:
+            return _replay(g, huella)
+        return JSONResponse(status_code=409, content={"detail": "Solicitud en curso, reintentar"},
+                            headers={"Retry-After": "1"})
+
+    fut = asyncio.get_running_loop().create_future()
+    _en_vuelo[clave] = fut
+    g = None
+    try:
+        estado, previa = await run_in_threadpool(_tomar, clave, huella)
+        if estado == "hecha":
+            lru.put(clave, previa)
+            g = previa
+            return _replay(previa, huella)
+        if estado == "en_curso":
+            return JSONResponse(status_code=409, content={"detail": "Solicitud en curso, reintentar"},
+                                headers={"Retry-After": "1"})
+        try:
+            response, g = await _ejecutar(request, call_next, clave, huella)
+        except BaseException:
+            await run_in_threadpool(_completar, clave, None)   # liberar la clave para reintentos
+            raise
+        if g is not None:
+            lru.put(clave, g)
+        await run_in_threadpool(_completar, clave, g)
+        return response
+    finally:
+        _en_vuelo.pop(clave, None)
+        if not fut.done():
+            fut.set_result(g)
@@ -0,0 +1,207 @@
+# app/instrumentacion.py
+"""
+Instrumentación SQL por request.
+
+- Eventos before/after_cursor_execute de SQLAlchemy: cuentan sentencias,
+  tiempo total en DB y huellas (fingerprints) repetidas.
+- Middleware HTTP: abre la medición al entrar y, al salir, avisa por log
+  si se cruzan umbrales o aparece un patrón N+1.
+- Sentencias lentas → log rotativo con la "forma" de los parámetros
+  (tipos, nunca valores).
+
+Todo se controla con `ajustes`, que se puede cambiar en caliente
+(ver /diagnostico/sql) sin reiniciar el proceso.
+"""
+from __future__ import annotations
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("turnera.sql")
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "si", "sí", "on")
+
+
+# ===== Ajustes (mutables en caliente) =====
+@dataclass
+class AjustesSQL:
+    activo: bool = _env_bool("SQL_INSTRUMENTACION", "0")
+    max_sentencias: int = int(os.getenv("SQL_MAX_SENTENCIAS", "15"))
+    max_db_ms: float = float(os.getenv("SQL_MAX_DB_MS", "200"))
+    umbral_n1: int = int(os.getenv("SQL_UMBRAL_N1", "5"))        # misma huella N veces en un request
+    lenta_ms: float = float(os.getenv("SQL_LENTA_MS", "100"))
+    log_lentas: str = os.getenv("SQL_LOG_LENTAS", "logs/sql_lentas.log")
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+ajustes = AjustesSQL()
+
+
+# ===== Medición por request =====
+@dataclass
+class MedicionSQL:
+    sentencias: int = 0
+    db_ms: float = 0.0
+    # huella -> [cantidad, ms acumulados, sql normalizado]
+    huellas: Dict[str, List[Any]] = field(default_factory=dict)
+
+    def repetidas(self, minimo: int) -> List[List[Any]]:
+        out = [v for v in self.huellas.values() if v[0] >= minimo]
+        return sorted(out, key=lambda v: -v[0])
+
+
+_medicion: ContextVar[Optional[MedicionSQL]] = ContextVar("medicion_sql", default=None)
+
+
+def medicion_actual() -> Optional[MedicionSQL]:
+    return _medicion.get()
+
+
+# ===== Huellas =====
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def huella(sql: str) -> str:
+    """Normaliza un SQL: sin literales, listas IN colapsadas y espacios simples."""
+    s = _RE_ESPACIOS.sub(" ", sql).strip()
+    s = _RE_STRINGS.sub("?", s)
+    s = _RE_NUMEROS.sub("?", s)
+    s = _RE_LISTAS.sub("(?+)", s)
+    return s
+
+
+def forma_parametros(params: Any, executemany: bool) -> str:
+    """Tipos de los parámetros bindeados (no los valores)."""
+    def _uno(p: Any) -> str:
+        if isinstance(p, dict):
+            return "{" + ", ".join(f"{k}:{type(v).__name__}" for k, v in p.items()) + "}"
+        if isinstance(p, (list, tuple)):
+            return "(" + ", ".join(type(v).__name__ for v in p) + ")"
+        return type(p).__name__
+
+    if executemany and isinstance(params, (list, tuple)):
+        return f"{len(params)}x {_uno(params[0]) if params else '()'}"
+    return _uno(params)
+
+
+# ===== Log de sentencias lentas (rotativo) =====
+_log_lentas: Optional[logging.Logger] = None
+_log_lentas_path: Optional[str] = None
+
+
+def _logger_lentas() -> logging.Logger:
+    global _log_lentas, _log_lentas_path
+    if _log_lentas is not None and _log_lentas_path == ajustes.log_lentas:
+        return _log_lentas
+
+    lg = logging.getLogger("turnera.sql.lentas")
+    lg.propagate = False
+    lg.setLevel(logging.INFO)
+    for h in list(lg.handlers):
+        lg.removeHandler(h)
+        h.close()
+    carpeta = os.path.dirname(ajustes.log_lentas)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    h = RotatingFileHandler(ajustes.log_lentas, maxBytes=5_000_000, backupCount=5, encoding="utf-8")
+    h.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))
+    lg.addHandler(h)
+
+    _log_lentas, _log_lentas_path = lg, ajustes.log_lentas
+    return lg
+
+
+# ===== Eventos de SQLAlchemy =====
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _medicion.get() is None:
+        return
+    conn.info.setdefault("t0_sql", []).append(time.perf_counter())
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    m = _medicion.get()
+    if m is None:
+        return
+    pila = conn.info.get("t0_sql")
+    if not pila:
+        return
+    ms = (time.perf_counter() - pila.pop()) * 1000.0
+
+    m.sentencias += 1
+    m.db_ms += ms
+
+    if not ajustes.activo:
+        return
+
+    h = huella(statement)
+    reg = m.huellas.get(h)
+    if reg is None:
+        m.huellas[h] = [1, ms, h]
+    else:
+        reg[0] += 1
+        reg[1] += ms
+
+    if ms >= ajustes.lenta_ms:
+        try:
+            _logger_lentas().info(
+                "%.1f ms | %s | params=%s", ms, h, forma_parametros(parameters, executemany)
+            )
+        except Exception:
+            log.exception("No se pudo escribir el log de sentencias lentas")
+
+
+def instalar(engine: Engine) -> None:
+    """Engancha los eventos al engine (idempotente)."""
+    if not event.contains(engine, "before_cursor_execute", _antes):
+        event.listen(engine, "before_cursor_execute", _antes)
+        event.listen(engine, "after_cursor_execute", _despues)
+
+
+# ===== Middleware HTTP =====
+def _evaluar(request: Request, m: MedicionSQL) -> None:
+    ruta = f"{request.method} {request.url.path}"
+    motivos = []
+    if m.sentencias > ajustes.max_sentencias:
+        motivos.append(f"{m.sentencias} sentencias (> {ajustes.max_sentencias})")
+    if m.db_ms > ajustes.max_db_ms:
+        motivos.append(f"{m.db_ms:.1f} ms en DB (> {ajustes.max_db_ms:g})")
+    repetidas = m.repetidas(ajustes.umbral_n1)
+    if repetidas:
+        motivos.append(f"posible N+1: {len(repetidas)} huella(s) repetidas")
+
+    if not motivos:
+        return
+    detalle = "; ".join(f"{c}x {ms:.1f}ms {sql[:160]}" for c, ms, sql in repetidas[:3])
+    log.warning("SQL %s → %s%s", ruta, ", ".join(motivos), f" | {detalle}" if detalle else "")
+
+
+async def middleware_sql(request: Request, call_next):
+    # Conteo y tiempo se miden siempre (los usa Server-Timing); huellas y avisos sólo si está activo
+    m = MedicionSQL()
+    request.state.medicion_sql = m
+    token = _medicion.set(m)
+    try:
+        response = await call_next(request)
+    finally:
+        _medicion.reset(token)
+    if ajustes.activo:
+        _evaluar(request, m)
+    return response
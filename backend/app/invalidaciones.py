@@ -0,0 +1,174 @@
+# app/invalidaciones.py
+"""
+Avisos de invalidación entre workers, sin servicios externos: una tabla
+`invalidaciones` que cada proceso sondea por id (marca de agua).
+
+- publicar(db, entidad, clave) inserta (entidad, clave, origen, creado) en
+  la MISMA transacción que el cambio: si hay rollback el aviso no existe y
+  si hay commit llega seguro. El id de la fila es la versión del aviso. Una
+  transacción escribe cada (entidad, clave) una sola vez.
+- Cada worker corre un hilo que cada INTERVALO_MS lee id > marca, agrupa
+  por entidad y llama a los que se anotaron con al_recibir() (catálogo →
+  descartar esos emprendedores, analítica → subir la generación). Los
+  avisos propios se saltean: el proceso que escribió ya aplicó el cambio
+  en su after_commit.
+- SQLite tiene un solo escritor a la vez, así que los ids se commitean en
+  orden y leer "id > marca" no saltea avisos. La tabla usa AUTOINCREMENT
+  para que los ids no se reusen después de purgar (filas de más de
+  RETENCION_S segundos).
+- La demora (aplicado − creado) de los avisos de otros workers se guarda
+  en una ventana de las últimas mediciones; estado() la exporta en
+  percentiles (GET /diagnostico/invalidaciones).
+
+Con un solo worker sólo cuesta el insert de cada aviso y un SELECT por
+id cada INTERVALO_MS; INVALIDACIONES_MS=0 apaga el sondeo.
+"""
+from __future__ import annotations
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import Invalidacion
+
+log = logging.getLogger("turnera.invalidaciones")
+
+INTERVALO_MS = int(os.getenv("INVALIDACIONES_MS", "250"))
+RETENCION_S = int(os.getenv("INVALIDACIONES_RETENCION_S", "3600"))
+LOTE = 1000
+MUESTRAS = 1024
+_CLAVE = "invalidaciones_publicadas"
+
+Manejador = Callable[[List[int]], None]
+
+
+class BusInvalidaciones:
+    def __init__(self, intervalo_ms: int = INTERVALO_MS):
+        self.intervalo_ms = intervalo_ms
+        self.origen = f"{os.getpid()}-{secrets.token_hex(4)}"
+        self.marca = 0
+        self.aplicados = 0
+        self.propios = 0
+        self._manejadores: Dict[str, List[Manejador]] = {}
+        self._demoras: Deque[float] = deque(maxlen=MUESTRAS)   # segundos
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._purgado = 0.0
+
+    def al_recibir(self, entidad: str, fn: Manejador) -> None:
+        """fn(claves) se llama con las claves de los avisos de otros workers para `entidad`."""
+        self._manejadores.setdefault(entidad, []).append(fn)
+
+    # --- publicar ---
+    def publicar(self, db: Session, entidad: str, clave: int = 0) -> None:
+        hechos: Set[Tuple[str, int]] = db.info.setdefault(_CLAVE, set())
+        if (entidad, clave) in hechos:
+            return
+        hechos.add((entidad, clave))
+        db.execute(insert(Invalidacion).values(entidad=entidad, clave=clave, origen=self.origen,
+                                               creado=time.time()))
+
+    # --- sondeo ---
+    def iniciar(self, engine: Engine) -> None:
+        """Arranca desde el último aviso existente (las caches recién armadas ya están al día)."""
+        with Session(bind=engine) as db:
+            self.marca = db.execute(select(func.max(Invalidacion.id))).scalar() or 0
+        if self.intervalo_ms <= 0 or self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(engine,), name="invalidaciones", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
+            self._hilo = None
+
+    def _bucle(self, engine: Engine) -> None:
+        while not self._parar.wait(self.intervalo_ms / 1000):
+            try:
+                with Session(bind=engine) as db:
+                    self.sondear(db)
+                    if time.monotonic() - self._purgado > 60:
+                        self._purgado = time.monotonic()
+                        self.purgar(db)
+            except Exception:
+                log.exception("Falló el sondeo de invalidaciones (marca %s)", self.marca)
+
+    def sondear(self, db: Session) -> int:
+        """Aplica los avisos nuevos; devuelve cuántos eran de otros workers."""
+        filas = db.execute(
+            select(Invalidacion.id, Invalidacion.entidad, Invalidacion.clave, Invalidacion.origen,
+                   Invalidacion.creado)
+            .where(Invalidacion.id > self.marca).order_by(Invalidacion.id).limit(LOTE)
+        ).all()
+        if not filas:
+            return 0
+        ahora = time.time()
+        por_entidad: Dict[str, Set[int]] = {}
+        ajenos = 0
+        for f in filas:
+            if f.origen == self.origen:
+                continue
+            ajenos += 1
+            por_entidad.setdefault(f.entidad, set()).add(f.clave)
+            self._demoras.append(max(0.0, ahora - f.creado))
+        for entidad, claves in por_entidad.items():
+            for fn in self._manejadores.get(entidad, ()):
+                try:
+                    fn(sorted(claves))
+                except Exception:
+                    log.exception("No se pudo aplicar la invalidación de %s %s", entidad, claves)
+        with self._lock:
+            self.marca = filas[-1].id
+            self.aplicados += ajenos
+            self.propios += len(filas) - ajenos
+        return ajenos
+
+    def purgar(self, db: Session) -> int:
+        n = db.execute(delete(Invalidacion).where(Invalidacion.creado < time.time() - RETENCION_S)).rowcount
+        db.commit()
+        return n or 0
+
+    def estado(self) -> dict:
+        with self._lock:
+            demoras = sorted(self._demoras)
+            out = {"origen": self.origen, "marca": self.marca, "aplicados": self.aplicados,
+                   "propios": self.propios, "intervalo_ms": self.intervalo_ms, "sondeando": self._hilo is not None}
+
+        def pct(p: float) -> Optional[float]:
+            return round(demoras[min(len(demoras) - 1, int(p * len(demoras)))] * 1000, 1) if demoras else None
+
+        out["demora_ms"] = {"muestras": len(demoras), "p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99),
+                            "max": round(demoras[-1] * 1000, 1) if demoras else None}
+        return out
+
+
+bus = BusInvalidaciones()
+
+
+def publicar(db: Session, entidad: str, clave: int = 0) -> None:
+    bus.publicar(db, entidad, clave)
+
+
+def al_recibir(entidad: str, fn: Manejador) -> None:
+    bus.al_recibir(entidad, fn)
+
+
+@event.listens_for(Session, "after_commit")
+def _limpiar(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session: Session) -> None:
+    session.info.pop(_CLAVE, None)
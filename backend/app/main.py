@@ -8,8 +8,10 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
-from .database import Base, engine
-from .routers import usuarios, emprendedores, servicios, horarios, turnos, publico
+from .database import Base, SessionLocal, engine
+from .routers import usuarios, emprendedores, servicios, recursos, horarios, turnos, publico, diagnostico, estadisticas, admin
+from . import catalogo, instrumentacion, invalidaciones, perfilado, migraciones, idempotencia
+from .crud import cambios, espera, huecos  # noqa: F401  (registran la secuencia de cambios, la lista de espera y el índice de huecos)
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | turnera.app | %(message)s")
@@ -26,20 +28,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ===== Idempotency-Key en los POST de reserva (el más interno) =====
+app.middleware("http")(idempotencia.middleware_idempotencia)
+
+# ===== Instrumentación SQL (N+1 / lentas) =====
+instrumentacion.instalar(engine)
+app.middleware("http")(instrumentacion.middleware_sql)
+
+# ===== Server-Timing + perfilado bajo demanda (va por fuera del de SQL) =====
+app.middleware("http")(perfilado.middleware_tiempos)
+
 # ===== DB startup =====
 @app.on_event("startup")
 def on_startup():
     logging.info("SQLite dev engine para create_all: %s", os.getenv("DATABASE_URL", "sqlite:///./dev.db"))
     Base.metadata.create_all(bind=engine)
+    migraciones.aplicar(engine)
+    idempotencia.purgar_vencidas()
+    with SessionLocal() as db:
+        logging.info("Catálogo público precargado: %s emprendedores", catalogo.catalogo.precargar(db))
+    invalidaciones.bus.iniciar(engine)
+    huecos.extensor.iniciar(engine)
+    cambios.purgador.iniciar(engine)
     logging.info("Tablas listas (SQLite desarrollo).")
 
+
+@app.on_event("shutdown")
+def on_shutdown():
+    invalidaciones.bus.detener()
+    huecos.extensor.detener()
+    cambios.purgador.detener()
+
 # ===== Routers API =====
 app.include_router(usuarios.router)
 app.include_router(emprendedores.router)
 app.include_router(servicios.router)
+app.include_router(recursos.router)
 app.include_router(horarios.router)
 app.include_router(turnos.router)
 app.include_router(publico.router)
+app.include_router(diagnostico.router)
+app.include_router(estadisticas.router)
+app.include_router(admin.router)
 
 # ===== Health simples =====
 @app.get("/healthz")
@@ -58,9 +88,9 @@ if FRONT_DIST.exists():
 # Prefijos que NO deben hacer fallback (rutas API/estáticos)
 API_PREFIXES = (
     "/openapi.json", "/docs", "/redoc",
-    "/usuarios", "/servicios", "/turnos", "/horarios",
+    "/usuarios", "/servicios", "/recursos", "/turnos", "/horarios",
     "/emprendedores", "/reservas", "/static", "/assets",
-    "/healthz"
+    "/healthz", "/diagnostico"
 )
 
 @app.get("/{full_path:path}")
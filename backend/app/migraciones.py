@@ -0,0 +1,129 @@
+# app/migraciones.py
+"""
+Migraciones livianas para bases ya existentes.
+
+create_all() crea tablas e índices que faltan, pero no agrega columnas a
+tablas que ya existen. Acá se listan las columnas nuevas (con su DDL y un
+backfill opcional) y se aplican al arrancar si no están.
+
+Los arreglos de datos que no cuelgan de una columna nueva (UNA_VEZ) se
+anotan en la tabla `migraciones_hechas` y no se vuelven a correr.
+"""
+from __future__ import annotations
+import logging
+from typing import Callable, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("turnera.migraciones")
+
+# (tabla, columna, DDL de la columna, backfill SQL o None)
+COLUMNAS: List[Tuple[str, str, str, Optional[str]]] = [
+    # delta-sync: los seq de lo ya existente los numera numerar_seq() (uno distinto por turno)
+    ("emprendedores", "cambios_seq", "INTEGER NOT NULL DEFAULT 0", None),
+    ("emprendedores", "cambios_horizonte", "INTEGER NOT NULL DEFAULT 0", None),
+    ("emprendedores", "huecos_hasta", "DATE", None),
+    ("turnos", "seq", "INTEGER NOT NULL DEFAULT 0", None),
+    ("servicios", "capacidad", "INTEGER NOT NULL DEFAULT 1", None),
+    ("retenciones", "servicio_id", "INTEGER", None),
+    ("turnos", "recurso_id", "INTEGER REFERENCES recursos(id) ON DELETE SET NULL", None),
+    ("turnos", "grupo_id", "VARCHAR(32)", None),
+    # minutos de reloj de pared (app/tiempo.py): strftime('%s') toma el DateTime naive como UTC
+    ("turnos", "inicio_min", "INTEGER NOT NULL DEFAULT 0",
+     "UPDATE turnos SET inicio_min = CAST(strftime('%s', inicio) AS INTEGER) / 60"),
+    ("turnos", "fin_min", "INTEGER NOT NULL DEFAULT 0",
+     "UPDATE turnos SET fin_min = CAST(strftime('%s', fin) AS INTEGER) / 60"),
+    ("emprendedores", "zona_horaria", "VARCHAR(64)", None),
+]
+
+# (nombre, tabla, columnas) — create_all no crea índices sobre tablas existentes
+INDICES: List[Tuple[str, str, str]] = [
+    ("ix_turnos_emp_seq", "turnos", "emprendedor_id, seq"),
+    ("ix_turnos_grupo", "turnos", "grupo_id"),
+    ("ix_turnos_servicio", "turnos", "servicio_id"),
+    ("ix_turnos_creado_por", "turnos", "creado_por_user_id"),
+    ("ix_turnos_emp_min", "turnos", "emprendedor_id, inicio_min, fin_min, estado, servicio_id, recurso_id"),
+]
+
+
+# turnos sin numerar (columna recién agregada) o seq repetidos dentro de un emprendedor
+# (el backfill viejo ponía "seq = 1" a todo el histórico)
+_SEQ_REPETIDOS = text("""
+    SELECT 1 FROM turnos WHERE seq = 0
+    UNION ALL
+    SELECT 1 FROM (
+        SELECT emprendedor_id, seq FROM turnos
+        UNION ALL SELECT emprendedor_id, seq FROM turnos_borrados
+    ) GROUP BY emprendedor_id, seq HAVING COUNT(*) > 1
+    LIMIT 1
+""")
+_NUMERAR_SEQ = (
+    # los nuevos seq van después del cambios_seq viejo, así ningún cursor viejo los saltea
+    """CREATE TEMP TABLE _seq_nuevo AS
+       SELECT t.k, t.id, t.emprendedor_id, e.cambios_seq AS base,
+              e.cambios_seq + ROW_NUMBER() OVER (PARTITION BY t.emprendedor_id ORDER BY t.seq, t.k, t.id) AS n
+       FROM (SELECT 0 AS k, id, emprendedor_id, seq FROM turnos
+             UNION ALL SELECT 1, id, emprendedor_id, seq FROM turnos_borrados) t
+       JOIN emprendedores e ON e.id = t.emprendedor_id""",
+    "CREATE INDEX _seq_nuevo_ix ON _seq_nuevo (k, id)",
+    "UPDATE turnos SET seq = s.n FROM _seq_nuevo s WHERE s.k = 0 AND s.id = turnos.id",
+    "UPDATE turnos_borrados SET seq = s.n FROM _seq_nuevo s WHERE s.k = 1 AND s.id = turnos_borrados.id",
+    # un cursor viejo (<= cambios_seq anterior) ya no significa lo mismo: queda bajo el horizonte → resync
+    """UPDATE emprendedores SET cambios_seq = m.n, cambios_horizonte = MAX(cambios_horizonte, m.base + 1)
+       FROM (SELECT emprendedor_id, MAX(base) AS base, MAX(n) AS n FROM _seq_nuevo GROUP BY emprendedor_id) m
+       WHERE m.emprendedor_id = emprendedores.id""",
+    "DROP TABLE _seq_nuevo",
+)
+
+
+def numerar_seq(conn) -> bool:
+    """Renumera los seq del delta-sync si hay turnos sin seq o repetidos dentro de un emprendedor.
+
+    El cursor de GET /turnos/mis/changes es un seq pelado: con seq repetidos
+    una página que corta en medio de un grupo pierde el resto. Se numeran
+    turnos y tombstones juntos por emprendedor a continuación de su
+    cambios_seq, respetando el orden (seq, id) que tenían; el horizonte
+    sube por encima de los cursores viejos para que esos clientes hagan un
+    sync completo.
+    """
+    if conn.execute(_SEQ_REPETIDOS).first() is None:
+        return False
+    log.info("Migración: renumerando seq del delta-sync (había repetidos)")
+    for sql in _NUMERAR_SEQ:
+        conn.execute(text(sql))
+    return True
+
+
+# (nombre, tablas que necesita, función(conn)): se corre una sola vez por base
+UNA_VEZ: List[Tuple[str, FrozenSet[str], Callable]] = [
+    ("seq_unicos", frozenset({"turnos", "turnos_borrados", "emprendedores"}), numerar_seq),
+]
+
+
+def aplicar(engine: Engine) -> None:
+    insp = inspect(engine)
+    tablas = set(insp.get_table_names())
+    with engine.begin() as conn:
+        for tabla, col, ddl, backfill in COLUMNAS:
+            if tabla not in tablas:
+                continue
+            existentes = {c["name"] for c in insp.get_columns(tabla)}
+            if col in existentes:
+                continue
+            log.info("Migración: agregando %s.%s", tabla, col)
+            conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {col} {ddl}"))
+            if backfill:
+                conn.execute(text(backfill))
+        for nombre, tabla, cols in INDICES:
+            if tabla in tablas and nombre not in {i["name"] for i in insp.get_indexes(tabla)}:
+                log.info("Migración: creando índice %s", nombre)
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({cols})"))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS migraciones_hechas "
+                          "(nombre VARCHAR(64) PRIMARY KEY, aplicada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"))
+        hechas = set(conn.execute(text("SELECT nombre FROM migraciones_hechas")).scalars())
+        for nombre, requeridas, fn in UNA_VEZ:
+            if nombre in hechas or not requeridas <= tablas:
+                continue
+            fn(conn)
+            conn.execute(text("INSERT INTO migraciones_hechas (nombre) VALUES (:n)"), {"n": nombre})
@@ -1,6 +1,6 @@
 # app/models.py
 from __future__ import annotations
-from datetime import datetime, time as dt_time
+from datetime import date, datetime, time as dt_time
 from typing import Optional, List
 
 from sqlalchemy import (
@@ -11,11 +11,15 @@ from sqlalchemy import (
     ForeignKey,
     Float,
     Time,
+    Date,
     Text,
     UniqueConstraint,
+    Index,
+    LargeBinary,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from .database import Base
+from .tiempo import a_min
 
 
 class Usuario(Base):
@@ -32,12 +36,14 @@ class Usuario(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     emprendedor: Mapped[Optional["Emprendedor"]] = relationship(
-        "Emprendedor", back_populates="usuario", uselist=False, cascade="all, delete-orphan"
+        "Emprendedor", back_populates="usuario", uselist=False, cascade="all, delete-orphan",
+        passive_deletes=True,
     )
+    # la FK es ON DELETE SET NULL: borrar al usuario no borra los turnos que cargó (ver crud/borrado.py)
     turnos_creados: Mapped[List["Turno"]] = relationship(
         "Turno", back_populates="creado_por",
         primaryjoin="Usuario.id==Turno.creado_por_user_id",
-        cascade="all, delete-orphan", passive_deletes=True,
+        passive_deletes="all",
     )
 
 
@@ -49,7 +55,7 @@ class Emprendedor(Base):
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"), nullable=False, unique=True)
+    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, unique=True)
 
     # básicos
     nombre: Mapped[str] = mapped_column(String(120), nullable=False)
@@ -66,6 +72,14 @@ class Emprendedor(Base):
     email_contacto: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
     logo_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # admite DataURL base64
 
+    # contador de cambios de agenda (delta-sync): lo incrementa crud/cambios.py
+    cambios_seq: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    cambios_horizonte: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # índice de huecos libres (crud/huecos.py): calculado hasta esta fecha inclusive
+    huecos_hasta: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    # zona IANA de la agenda (app/tiempo.py); None = ZONA_DEFAULT
+    zona_horaria: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     usuario: Mapped["Usuario"] = relationship("Usuario", back_populates="emprendedor")
@@ -87,10 +101,13 @@ class Servicio(Base):
     precio: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
     color: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
     activo: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # lugares por turno (clase grupal): turnos del mismo servicio y mismo horario comparten recurso
+    capacidad: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
 
     emprendedor: Mapped["Emprendedor"] = relationship("Emprendedor", back_populates="servicios")
+    # los turnos del servicio se borran por lotes en crud/borrado.py; la FK queda en SET NULL
     turnos: Mapped[List["Turno"]] = relationship("Turno", back_populates="servicio",
-        cascade="all, delete-orphan", passive_deletes=True)
+        passive_deletes="all")
 
 
 class Horario(Base):
@@ -105,8 +122,70 @@ class Horario(Base):
     emprendedor: Mapped["Emprendedor"] = relationship("Emprendedor", back_populates="horarios")
 
 
+class Recurso(Base):
+    """Silla, box o profesional. Sin recursos activos el emprendedor atiende de a uno."""
+    __tablename__ = "recursos"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False, index=True)
+    nombre: Mapped[str] = mapped_column(String(120), nullable=False)
+    activo: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+
+class HuecoLibre(Base):
+    """Índice de huecos libres precalculados (próximos días) para la búsqueda del directorio."""
+    __tablename__ = "huecos_libres"
+    __table_args__ = (
+        Index("ix_huecos_libres_inicio", "inicio", "emprendedor_id"),
+        Index("ix_huecos_libres_emp_inicio", "emprendedor_id", "inicio"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
+    inicio: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    fin: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    minutos: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class HorarioExcepcion(Base):
+    """Excepción por fecha al patrón semanal: cierre (feriado, vacaciones) u horario especial.
+
+    Si una fecha tiene filas, reemplazan por completo a los Horario de ese día:
+    una fila con cerrado=True → cerrado; si no, cada fila es un bloque inicio-fin.
+    """
+    __tablename__ = "horarios_excepciones"
+    __table_args__ = (
+        Index("ix_horarios_excepciones_emp_fecha", "emprendedor_id", "fecha"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
+    fecha: Mapped[date] = mapped_column(Date, nullable=False)
+    cerrado: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    inicio: Mapped[Optional[dt_time]] = mapped_column(Time, nullable=True)
+    fin: Mapped[Optional[dt_time]] = mapped_column(Time, nullable=True)
+    motivo: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
+
+
+def _min_de(col: str):
+    """Default de inicio_min/fin_min para INSERT masivos (executemany): sale del DateTime de la fila."""
+    def _default(ctx):
+        v = ctx.get_current_parameters().get(col)
+        return a_min(v) if isinstance(v, datetime) else None
+    return _default
+
+
 class Turno(Base):
     __tablename__ = "turnos"
+    __table_args__ = (
+        Index("ix_turnos_emp_seq", "emprendedor_id", "seq"),
+        # rangos y solapamientos por enteros; con estado/servicio/recurso se resuelven sin leer la tabla
+        Index("ix_turnos_emp_min", "emprendedor_id", "inicio_min", "fin_min", "estado", "servicio_id", "recurso_id"),
+        Index("ix_turnos_grupo", "grupo_id"),
+        # borrados por lote y ON DELETE SET NULL sin recorrer toda la tabla
+        Index("ix_turnos_servicio", "servicio_id"),
+        Index("ix_turnos_creado_por", "creado_por_user_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
@@ -119,7 +198,139 @@ class Turno(Base):
     estado: Mapped[str] = mapped_column(String(20), default="reservado", nullable=False)
     creado_por_user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # último cambio
+    recurso_id: Mapped[Optional[int]] = mapped_column(ForeignKey("recursos.id", ondelete="SET NULL"), nullable=True)
+    grupo_id: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)   # turnos encadenados de una misma reserva
+    # inicio/fin en minutos de reloj de pared (app/tiempo.py); los mantiene _sincronizar_min
+    inicio_min: Mapped[int] = mapped_column(Integer, default=_min_de("inicio"), nullable=False)
+    fin_min: Mapped[int] = mapped_column(Integer, default=_min_de("fin"), nullable=False)
 
     emprendedor: Mapped["Emprendedor"] = relationship("Emprendedor", back_populates="turnos")
     servicio: Mapped[Optional["Servicio"]] = relationship("Servicio", back_populates="turnos")
     creado_por = relationship("Usuario", back_populates="turnos_creados")
+
+    @validates("inicio", "fin")
+    def _sincronizar_min(self, key, valor):
+        setattr(self, key + "_min", a_min(valor) if valor is not None else None)
+        return valor
+
+
+class TurnoBorrado(Base):
+    """Tombstone: un turno borrado, para que el delta-sync pueda informar bajas."""
+    __tablename__ = "turnos_borrados"
+    __table_args__ = (
+        Index("ix_turnos_borrados_emp_seq", "emprendedor_id", "seq"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
+    turno_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    borrado_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RetencionSlot(Base):
+    """Retención temporal de un hueco durante el checkout (backend en tabla de app/retenciones.py)."""
+    __tablename__ = "retenciones"
+    __table_args__ = (
+        Index("ix_retenciones_emp_expira", "emprendedor_id", "expira_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    token: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
+    inicio: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    fin: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expira_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    servicio_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)   # para lugares de clases grupales
+
+
+class EsperaTurno(Base):
+    """Lista de espera: un cliente quiere un servicio dentro de una ventana [desde, hasta)."""
+    __tablename__ = "lista_espera"
+    __table_args__ = (
+        # índice de intervalos: ventanas de largo acotado → rango sobre `desde`; con hasta y
+        # servicio_id el matcheo se resuelve sin leer la tabla (ver crud/espera.py)
+        Index("ix_lista_espera_emp_estado_desde", "emprendedor_id", "estado", "desde", "hasta", "servicio_id"),
+        Index("ix_lista_espera_oferta", "oferta_retencion"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    token: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)   # secreto del cliente
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
+    servicio_id: Mapped[int] = mapped_column(ForeignKey("servicios.id", ondelete="CASCADE"), nullable=False)
+    desde: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    hasta: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    cliente_nombre: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
+    cliente_contacto: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
+    estado: Mapped[str] = mapped_column(String(20), default="esperando", nullable=False)  # esperando|ofrecido|tomado|vencido|cancelado
+    oferta_inicio: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    oferta_fin: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    oferta_expira: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    oferta_retencion: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)   # token de la retención ofrecida
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class IdempotenciaRegistro(Base):
+    """Respuesta guardada por Idempotency-Key (ver app/idempotencia.py)."""
+    __tablename__ = "idempotencia"
+
+    clave: Mapped[str] = mapped_column(String(64), primary_key=True)   # sha256(método, ruta, auth, key)
+    huella_body: Mapped[str] = mapped_column(String(64), nullable=False)
+    estado: Mapped[str] = mapped_column(String(12), nullable=False)     # en_curso | hecha
+    status: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    media_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    creado_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    expira_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class Invalidacion(Base):
+    """Aviso de cambio para las caches en memoria de los demás workers (ver app/invalidaciones.py)."""
+    __tablename__ = "invalidaciones"
+    # AUTOINCREMENT: los ids no se reusan después de purgar (los workers leen por id > marca)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True)                  # también la versión del aviso
+    entidad: Mapped[str] = mapped_column(String(32), nullable=False)   # catalogo | analitica
+    clave: Mapped[int] = mapped_column(Integer, nullable=False, default=0)   # emprendedor_id; 0 = todo
+    origen: Mapped[str] = mapped_column(String(32), nullable=False)    # worker que lo escribió
+    creado: Mapped[float] = mapped_column(Float, nullable=False, index=True)   # time.time()
+
+
+class TurnoSerie(Base):
+    """Turno recurrente (estilo RRULE): las ocurrencias se expanden al consultar, no se guardan."""
+    __tablename__ = "turnos_series"
+    __table_args__ = (
+        Index("ix_turnos_series_emp_hasta", "emprendedor_id", "hasta"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    emprendedor_id: Mapped[int] = mapped_column(ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False)
+    servicio_id: Mapped[Optional[int]] = mapped_column(ForeignKey("servicios.id", ondelete="SET NULL"), nullable=True)
+    inicio: Mapped[datetime] = mapped_column(DateTime, nullable=False)        # DTSTART (primera ocurrencia)
+    duracion_min: Mapped[int] = mapped_column(Integer, nullable=False)
+    frecuencia: Mapped[str] = mapped_column(String(10), default="semanal", nullable=False)  # diaria | semanal
+    intervalo: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    dias_semana: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)  # CSV 0=Dom..6=Sáb (semanal)
+    hasta: Mapped[Optional[date]] = mapped_column(Date, nullable=True)        # UNTIL inclusive; None = sin fin
+    cliente_nombre: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
+    cliente_contacto: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
+    nota: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    excepciones: Mapped[List["TurnoSerieExcepcion"]] = relationship(
+        "TurnoSerieExcepcion", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+
+class TurnoSerieExcepcion(Base):
+    """Fecha puntual en la que una serie no ocurre (EXDATE)."""
+    __tablename__ = "turnos_series_excepciones"
+    __table_args__ = (
+        UniqueConstraint("serie_id", "fecha", name="uq_serie_excepcion_fecha"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    serie_id: Mapped[int] = mapped_column(ForeignKey("turnos_series.id", ondelete="CASCADE"), nullable=False)
+    fecha: Mapped[date] = mapped_column(Date, nullable=False)
@@ -0,0 +1,251 @@
+# app/perfilado.py
+"""
+Tiempos por request (header Server-Timing) y perfilado bajo demanda.
+
+- `middleware_tiempos`: abre la medición del request y agrega
+  `Server-Timing: auth, db, handler, serial, total` a TODAS las respuestas.
+- `RutaMedida`: clase de ruta para los APIRouter; separa el tiempo del
+  handler (endpoint) del de serialización de la respuesta.
+- Perfilado: si el request trae un token firmado (header `X-Perfilar` o
+  query `_perfilar`), el handler corre bajo cProfile y el resultado se
+  guarda en PERFILES_DIR (sólo por entorno, como SQL_LOG_LENTAS). Los tokens
+  los emite /diagnostico/perfilado/token (solo admin) y quedan atados a quien
+  los pidió: valen únicamente en requests con el JWT de ese usuario, así que
+  un token filtrado no deja perfilar a nadie más.
+"""
+from __future__ import annotations
+import cProfile
+import functools
+import hashlib
+import hmac
+import inspect
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+from .auth import SECRET_KEY, decode_access_token
+
+log = logging.getLogger("turnera.perfilado")
+
+PERFILES_DIR = os.getenv("PERFILES_DIR", "profiles")
+HEADER_PERFILAR = "X-Perfilar"
+QUERY_PERFILAR = "_perfilar"
+
+
+# ===== Tiempos por request =====
+@dataclass
+class TiemposRequest:
+    inicio: float = 0.0
+    auth_ms: float = 0.0
+    handler_ms: float = 0.0
+    serial_ms: float = 0.0
+    perfilar: bool = False
+    perfil: Optional[str] = None
+
+
+_tiempos: ContextVar[Optional[TiemposRequest]] = ContextVar("tiempos_request", default=None)
+
+
+def tiempos_actuales() -> Optional[TiemposRequest]:
+    return _tiempos.get()
+
+
+@contextmanager
+def medir_auth():
+    """Acumula en `auth_ms` el tiempo del bloque (usado por deps.get_current_user)."""
+    t = _tiempos.get()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if t is not None:
+            t.auth_ms += (time.perf_counter() - t0) * 1000.0
+
+
+# ===== Tokens firmados para perfilar =====
+def _firma(usuario_id: int, expira: int) -> str:
+    msg = f"perfil:{usuario_id}:{expira}".encode("utf-8")
+    return hmac.new(SECRET_KEY.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+
+
+def emitir_token_perfilado(usuario_id: int, minutos: int = 10) -> str:
+    expira = int(time.time()) + minutos * 60
+    return f"{usuario_id}.{expira}.{_firma(usuario_id, expira)}"
+
+
+def token_perfilado_valido(token: Optional[str], usuario_id: Optional[int]) -> bool:
+    """El token está vigente, bien firmado y lo emitió `usuario_id` (el del request)."""
+    if not token or usuario_id is None or token.count(".") != 2:
+        return False
+    uid_raw, exp_raw, firma = token.split(".")
+    try:
+        uid, expira = int(uid_raw), int(exp_raw)
+    except ValueError:
+        return False
+    if uid != usuario_id or expira < time.time():
+        return False
+    return hmac.compare_digest(firma, _firma(uid, expira))
+
+
+def _usuario_del_request(request: Request) -> Optional[int]:
+    """`sub` del JWT del header Authorization, sin ir a la base (los tokens dev-* no cuentan)."""
+    auth = request.headers.get("authorization") or ""
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        return int(decode_access_token(auth.split()[1].strip()).get("sub"))
+    except Exception:
+        return None
+
+
+# ===== Perfilado (un request a la vez) =====
+_perfilando = threading.Lock()
+_RE_NOMBRE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _ruta_perfil(nombre_ruta: str) -> str:
+    os.makedirs(PERFILES_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    base = _RE_NOMBRE.sub("_", nombre_ruta).strip("_") or "request"
+    return os.path.join(PERFILES_DIR, f"{stamp}_{base}.prof")
+
+
+def _guardar_perfil(t: TiemposRequest, prof: cProfile.Profile, nombre_ruta: str) -> None:
+    try:
+        path = _ruta_perfil(nombre_ruta)
+        prof.dump_stats(path)
+        t.perfil = os.path.basename(path)
+        log.info("Perfil guardado: %s", path)
+    except Exception:
+        log.exception("No se pudo guardar el perfil de %s", nombre_ruta)
+
+
+def listar_perfiles() -> list[dict]:
+    if not os.path.isdir(PERFILES_DIR):
+        return []
+    out = []
+    for nombre in sorted(os.listdir(PERFILES_DIR), reverse=True):
+        if nombre.endswith(".prof"):
+            st = os.stat(os.path.join(PERFILES_DIR, nombre))
+            out.append({"archivo": nombre, "bytes": st.st_size, "creado": datetime.fromtimestamp(st.st_mtime)})
+    return out
+
+
+# ===== Ruta medida =====
+def _envolver_endpoint(endpoint: Callable[..., Any], nombre_ruta: str) -> Callable[..., Any]:
+    """Mide (y si corresponde perfila) el endpoint sin cambiar su firma para FastAPI."""
+
+    def _antes(t: TiemposRequest) -> Optional[cProfile.Profile]:
+        if t.perfilar and _perfilando.acquire(blocking=False):
+            prof = cProfile.Profile()
+            prof.enable()
+            return prof
+        if t.perfilar:
+            t.perfil = "ocupado"
+        return None
+
+    def _despues(t: TiemposRequest, prof: Optional[cProfile.Profile], t0: float) -> None:
+        t.handler_ms += (time.perf_counter() - t0) * 1000.0
+        if prof is not None:
+            prof.disable()
+            _perfilando.release()
+            _guardar_perfil(t, prof, nombre_ruta)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def _medido(*args, **kwargs):
+            t = _tiempos.get()
+            if t is None:
+                return await endpoint(*args, **kwargs)
+            prof = _antes(t)
+            t0 = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _despues(t, prof, t0)
+    else:
+        @functools.wraps(endpoint)
+        def _medido(*args, **kwargs):
+            t = _tiempos.get()
+            if t is None:
+                return endpoint(*args, **kwargs)
+            prof = _antes(t)
+            t0 = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _despues(t, prof, t0)
+
+    # Firma con anotaciones ya evaluadas: FastAPI no depende de los globals del wrapper
+    try:
+        _medido.__signature__ = inspect.signature(endpoint, eval_str=True)
+    except Exception:
+        pass
+    return _medido
+
+
+class RutaMedida(APIRoute):
+    """APIRoute que registra tiempo de handler y de serialización en TiemposRequest."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        nombre = f"{'_'.join(sorted(kwargs.get('methods') or []))}{path}"
+        super().__init__(path, _envolver_endpoint(endpoint, nombre), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        original = super().get_route_handler()
+
+        async def _handler(request: Request):
+            t = _tiempos.get()
+            if t is None:
+                return await original(request)
+            h0 = t.handler_ms
+            r0 = time.perf_counter()
+            response = await original(request)
+            total_ms = (time.perf_counter() - r0) * 1000.0
+            # lo que no fue handler ni auth dentro de la ruta: validación + serialización
+            t.serial_ms += max(total_ms - (t.handler_ms - h0) - t.auth_ms, 0.0)
+            return response
+
+        return _handler
+
+
+# ===== Middleware =====
+def _server_timing(t: TiemposRequest, db_ms: float, total_ms: float) -> str:
+    partes = [
+        f"auth;dur={t.auth_ms:.1f}",
+        f"db;dur={db_ms:.1f}",
+        f"handler;dur={t.handler_ms:.1f}",
+        f"serial;dur={t.serial_ms:.1f}",
+        f"total;dur={total_ms:.1f}",
+    ]
+    return ", ".join(partes)
+
+
+async def middleware_tiempos(request: Request, call_next):
+    t = TiemposRequest(inicio=time.perf_counter())
+    token_perfil = request.headers.get(HEADER_PERFILAR) or request.query_params.get(QUERY_PERFILAR)
+    if token_perfil:
+        t.perfilar = token_perfilado_valido(token_perfil, _usuario_del_request(request))
+
+    token = _tiempos.set(t)
+    try:
+        response = await call_next(request)
+    finally:
+        _tiempos.reset(token)
+
+    total_ms = (time.perf_counter() - t.inicio) * 1000.0
+    m = getattr(request.state, "medicion_sql", None)
+    response.headers["Server-Timing"] = _server_timing(t, m.db_ms if m else 0.0, total_ms)
+    if t.perfil:
+        response.headers["X-Perfil"] = t.perfil
+    return response
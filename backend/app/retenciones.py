@@ -0,0 +1,216 @@
+# app/retenciones.py
+"""
+Retenciones (holds) de slots durante el checkout público.
+
+Un cliente que eligió un horario lo "retiene" N minutos mientras completa
+el formulario; hay_conflicto() y la disponibilidad pública lo tratan como
+ocupado para todos menos para quien tiene el token.
+
+Dos backends con la misma interfaz:
+- memoria (default): dict token → retención + índice por emprendedor +
+  heap por vencimiento. Las vencidas se descartan de a una al tope del
+  heap cada vez que se consulta: no hay barrido de toda la estructura.
+- tabla (RETENCIONES_DB=1): tabla `retenciones`, para varios workers. Las
+  vencidas se ignoran por `expira_at` y se borran sólo las del mismo
+  emprendedor al crear una nueva (índice emprendedor_id, expira_at).
+"""
+from __future__ import annotations
+import heapq
+import itertools
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import RetencionSlot
+
+TTL_MIN = int(os.getenv("RETENCION_MIN", "5"))
+TTL_MAX_MIN = 15
+USAR_TABLA = os.getenv("RETENCIONES_DB", "0").lower() in ("1", "true", "si", "yes")
+
+
+@dataclass
+class Retencion:
+    id: int              # público (va en la disponibilidad / SSE)
+    token: str           # secreto: sólo lo conoce quien retuvo
+    emprendedor_id: int
+    inicio: datetime
+    fin: datetime
+    expira: datetime     # reloj de pared, para el cliente
+    servicio_id: Optional[int] = None
+
+    def a_dict(self, con_token: bool = False) -> dict:
+        d = {
+            "id": f"r{self.id}",
+            "emprendedor_id": self.emprendedor_id,
+            "inicio": self.inicio,
+            "fin": self.fin,
+            "expira": self.expira,
+            "servicio_id": self.servicio_id,
+            "estado": "retenido",
+        }
+        if con_token:
+            d["token"] = self.token
+        return d
+
+
+def _solapa(r: Retencion, inicio: datetime, fin: datetime) -> bool:
+    return r.inicio < fin and r.fin > inicio
+
+# `cupo` en crear(): cuántas retenciones superpuestas admite el hueco (recursos ×
+# lugares del servicio). Es el candado contra dos checkouts simultáneos; el
+# cálculo fino de lugares lo hace hay_conflicto() antes de llamar.
+
+
+# ===== Backend en memoria =====
+class _Memoria:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._por_token: Dict[str, Tuple[float, Retencion]] = {}
+        self._por_emp: Dict[int, Dict[str, Retencion]] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def _vencer(self, ahora: float) -> None:
+        h = self._heap
+        while h and h[0][0] <= ahora:
+            vence, token = heapq.heappop(h)
+            actual = self._por_token.get(token)
+            if actual and actual[0] == vence:   # no fue renovada ni liberada
+                self._quitar(token)
+
+    def _quitar(self, token: str) -> Optional[Retencion]:
+        par = self._por_token.pop(token, None)
+        if not par:
+            return None
+        r = par[1]
+        emp = self._por_emp.get(r.emprendedor_id)
+        if emp is not None:
+            emp.pop(token, None)
+            if not emp:
+                self._por_emp.pop(r.emprendedor_id, None)
+        return r
+
+    def crear(self, db: Session, emp_id: int, inicio: datetime, fin: datetime, ttl: timedelta,
+              servicio_id: Optional[int] = None, cupo: int = 1) -> Optional[Retencion]:
+        ahora = time.monotonic()
+        with self._lock:
+            self._vencer(ahora)
+            if sum(_solapa(r, inicio, fin) for r in self._por_emp.get(emp_id, {}).values()) >= cupo:
+                return None
+            r = Retencion(
+                id=next(self._ids), token=secrets.token_urlsafe(16), emprendedor_id=emp_id,
+                inicio=inicio, fin=fin, expira=datetime.now() + ttl, servicio_id=servicio_id,
+            )
+            vence = ahora + ttl.total_seconds()
+            self._por_token[r.token] = (vence, r)
+            self._por_emp.setdefault(emp_id, {})[r.token] = r
+            heapq.heappush(self._heap, (vence, r.token))
+            return r
+
+    def solapa(self, db: Session, emp_id: int, inicio: datetime, fin: datetime, excepto: Optional[str]) -> bool:
+        with self._lock:
+            self._vencer(time.monotonic())
+            return any(
+                t != excepto and _solapa(r, inicio, fin)
+                for t, r in self._por_emp.get(emp_id, {}).items()
+            )
+
+    def obtener(self, db: Session, token: str) -> Optional[Retencion]:
+        with self._lock:
+            self._vencer(time.monotonic())
+            par = self._por_token.get(token)
+            return par[1] if par else None
+
+    def liberar(self, db: Session, token: str) -> Optional[Retencion]:
+        with self._lock:
+            return self._quitar(token)
+
+    def activas(self, db: Session, emp_id: int, desde: Optional[datetime], hasta: Optional[datetime]) -> List[Retencion]:
+        with self._lock:
+            self._vencer(time.monotonic())
+            rs = list(self._por_emp.get(emp_id, {}).values())
+        return [r for r in rs if (not desde or r.inicio >= desde) and (not hasta or r.fin <= hasta)]
+
+
+# ===== Backend en tabla (multi-worker) =====
+def _de_fila(f: RetencionSlot) -> Retencion:
+    return Retencion(id=f.id, token=f.token, emprendedor_id=f.emprendedor_id,
+                     inicio=f.inicio, fin=f.fin, expira=f.expira_at, servicio_id=f.servicio_id)
+
+
+class _Tabla:
+    def crear(self, db: Session, emp_id: int, inicio: datetime, fin: datetime, ttl: timedelta,
+              servicio_id: Optional[int] = None, cupo: int = 1) -> Optional[Retencion]:
+        ahora = datetime.now()
+        db.execute(delete(RetencionSlot).where(
+            RetencionSlot.emprendedor_id == emp_id, RetencionSlot.expira_at <= ahora
+        ))
+        token = secrets.token_urlsafe(16)
+        # check + insert en una sola sentencia: dos workers no pueden retener el mismo hueco
+        solapadas = select(func.count(RetencionSlot.id)).where(
+            RetencionSlot.emprendedor_id == emp_id,
+            RetencionSlot.expira_at > ahora,
+            RetencionSlot.inicio < fin,
+            RetencionSlot.fin > inicio,
+        ).scalar_subquery()
+        res = db.execute(
+            insert(RetencionSlot).from_select(
+                ["token", "emprendedor_id", "inicio", "fin", "expira_at", "servicio_id"],
+                select(literal(token), literal(emp_id), literal(inicio), literal(fin), literal(ahora + ttl),
+                       literal(servicio_id))
+                .where(solapadas < cupo),
+            )
+        )
+        db.commit()
+        if not res.rowcount:
+            return None
+        return self.obtener(db, token)
+
+    def solapa(self, db: Session, emp_id: int, inicio: datetime, fin: datetime, excepto: Optional[str]) -> bool:
+        q = select(RetencionSlot.id).where(
+            RetencionSlot.emprendedor_id == emp_id,
+            RetencionSlot.expira_at > datetime.now(),
+            RetencionSlot.inicio < fin,
+            RetencionSlot.fin > inicio,
+        )
+        if excepto:
+            q = q.where(RetencionSlot.token != excepto)
+        return db.execute(select(exists(q))).scalar()
+
+    def obtener(self, db: Session, token: str) -> Optional[Retencion]:
+        f = db.scalars(select(RetencionSlot).where(
+            RetencionSlot.token == token, RetencionSlot.expira_at > datetime.now()
+        )).first()
+        return _de_fila(f) if f else None
+
+    def liberar(self, db: Session, token: str) -> Optional[Retencion]:
+        f = db.scalars(select(RetencionSlot).where(RetencionSlot.token == token)).first()
+        if not f:
+            return None
+        r = _de_fila(f)
+        db.delete(f)
+        db.commit()
+        return r
+
+    def activas(self, db: Session, emp_id: int, desde: Optional[datetime], hasta: Optional[datetime]) -> List[Retencion]:
+        conds = [RetencionSlot.emprendedor_id == emp_id, RetencionSlot.expira_at > datetime.now()]
+        if desde:
+            conds.append(RetencionSlot.inicio >= desde)
+        if hasta:
+            conds.append(RetencionSlot.fin <= hasta)
+        return [_de_fila(f) for f in db.scalars(select(RetencionSlot).where(and_(*conds)))]
+
+
+store = _Tabla() if USAR_TABLA else _Memoria()
+
+
+def ttl_pedido(minutos: Optional[int]) -> timedelta:
+    m = TTL_MIN if not minutos else max(1, min(int(minutos), TTL_MAX_MIN))
+    return timedelta(minutes=m)
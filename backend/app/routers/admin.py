@@ -1,16 +1,35 @@
 ﻿# backend/app/routers/admin.py
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from calendar import monthrange
-from fastapi import APIRouter, Depends
+from typing import Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from .. import schemas
+from ..crud import analitica
 from ..deps import get_db, require_roles
+from ..perfilado import RutaMedida
 from ..models import Usuario, Emprendedor, Turno
+from ..tiempo import ahora_en
+
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=RutaMedida)
+
+MAX_DIAS_ANALITICA = 731
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+
+def _periodo(desde: Optional[date], hasta: Optional[date]) -> Tuple[date, date]:
+    """[desde, hasta] inclusive; sin desde, el mes en curso; sin hasta, hasta fin de ese mes."""
+    desde = desde or analitica.periodo_mes(ahora_en().date())[0]
+    hasta = hasta or analitica.periodo_mes(desde)[1]
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="hasta no puede ser anterior a desde")
+    if (hasta - desde).days >= MAX_DIAS_ANALITICA:
+        raise HTTPException(status_code=400, detail=f"El período no puede superar {MAX_DIAS_ANALITICA} días")
+    return desde, hasta
 
 
 @router.get("/resumen")
@@ -37,3 +56,61 @@ def resumen(
         "desde": start_month,
         "hasta": end_month,
     }
+
+
+# ===== Analítica de la plataforma (crud/analitica.py, con cache) =====
+@router.get("/analitica/ranking", response_model=schemas.AdminRankingOut)
+def analitica_ranking(
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None, description="último día (inclusive); default: fin del mes"),
+    orden: Literal["turnos", "ingresos", "crecimiento"] = Query("turnos"),
+    rubro: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user: Usuario = Depends(require_roles(["admin"])),
+):
+    """Emprendedores ordenados por turnos, ingresos o crecimiento contra el período
+    anterior de igual largo; los puestos son de toda la plataforma."""
+    desde, hasta = _periodo(desde, hasta)
+    filas = analitica.ranking(db, desde, hasta, orden, rubro)
+    largo = hasta - desde + timedelta(days=1)
+    return {
+        "desde": desde, "hasta": hasta, "desde_prev": desde - largo, "hasta_prev": desde - timedelta(days=1),
+        "total": len(filas), "items": filas[offset:offset + limit],
+    }
+
+
+@router.get("/analitica/rubros", response_model=schemas.AdminRubrosOut)
+def analitica_rubros(
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+    user: Usuario = Depends(require_roles(["admin"])),
+):
+    desde, hasta = _periodo(desde, hasta)
+    return {"desde": desde, "hasta": hasta, "items": analitica.rubros(db, desde, hasta)}
+
+
+@router.get("/analitica/cohortes", response_model=schemas.AdminCohortesOut)
+def analitica_cohortes(
+    desde: Optional[date] = Query(None, description="default: 12 meses hacia atrás"),
+    hasta: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+    user: Usuario = Depends(require_roles(["admin"])),
+):
+    """Por mes de alta: cuántos emprendedores de la cohorte tuvieron turnos cada mes."""
+    hoy = ahora_en().date()
+    hasta = hasta or analitica.periodo_mes(hoy)[1]
+    if desde is None:
+        m = hasta.year * 12 + hasta.month - 12      # 12 meses contando el de `hasta`
+        desde = date(m // 12, m % 12 + 1, 1)
+    desde, hasta = _periodo(desde, hasta)
+    return {"desde": desde, "hasta": hasta, "items": analitica.cohortes(db, desde, hasta)}
+
+
+@router.post("/analitica/invalidar")
+def analitica_invalidar(user: Usuario = Depends(require_roles(["admin"]))):
+    """Descarta la cache de analítica (p. ej. después de cargar datos por fuera de la app)."""
+    analitica.CACHE.invalidar(forzar=True)
+    return analitica.CACHE.estado()
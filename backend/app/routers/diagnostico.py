@@ -0,0 +1,65 @@
+# app/routers/diagnostico.py
+from __future__ import annotations
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.deps import require_roles
+from app import invalidaciones
+from app.instrumentacion import ajustes
+from app.perfilado import HEADER_PERFILAR, QUERY_PERFILAR, RutaMedida, emitir_token_perfilado, listar_perfiles
+
+router = APIRouter(prefix="/diagnostico", tags=["diagnostico"], route_class=RutaMedida)
+
+
+class AjustesSQLIn(BaseModel):
+    # la ruta del log de lentas es sólo por entorno (SQL_LOG_LENTAS): un request no elige dónde se escribe
+    model_config = ConfigDict(extra="forbid")
+
+    activo: Optional[bool] = None
+    max_sentencias: Optional[int] = Field(default=None, ge=1)
+    max_db_ms: Optional[float] = Field(default=None, ge=0)
+    umbral_n1: Optional[int] = Field(default=None, ge=2)
+    lenta_ms: Optional[float] = Field(default=None, ge=0)
+
+
+# ================== Instrumentación SQL (en caliente) ==================
+@router.get("/sql")
+def get_ajustes_sql(user=Depends(require_roles(["admin"]))):
+    return ajustes.como_dict()
+
+
+@router.put("/sql")
+def put_ajustes_sql(body: AjustesSQLIn, user=Depends(require_roles(["admin"]))):
+    for k, v in body.model_dump(exclude_unset=True, exclude_none=True).items():
+        setattr(ajustes, k, v)
+    return ajustes.como_dict()
+
+
+# ================== Perfilado bajo demanda ==================
+@router.post("/perfilado/token")
+def token_perfilado(
+    minutos: int = Query(10, ge=1, le=120),
+    user=Depends(require_roles(["admin"])),
+):
+    """Token firmado: enviarlo en el header X-Perfilar (o ?_perfilar=) del request a perfilar,
+    autenticado como el mismo usuario que lo pidió."""
+    return {
+        "token": emitir_token_perfilado(user.id, minutos),
+        "header": HEADER_PERFILAR,
+        "query": QUERY_PERFILAR,
+        "minutos": minutos,
+    }
+
+
+@router.get("/perfilado")
+def perfiles(user=Depends(require_roles(["admin"]))):
+    return listar_perfiles()
+
+
+# ================== Invalidaciones entre workers ==================
+@router.get("/invalidaciones")
+def estado_invalidaciones(user=Depends(require_roles(["admin"]))):
+    """Marca de agua, avisos aplicados y demora hasta aplicarlos en este worker (ms)."""
+    return invalidaciones.bus.estado()
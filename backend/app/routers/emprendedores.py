@@ -1,13 +1,20 @@
 ﻿# app/routers/emprendedores.py
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, func
 
 from app import models, schemas
 from app.deps import get_db, get_current_user
+from app.perfilado import RutaMedida
+from app.catalogo import catalogo
+from app.crud import borrado, huecos
+from app.tiempo import ahora_en, zona_valida
 
-router = APIRouter(prefix="/emprendedores", tags=["emprendedores"])
+router = APIRouter(prefix="/emprendedores", tags=["emprendedores"], route_class=RutaMedida)
 
 @router.get("/mi", response_model=schemas.EmprendedorOut)
 def get_mi_emprendedor(
@@ -32,14 +39,38 @@ def get_mi_emprendedor(
         "web": emp.web,
         "email_contacto": emp.email_contacto,
         "logo_url": emp.logo_url,
+        "zona_horaria": emp.zona_horaria,
     })
 
+@router.delete("/mi", status_code=204)
+def borrar_mi_emprendedor(
+    tareas: BackgroundTasks,
+    background: bool = Query(False, description="Borrar la agenda en segundo plano (202)"),
+    db: Session = Depends(get_db),
+    current: models.Usuario = Depends(get_current_user),
+):
+    """Da de baja el negocio con toda su agenda; el usuario queda como cliente."""
+    emp = db.query(models.Emprendedor).filter(models.Emprendedor.usuario_id == current.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Aún no activaste el plan Emprendedor.")
+    emp_id = emp.id
+    if current.rol == "emprendedor":
+        current.rol = "cliente"
+        db.commit()
+    n = borrado.contar_turnos(db, models.Turno.emprendedor_id == emp_id)
+    if background or n > borrado.UMBRAL_FONDO or borrado.en_curso("emprendedor", emp_id):
+        borrado.desactivar_emprendedor(db, emp_id)
+        borrado.programar(tareas, db.get_bind(), "emprendedor", emp_id, borrado.borrar_emprendedor)
+        return JSONResponse(status_code=202, content={"estado": "en_curso", "turnos": n})
+    borrado.borrar_emprendedor(db, emp_id)
+    return None
+
 @router.get("/by-codigo/{codigo}", response_model=schemas.EmprendedorOut)
 def get_by_codigo(codigo: str, db: Session = Depends(get_db)):
-    emp = db.query(models.Emprendedor).filter(models.Emprendedor.codigo_cliente == codigo).first()
+    emp = catalogo.por_codigo(db, codigo)
     if not emp:
         raise HTTPException(status_code=404, detail="No existe emprendimiento con ese código.")
-    return schemas.EmprendedorOut.model_validate(emp)
+    return schemas.EmprendedorOut.model_validate(emp.perfil)
 
 # === Listado con filtros por q (nombre/rubro) y rubro + paginado simple ===
 @router.get("/", response_model=list[schemas.EmprendedorOut])
@@ -64,6 +95,35 @@ def list_emprendedores(
                .offset(offset).limit(limit).all())
     return [schemas.EmprendedorOut.model_validate(e) for e in emps]
 
+# === Búsqueda por disponibilidad: "¿quién tiene un hueco libre hoy después de las 18?" ===
+@router.get("/disponibles", response_model=list[schemas.EmprendedorHuecoOut])
+def buscar_disponibles(
+    q: str | None = None,
+    rubro: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    duracion_min: int | None = Query(None, ge=5, le=1440),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Filtra por q/rubro y ventana [desde, hasta) y ordena por el primer hueco
+    libre. Sale del índice precalculado de crud/huecos.py (próximos
+    HORIZONTE_DIAS días), no de la agenda de cada emprendedor; sólo lee:
+    los días que entran al horizonte los agrega el hilo de fondo.
+    """
+    ahora = ahora_en()   # zona por defecto: la búsqueda cruza emprendedores
+    desde = max(desde or ahora, ahora)
+    hasta = hasta or datetime.combine(desde.date() + timedelta(days=1), datetime.min.time())
+    if hasta <= desde:
+        raise HTTPException(status_code=422, detail="'hasta' tiene que ser posterior a 'desde'")
+    return [
+        {"emprendedor": schemas.EmprendedorOut.model_validate(e), "proximo": p}
+        for e, p in huecos.buscar(db, desde, hasta, q=q, rubro=rubro, duracion_min=duracion_min,
+                                  limit=limit, offset=offset)
+    ]
+
 # === Rubros disponibles con cantidades (para combos) ===
 @router.get("/rubros")
 def list_rubros(db: Session = Depends(get_db)):
@@ -106,6 +166,11 @@ def update_emprendedor(
     emp.web = body.web if body.web is not None else emp.web
     emp.email_contacto = body.email_contacto if body.email_contacto is not None else emp.email_contacto
     emp.logo_url = body.logo_url if body.logo_url is not None else emp.logo_url
+    if body.zona_horaria is not None:
+      zona = body.zona_horaria.strip() or None
+      if zona and not zona_valida(zona):
+          raise HTTPException(status_code=400, detail="Zona horaria desconocida (usar IANA, ej. America/Argentina/Buenos_Aires).")
+      emp.zona_horaria = zona
 
     db.add(emp); db.commit(); db.refresh(emp)
     return schemas.EmprendedorOut.model_validate(emp)
@@ -8,8 +8,13 @@ from sqlalchemy.orm import Session
 from app import schemas
 from app.models import Turno, Servicio, Emprendedor
 from app.deps import get_db, get_current_user
+from app.perfilado import RutaMedida
+from app.crud import metricas
+from app.tiempo import a_local, a_min
 
-router = APIRouter(prefix="/estadisticas", tags=["estadisticas"])
+router = APIRouter(prefix="/estadisticas", tags=["estadisticas"], route_class=RutaMedida)
+
+MAX_DIAS_OCUPACION = 400
 
 # ===== Helpers reutilizables =====
 def _get_my_emprendedor(db: Session, user) -> Emprendedor:
@@ -29,20 +34,19 @@ def _parse_iso(s: Optional[str]) -> Optional[datetime]:
     except Exception:
         return None
 
-def _normalize_range(desde: Optional[str], hasta: Optional[str]) -> (datetime, datetime):
+def _normalize_range(desde: Optional[str], hasta: Optional[str], zona: Optional[str] = None) -> (datetime, datetime):
     now = datetime.now()
     start = _parse_iso(desde) or datetime(now.year, now.month, 1, 0, 0, 0)
     end = _parse_iso(hasta)
+    # con offset ("...Z") → hora local del emprendedor, como la agenda
+    start = a_local(start, zona)
+    end = a_local(end, zona) if end else None
     if not end:
         # fin de mes
         if start.month == 12:
             end = datetime(start.year + 1, 1, 1) - timedelta(milliseconds=1)
         else:
             end = datetime(start.year, start.month + 1, 1) - timedelta(milliseconds=1)
-    if start.tzinfo:
-        start = start.replace(tzinfo=None)
-    if end.tzinfo:
-        end = end.replace(tzinfo=None)
     return start, end
 
 def _svc_duration_min(svc: Servicio) -> int:
@@ -63,7 +67,7 @@ def stats_mis_resumen(
     user=Depends(get_current_user),
 ):
     emp = _get_my_emprendedor(db, user)
-    start, end = _normalize_range(desde, hasta)
+    start, end = _normalize_range(desde, hasta, emp.zona_horaria)
 
     # Base query: turnos del emprendedor en el rango
     q = db.query(Turno).filter(Turno.servicio_id.isnot(None))
@@ -137,3 +141,39 @@ def stats_mis_resumen(
         ],
     )
     return out
+
+
+@router.get("/mis/ocupacion", response_model=schemas.StatsOcupacionOut)
+def stats_mis_ocupacion(
+    desde: Optional[str] = Query(None),
+    hasta: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Ocupación, demanda por día de la semana × hora, ingresos y tasas de
+    cancelación de los turnos que empiezan en [desde, hasta]
+    (calculado por arrays en crud/metricas.py). La agenda se multiplica por
+    los recursos activos actuales, también para días pasados."""
+    emp = _get_my_emprendedor(db, user)
+    start, end = _normalize_range(desde, hasta, emp.zona_horaria)
+    a, b = a_min(start), a_min(end) + 1     # hasta inclusivo, como /mis/resumen
+    if b <= a:
+        raise HTTPException(status_code=400, detail="Rango inválido")
+    if (b - a) > MAX_DIAS_OCUPACION * 24 * 60:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_DIAS_OCUPACION} días")
+
+    m = metricas.calcular(db, emp.id, a, b)
+    reservados, agenda = int(m.reservados_dia.sum()), int(m.agenda_dia.sum())
+    return schemas.StatsOcupacionOut(
+        rango=schemas.StatsRango(desde=start, hasta=end),
+        total_turnos=m.total,
+        cancelados=m.cancelados,
+        tasa_cancelacion=metricas.tasa(m.cancelados, m.total),
+        minutos_reservados=reservados,
+        minutos_agenda=agenda,
+        ocupacion=metricas.tasa(reservados, agenda),
+        ingresos=float(m.ingresos_dia.sum()),
+        por_dia=metricas.por_dia(m),
+        por_servicio=m.servicios,
+        demanda=m.demanda.tolist(),
+    )
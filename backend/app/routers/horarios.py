@@ -1,16 +1,20 @@
 ﻿# app/routers/horarios.py
 from __future__ import annotations
-from typing import Any, Dict, List
-from datetime import time as dt_time
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime, time as dt_time, timedelta
 import json
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
-from app import models
+from app.eventos import bus
+from app.perfilado import RutaMedida
+from app import catalogo, models, schemas
+from app.crud.horarios import compilar_agenda
+from app.crud.huecos import marcar as marcar_huecos
 
-router = APIRouter(prefix="/horarios", tags=["horarios"])
+router = APIRouter(prefix="/horarios", tags=["horarios"], route_class=RutaMedida)
 
 # ---------- helpers ----------
 def _norm_dia(v: Any) -> int:
@@ -167,6 +171,8 @@ async def replace_mis_horarios(request: Request, db: Session = Depends(get_db),
     # 5) Reemplazo total (si queda vacío, limpia)
     try:
         db.query(models.Horario).filter(models.Horario.emprendedor_id == emp.id).delete(synchronize_session=False)
+        # el delete masivo no pasa por before_flush: si la lista queda vacía nadie más avisa al catálogo
+        catalogo.tocado(db, emp.id)
         for r in planos:
             db.add(models.Horario(
                 emprendedor_id=emp.id,
@@ -174,9 +180,111 @@ async def replace_mis_horarios(request: Request, db: Session = Depends(get_db),
                 inicio=_to_time(r["desde"]),
                 fin=_to_time(r["hasta"]),
             ))
+        marcar_huecos(db, emp.id)
         db.commit()
     except Exception as ex:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"No se pudieron guardar los horarios: {ex}")
 
     return get_mis_horarios(db=db, user=user)
+
+# ---------- Excepciones por fecha (feriados, cierres, horario especial) ----------
+MAX_DIAS_EXCEPCION = 366
+
+def _rango_fechas(desde: date, hasta: Optional[date]) -> date:
+    hasta = hasta or desde
+    if hasta < desde:
+        raise HTTPException(status_code=422, detail="'hasta' no puede ser anterior a 'fecha'")
+    if (hasta - desde).days >= MAX_DIAS_EXCEPCION:
+        raise HTTPException(status_code=422, detail=f"Rango máximo: {MAX_DIAS_EXCEPCION} días")
+    return hasta
+
+def _excepciones_out(db: Session, emp_id: int, desde: date, hasta: date) -> List[Dict[str, Any]]:
+    return compilar_agenda(db, emp_id, desde, hasta).excepciones_lista()
+
+@router.get("/mis/excepciones")
+def get_mis_excepciones(
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    emp = _get_owner_emprendedor(db, user.id)
+    desde = desde or date.today()
+    hasta = hasta or (desde + timedelta(days=MAX_DIAS_EXCEPCION - 1))
+    return _excepciones_out(db, emp.id, desde, hasta)
+
+@router.post("/mis/excepciones", status_code=200)
+def set_mis_excepciones(
+    payload: schemas.HorarioExcepcionIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Reemplaza las excepciones de [fecha, hasta]. Los turnos ya reservados no se
+    tocan: se informa cuántos quedan fuera del nuevo horario (`turnos_afectados`).
+    """
+    emp = _get_owner_emprendedor(db, user.id)
+    hasta = _rango_fechas(payload.fecha, payload.hasta)
+    bloques = [(b.desde, b.hasta) for b in payload.bloques]
+    if not payload.cerrado:
+        if not bloques:
+            raise HTTPException(status_code=422, detail="Un horario especial necesita al menos un bloque")
+        if any(a >= b for a, b in bloques):
+            raise HTTPException(status_code=422, detail="Bloque inválido: 'desde' debe ser anterior a 'hasta'")
+
+    db.query(models.HorarioExcepcion).filter(
+        models.HorarioExcepcion.emprendedor_id == emp.id,
+        models.HorarioExcepcion.fecha >= payload.fecha,
+        models.HorarioExcepcion.fecha <= hasta,
+    ).delete(synchronize_session=False)
+    filas = []
+    dia = payload.fecha
+    while dia <= hasta:
+        if payload.cerrado:
+            filas.append({"emprendedor_id": emp.id, "fecha": dia, "cerrado": True,
+                          "inicio": None, "fin": None, "motivo": payload.motivo})
+        else:
+            filas += [{"emprendedor_id": emp.id, "fecha": dia, "cerrado": False,
+                       "inicio": a, "fin": b, "motivo": payload.motivo} for a, b in bloques]
+        dia += timedelta(days=1)
+    db.execute(models.HorarioExcepcion.__table__.insert(), filas)
+    marcar_huecos(db, emp.id, payload.fecha, hasta)
+    catalogo.tocado(db, emp.id)   # la versión de la entrada es el ETag del bundle
+    db.commit()
+    bus.publicar(emp.id, "reset", {})   # cambió la disponibilidad de esas fechas
+
+    agenda = compilar_agenda(db, emp.id, payload.fecha, hasta)
+    a0 = datetime.combine(payload.fecha, dt_time.min)
+    b0 = datetime.combine(hasta + timedelta(days=1), dt_time.min)
+    afectados = sum(
+        1 for i, f in db.query(models.Turno.inicio, models.Turno.fin).filter(
+            models.Turno.emprendedor_id == emp.id, models.Turno.inicio >= a0, models.Turno.inicio < b0,
+            models.Turno.estado == "reservado",
+        )
+        if not agenda.contiene(i, f)
+    )
+    return {"items": _excepciones_out(db, emp.id, payload.fecha, hasta), "turnos_afectados": afectados}
+
+@router.delete("/mis/excepciones/{fecha}", status_code=204)
+def delete_mis_excepciones(
+    fecha: date,
+    hasta: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Quita las excepciones de la fecha (o del rango fecha..hasta): vuelve a regir el patrón semanal."""
+    emp = _get_owner_emprendedor(db, user.id)
+    hasta = _rango_fechas(fecha, hasta)
+    n = db.query(models.HorarioExcepcion).filter(
+        models.HorarioExcepcion.emprendedor_id == emp.id,
+        models.HorarioExcepcion.fecha >= fecha,
+        models.HorarioExcepcion.fecha <= hasta,
+    ).delete(synchronize_session=False)
+    marcar_huecos(db, emp.id, fecha, hasta)
+    if n:
+        catalogo.tocado(db, emp.id)
+    db.commit()
+    if n:
+        bus.publicar(emp.id, "reset", {})
+    return
@@ -1,16 +1,34 @@
 ﻿from __future__ import annotations
-from datetime import datetime, time as dt_time
-from typing import List, Optional
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.deps import get_db
-from app.models import Emprendedor, Servicio, Horario, Turno
-from app.crud.horarios import dentro_de_horario
-from app.crud.turnos import hay_conflicto
+from app.eventos import bus, formato_sse, publicar_retencion, publicar_turno
+from app import invalidaciones, retenciones
+from app.catalogo import EntradaCatalogo, catalogo
+from app.perfilado import RutaMedida
+from app.models import Emprendedor, EsperaTurno, Servicio, Horario, Turno
+from app.crud.horarios import compilar_agenda, dentro_de_horario
+from app.crud.capacidad import recursos_activos
+from app.crud.combos import MAX_SERVICIOS_CADENA, Cadena, buscar_inicios, cargar_cadena
+from app.crud.empaque import Empaque, hueco_de
+from app.crud import espera
+from app.crud.turnos import cargar_ocupacion, hay_conflicto
+from app.crud.series import ocurrencias_en_rango
+from app.tiempo import a_min, ahora_en, de_min, min_de_dia
 
-router = APIRouter(prefix="/publico", tags=["publico"])
+router = APIRouter(prefix="/publico", tags=["publico"], route_class=RutaMedida)
 
 # ---------- helpers ----------
 def _as_list(x) -> list[str] | None:
@@ -27,67 +45,91 @@ def _as_list(x) -> list[str] | None:
 def _time_to_hhmm(t: dt_time) -> str:
     return f"{t.hour:02d}:{t.minute:02d}"
 
-# ================== GET /publico/emprendedores/by-codigo/{codigo} ==================
-@router.get("/emprendedores/by-codigo/{codigo}")
-def publico_emp_by_codigo(codigo: str, db: Session = Depends(get_db)):
-    e: Emprendedor | None = db.query(Emprendedor).filter(Emprendedor.codigo_cliente == codigo).first()
-    if not e:
-        raise HTTPException(status_code=404, detail="Código no encontrado")
+def _del_catalogo(db: Session, codigo: str, detalle: str = "Código inválido") -> EntradaCatalogo:
+    """Emprendedor del código desde el catálogo en memoria (app/catalogo.py); 404 si no existe."""
+    e = catalogo.por_codigo(db, codigo)
+    if e is None:
+        raise HTTPException(status_code=404, detail=detalle)
+    return e
 
-    # Mapeo a lo que muestra el front en la "ficha" de presentación
+def _ficha(e: dict) -> dict:
+    """Mapeo del perfil a lo que muestra el front en la "ficha" de presentación."""
     return {
-        "id": e.id,
-        "nombre": e.nombre,
-        "descripcion": e.descripcion,
-        "codigo_cliente": e.codigo_cliente,
-        "logo_url": getattr(e, "logo_url", None),
-        "direccion": getattr(e, "direccion", None),
-        "telefono": getattr(e, "telefono", None),
-        "email_contacto": getattr(e, "email_contacto", None),
-        "rubro": getattr(e, "rubro", None),
-        "web": getattr(e, "web", None),
-        "redes": _as_list(getattr(e, "redes", None)),
-        "cuit": getattr(e, "cuit", None),
+        "id": e["id"],
+        "nombre": e["nombre"],
+        "descripcion": e["descripcion"],
+        "codigo_cliente": e["codigo_cliente"],
+        "logo_url": e["logo_url"],
+        "direccion": e["direccion"],
+        "telefono": e["telefono"],
+        "email_contacto": e["email_contacto"],
+        "rubro": e["rubro"],
+        "web": e["web"],
+        "redes": _as_list(e["redes"]),
+        "cuit": e["cuit"],
     }
 
-# ================== GET /publico/servicios/{codigo} (por código público) ==================
-@router.get("/servicios/{codigo}")
-def publico_servicios(codigo: str, db: Session = Depends(get_db)) -> List[dict]:
-    emp = db.query(Emprendedor).filter(Emprendedor.codigo_cliente == codigo).first()
-    if not emp:
-        raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
-
-    q = db.query(Servicio).filter(Servicio.emprendedor_id == emp.id, Servicio.activo == True)  # noqa: E712
-    items = []
-    for s in q.all():
+def _horarios_out(emp_id: int, hs) -> List[dict]:
+    """Filas (id, dia_semana, inicio, fin) de Horario en el formato de /publico/horarios."""
+    items: list[dict] = []
+    for id_, dia, ini, fin in hs:
         items.append({
-            "id": s.id,
-            "nombre": s.nombre,
-            "descripcion": None,                 # si no tenés esa col
-            "duracion_min": int(s.duracion_min), # requerido por front
-            "precio": float(s.precio or 0.0),
-            "activo": bool(s.activo),
-            "emprendedor_id": s.emprendedor_id,
+            "id": id_,
+            "emprendedor_id": emp_id,
+            "dia_semana": int(dia),
+            "hora_desde": _time_to_hhmm(ini),
+            "hora_hasta": _time_to_hhmm(fin),
+            "intervalo_min": 30,  # el front lo usa; si no tenés columna, fijo 30
+            "activo": True,       # mismo criterio
         })
     return items
 
+def _horarios_cat(emp: EntradaCatalogo) -> List[dict]:
+    return _horarios_out(emp.id, [
+        (h["id"], h["dia_semana"], dt_time(h["inicio"] // 60, h["inicio"] % 60),
+         dt_time(h["fin"] // 60, h["fin"] % 60) if h["fin"] < 24 * 60 else dt_time.max)
+        for h in emp.horarios
+    ])
+
+# ================== GET /publico/emprendedores/by-codigo/{codigo} ==================
+@router.get("/emprendedores/by-codigo/{codigo}")
+def publico_emp_by_codigo(codigo: str, db: Session = Depends(get_db)):
+    return _ficha(_del_catalogo(db, codigo, "Código no encontrado").perfil)
+
+# ================== GET /publico/servicios/{codigo} (por código público) ==================
+@router.get("/servicios/{codigo}")
+def publico_servicios(codigo: str, db: Session = Depends(get_db)) -> List[dict]:
+    emp = _del_catalogo(db, codigo, "Emprendedor no encontrado")
+    return [s.a_publico() for s in emp.activos()]
+
 # ================== GET /publico/horarios/{emp_id} ==================
 @router.get("/horarios/{emp_id}")
 def publico_horarios(emp_id: int, db: Session = Depends(get_db)) -> List[dict]:
-    # Tu modelo tiene: dia_semana (0..6), inicio: TIME, fin: TIME
-    hs: list[Horario] = db.query(Horario).filter(Horario.emprendedor_id == emp_id).all()
-    items: list[dict] = []
-    for h in hs:
-        items.append({
-            "id": h.id,
-            "emprendedor_id": h.emprendedor_id,
-            "dia_semana": int(h.dia_semana),
-            "hora_desde": _time_to_hhmm(h.inicio),
-            "hora_hasta": _time_to_hhmm(h.fin),
-            "intervalo_min": 30,  # el front lo usa; si no tenés columna, fijo 30
-            "activo": True,       # mismo criterio
-        })
-    return items
+    emp = catalogo.por_id(db, emp_id)
+    if emp is not None:
+        return _horarios_cat(emp)
+    # sin código público no está en el catálogo
+    return _horarios_out(emp_id, db.query(Horario.id, Horario.dia_semana, Horario.inicio, Horario.fin).filter(
+        Horario.emprendedor_id == emp_id).all())
+
+# ================== GET /publico/horarios/{emp_id}/excepciones?desde&hasta ==================
+@router.get("/horarios/{emp_id}/excepciones")
+def publico_horarios_excepciones(
+    emp_id: int,
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+) -> List[dict]:
+    """Fechas que no siguen el patrón semanal (cerradas o con horario especial).
+
+    El front combina esto con /publico/horarios: si la fecha está acá, sus
+    bloques reemplazan a los del día de la semana.
+    """
+    desde = desde or date.today()
+    hasta = hasta or (desde + timedelta(days=92))
+    if (hasta - desde).days > 366:
+        raise HTTPException(status_code=422, detail="Rango máximo: 366 días")
+    return compilar_agenda(db, emp_id, desde, hasta).excepciones_lista()
 
 # ================== GET /publico/turnos/{emp_id}?desde&hasta ==================
 @router.get("/turnos/{emp_id}")
@@ -97,16 +139,12 @@ def publico_turnos(
     hasta: Optional[datetime] = Query(None),
     db: Session = Depends(get_db),
 ) -> List[dict]:
-    q = db.query(Turno).filter(Turno.emprendedor_id == emp_id)
+    q = db.query(Turno).filter(Turno.emprendedor_id == emp_id, Turno.estado == "reservado")
+    # rangos por minutos enteros (índice ix_turnos_emp_min), no por DateTime
     if desde:
-        q = q.filter(Turno.inicio >= desde)
+        q = q.filter(Turno.inicio_min >= a_min(desde))
     if hasta:
-        q = q.filter(Turno.fin <= hasta)
-    # si tu estado existe, filtramos "reservado" para público
-    try:
-        q = q.filter(Turno.estado == "reservado")
-    except Exception:
-        pass
+        q = q.filter(Turno.inicio_min < a_min(hasta), Turno.fin_min <= a_min(hasta))
 
     items = []
     for t in q.all():
@@ -121,8 +159,293 @@ def publico_turnos(
             "nota": t.nota,
             "estado": t.estado,
         })
+    # ocurrencias de series recurrentes (sin ventana: próximos 60 días)
+    v_desde = desde or datetime.now()
+    v_hasta = hasta or (v_desde + timedelta(days=60))
+    for o in ocurrencias_en_rango(db, emp_id, v_desde, v_hasta):
+        if (desde and o.inicio < desde) or (hasta and o.fin > hasta):
+            continue
+        items.append({
+            "id": None,
+            "serie_id": o.serie.id,
+            "emprendedor_id": emp_id,
+            "servicio_id": o.serie.servicio_id,
+            "inicio": o.inicio,
+            "fin": o.fin,
+            "estado": "reservado",
+        })
+    # retenciones vigentes: para el público el hueco está ocupado
+    items.extend(r.a_dict() for r in retenciones.store.activas(db, emp_id, desde, hasta))
     return items
 
+# ================== GET /publico/disponibilidad/{emp_id}?fecha&hasta&servicio_id&orden ==================
+PASO_SLOT_MIN = 30   # mismo intervalo fijo que informa /publico/horarios
+MAX_DIAS_DISPONIBILIDAD = 42
+
+@router.get("/disponibilidad/{emp_id}")
+def publico_disponibilidad(
+    emp_id: int,
+    fecha: date = Query(...),
+    servicio_id: int = Query(...),
+    hasta: Optional[date] = Query(None, description="último día (inclusive); default: sólo `fecha`"),
+    orden: Literal["hora", "empaque"] = Query("hora"),
+    retencion: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+) -> dict:
+    """
+    Huecos de [fecha, hasta] para un servicio con los lugares que quedan en cada uno.
+    Combina horarios + excepciones y la ocupación del rango (turnos, series,
+    retenciones ajenas; `retencion` = token propio) armada con un solo
+    sweep-line: O(n log n) para todo el rango, no una consulta por hueco.
+
+    orden=empaque: primero los inicios que dejan menos tiempo invendible
+    (ver crud/empaque.py); cada slot trae `desperdicio` en minutos. Los
+    completos van al final.
+    """
+    hasta = hasta or fecha
+    if hasta < fecha:
+        raise HTTPException(status_code=422, detail="'hasta' debe ser >= 'fecha'")
+    if (hasta - fecha).days >= MAX_DIAS_DISPONIBILIDAD:
+        raise HTTPException(status_code=422, detail=f"Rango máximo: {MAX_DIAS_DISPONIBILIDAD} días")
+    s = db.query(Servicio).filter(Servicio.id == servicio_id, Servicio.emprendedor_id == emp_id).first()
+    if not s:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+    dur = int(s.duracion_min or 30)
+    cupo = int(s.capacidad or 1)
+    dia0 = datetime.combine(fecha, dt_time.min)
+    oc = cargar_ocupacion(db, emp_id, dia0, datetime.combine(hasta + timedelta(days=1), dt_time.min),
+                          retencion=(retencion or None))
+    agenda = compilar_agenda(db, emp_id, fecha, hasta)
+    empaque = None
+    if orden == "empaque":
+        empaque = Empaque(d for (d,) in db.query(Servicio.duracion_min).filter(
+            Servicio.emprendedor_id == emp_id, Servicio.activo == True,  # noqa: E712
+        ))
+    # el recorrido va en minutos enteros (app/tiempo.py); datetime sólo para la respuesta
+    slots = []
+    dia = fecha
+    while dia <= hasta:
+        base = min_de_dia(dia)
+        for a, b in agenda.bloques(dia):
+            ini, fin_bloque = base + a, base + b
+            bloque_fin = de_min(fin_bloque)
+            if empaque:
+                huecos = list(oc.perfil.tramos_bajo(ini, fin_bloque, oc.recursos))
+                inicios = [h[0] for h in huecos]
+            while ini + dur <= fin_bloque:
+                slot = {
+                    "inicio": de_min(ini),
+                    "fin": de_min(ini + dur),
+                    "libres": oc.libres_min(s.id, cupo, ini, ini + dur),
+                    "bloque_fin": bloque_fin,
+                }
+                if empaque:
+                    h = hueco_de(huecos, inicios, ini, ini + dur)
+                    # sumarse a una sesión grupal existente no parte ningún hueco
+                    slot["desperdicio"], slot["_restos"] = (
+                        empaque.puntaje(h, ini, ini + dur) if h and not oc.inscriptos(s.id, ini) else (0, 0)
+                    )
+                slots.append(slot)
+                ini += PASO_SLOT_MIN
+        dia += timedelta(days=1)
+    if empaque:
+        slots.sort(key=lambda x: (x["libres"] <= 0, x["desperdicio"], x["_restos"], x["inicio"]))
+        for x in slots:
+            del x["_restos"]
+    return {"fecha": fecha, "hasta": hasta, "servicio_id": s.id, "capacidad": cupo,
+            "recursos": oc.recursos, "orden": orden, "slots": slots}
+
+# ================== GET /publico/disponibilidad/{emp_id}/cadena?fecha&hasta&servicios ==================
+def _ids_servicios(x) -> List[int]:
+    try:
+        ids = [int(v) for v in (_as_list(x) or [])]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="'servicios' debe ser una lista de ids")
+    if not ids:
+        raise HTTPException(status_code=422, detail="Indicá al menos un servicio")
+    if len(ids) > MAX_SERVICIOS_CADENA:
+        raise HTTPException(status_code=422, detail=f"Máximo {MAX_SERVICIOS_CADENA} servicios por reserva")
+    return ids
+
+def _cadena_out(cadena: Cadena, inicio: datetime) -> dict:
+    eslabones = cadena.eslabones(inicio)
+    return {
+        "inicio": inicio,
+        "fin": eslabones[-1][2],
+        "tramos": [{"servicio_id": sv.id, "inicio": a, "fin": b} for sv, a, b in eslabones],
+    }
+
+@router.get("/disponibilidad/{emp_id}/cadena")
+def publico_disponibilidad_cadena(
+    emp_id: int,
+    fecha: date = Query(...),
+    servicios: str = Query(..., description="ids en orden, CSV: 3,5"),
+    hasta: Optional[date] = Query(None),
+    retencion: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+) -> dict:
+    """
+    Inicios donde varios servicios entran seguidos, sin huecos entre ellos,
+    dentro de un mismo bloque y con lugar para cada uno (ver crud/combos.py).
+    """
+    ids = _ids_servicios(servicios)
+    hasta = hasta or fecha
+    if hasta < fecha or (hasta - fecha).days >= MAX_DIAS_DISPONIBILIDAD:
+        raise HTTPException(status_code=422, detail=f"Rango inválido (máximo {MAX_DIAS_DISPONIBILIDAD} días)")
+    cadena = cargar_cadena(db, emp_id, ids)
+    if not cadena:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+    oc = cargar_ocupacion(db, emp_id, datetime.combine(fecha, dt_time.min),
+                          datetime.combine(hasta + timedelta(days=1), dt_time.min), retencion=(retencion or None))
+    inicios = buscar_inicios(cadena, compilar_agenda(db, emp_id, fecha, hasta), oc, fecha, hasta, PASO_SLOT_MIN)
+    return {
+        "fecha": fecha,
+        "hasta": hasta,
+        "servicios": [{"id": sv.id, "nombre": sv.nombre, "duracion_min": sv.duracion_min} for sv in cadena.servicios],
+        "duracion_min": int(cadena.duracion.total_seconds() // 60),
+        "opciones": [_cadena_out(cadena, t) for t in inicios],
+    }
+
+# ================== GET /publico/bundle/{codigo} ==================
+DIAS_BUNDLE = 7
+
+def _bundle_disponibilidad(db: Session, emp: EntradaCatalogo) -> dict:
+    """Slots con lugar de cada servicio activo desde ahora hasta el fin del DIAS_BUNDLE-ésimo día.
+
+    Cantidad fija de consultas, haya los servicios que haya: excepciones de
+    horario del rango (el patrón semanal sale del catálogo), recursos
+    activos, turnos y series (una ocupación para todos los servicios).
+    """
+    ahora = ahora_en(emp.zona_horaria)
+    hoy = ahora.date()
+    hasta = hoy + timedelta(days=DIAS_BUNDLE - 1)
+    servicios = emp.activos()
+    agenda = compilar_agenda(db, emp.id, hoy, hasta, semanal=emp.semanal())
+    oc = cargar_ocupacion(db, emp.id, datetime.combine(hoy, dt_time.min),
+                          datetime.combine(hasta + timedelta(days=1), dt_time.min),
+                          cupos={s.id: s.capacidad for s in emp.servicios if s.capacidad > 1})
+    desde_min = a_min(ahora)
+    por_servicio = []
+    for s in servicios:
+        dur, slots = int(s.duracion_min or 30), []
+        dia = hoy
+        while dia <= hasta:
+            base = min_de_dia(dia)
+            for a, b in agenda.bloques(dia):
+                ini, fin_bloque = base + a, base + b
+                while ini + dur <= fin_bloque:
+                    if ini >= desde_min:
+                        libres = oc.libres_min(s.id, s.capacidad, ini, ini + dur)
+                        if libres > 0:
+                            slots.append({"inicio": de_min(ini), "fin": de_min(ini + dur), "libres": libres})
+                    ini += PASO_SLOT_MIN
+            dia += timedelta(days=1)
+        por_servicio.append({"servicio_id": s.id, "capacidad": s.capacidad, "slots": slots})
+    return {"desde": hoy, "hasta": hasta, "recursos": oc.recursos, "servicios": por_servicio,
+            "excepciones": agenda.excepciones_lista()}
+
+def _json(x) -> bytes:
+    return json.dumps(jsonable_encoder(x), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _bundle_etag(db: Session, emp: EntradaCatalogo) -> str:
+    """ETag sin calcular la disponibilidad: versión de la entrada del catálogo (perfil, servicios,
+    horarios, excepciones, series, recursos), cambios_seq (cualquier escritura de turnos),
+    retenciones activas y el minuto actual (los slots que ya pasaron se caen). Lleva el origen
+    del proceso: las versiones del catálogo son locales a cada worker."""
+    seq = db.execute(select(Emprendedor.cambios_seq).where(Emprendedor.id == emp.id)).scalar() or 0
+    holds = sorted(r.id for r in retenciones.store.activas(db, emp.id, None, None))
+    clave = f"{invalidaciones.bus.origen}|{emp.id}|{emp.version}|{seq}|{holds}|{a_min(ahora_en(emp.zona_horaria))}"
+    return '"' + hashlib.sha256(clave.encode()).hexdigest()[:32] + '"'
+
+@router.get("/bundle/{codigo}")
+def publico_bundle(
+    codigo: str,
+    request: Request,
+    stream: bool = Query(False, description="NDJSON: primero ficha/servicios/horarios, después la disponibilidad"),
+    db: Session = Depends(get_db),
+):
+    """
+    Todo lo que necesita la página pública de reserva en un solo pedido:
+    ficha, servicios activos, patrón semanal (mismos formatos que
+    /publico/emprendedores/by-codigo, /publico/servicios y /publico/horarios)
+    y los próximos DIAS_BUNDLE días de disponibilidad por servicio (sólo
+    slots con lugar, desde ahora, con excepciones de horario ya aplicadas).
+
+    El emprendedor se resuelve una vez, desde el catálogo en memoria.
+    El ETag sale de las versiones de lo que mueve la disponibilidad
+    (_bundle_etag), así un If-None-Match igual responde 304 sin calcularla.
+    stream=true manda NDJSON en dos líneas para que la ficha se dibuje
+    antes de calcular la disponibilidad (sin ETag); la segunda línea se
+    arma con una sesión propia, no con la del request.
+    """
+    emp = _del_catalogo(db, codigo, "Código no encontrado")
+    cabecera = {"perfil": _ficha(emp.perfil), "servicios": [s.a_publico() for s in emp.activos()],
+                "horarios": _horarios_cat(emp)}
+
+    if stream:
+        def partes():
+            yield _json(cabecera) + b"\n"
+            with SessionLocal() as s:
+                yield _json({"disponibilidad": _bundle_disponibilidad(s, emp)}) + b"\n"
+        return StreamingResponse(partes(), media_type="application/x-ndjson",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    etag = _bundle_etag(db, emp)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    cuerpo = _json({**cabecera, "disponibilidad": _bundle_disponibilidad(db, emp)})
+    return Response(cuerpo, media_type="application/json", headers=headers)
+
+# ================== POST /publico/retenciones ==================
+@router.post("/retenciones")
+def crear_retencion(payload: dict, db: Session = Depends(get_db)):
+    """
+    Retiene un hueco mientras el cliente completa el checkout.
+    { "codigo", "servicio_id", "inicio", "minutos"?, "reemplaza"? }
+    `reemplaza`: token de una retención anterior del mismo cliente (cambió de horario).
+    Devuelve {id, token, inicio, fin, expira}; 409 si el hueco no está libre.
+    """
+    codigo = (payload.get("codigo") or "").strip()
+    servicio_id = int(payload.get("servicio_id") or 0)
+    try:
+        inicio: datetime = datetime.fromisoformat(str(payload.get("inicio")))
+    except Exception:
+        raise HTTPException(status_code=422, detail="Formato de 'inicio' inválido")
+
+    emp = _del_catalogo(db, codigo)
+    s = emp.servicio(servicio_id)
+    if not s:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+    fin = inicio + timedelta(minutes=int(s.duracion_min or 30))
+    if not dentro_de_horario(db, emp.id, inicio, fin):
+        raise HTTPException(status_code=409, detail="Horario fuera de bloque")
+
+    anterior = (payload.get("reemplaza") or "").strip()
+    if anterior:
+        liberada = retenciones.store.liberar(db, anterior)
+        if liberada:
+            publicar_retencion("liberado", liberada)
+
+    if hay_conflicto(db, emp.id, inicio, fin, servicio=s):
+        raise HTTPException(status_code=409, detail="Horario no disponible")
+    cupo = recursos_activos(db, emp.id) * int(s.capacidad or 1)
+    r = retenciones.store.crear(db, emp.id, inicio, fin, retenciones.ttl_pedido(payload.get("minutos")),
+                                servicio_id=s.id, cupo=cupo)
+    if not r:
+        raise HTTPException(status_code=409, detail="Horario no disponible")
+    publicar_retencion("retenido", r)
+    return r.a_dict(con_token=True)
+
+# ================== DELETE /publico/retenciones/{token} ==================
+@router.delete("/retenciones/{token}", status_code=204)
+def liberar_retencion(token: str, db: Session = Depends(get_db)):
+    r = retenciones.store.liberar(db, token)
+    if r:
+        publicar_retencion("liberado", r)
+    return
+
 # ================== POST /publico/turnos ==================
 @router.post("/turnos")
 def crear_turno_publico(payload: dict, db: Session = Depends(get_db)):
@@ -134,7 +457,8 @@ def crear_turno_publico(payload: dict, db: Session = Depends(get_db)):
       "inicio": "YYYY-MM-DDTHH:MM:SS",
       "cliente_nombre": "...",
       "cliente_contacto": "...",
-      "nota": "..."   # opcional
+      "nota": "...",      # opcional
+      "retencion": "..."  # opcional: token de POST /publico/retenciones
     }
     """
     codigo = (payload.get("codigo") or "").strip()
@@ -144,24 +468,21 @@ def crear_turno_publico(payload: dict, db: Session = Depends(get_db)):
     except Exception:
         raise HTTPException(status_code=422, detail="Formato de 'inicio' inválido")
 
-    emp = db.query(Emprendedor).filter(Emprendedor.codigo_cliente == codigo).first()
-    if not emp:
-        raise HTTPException(status_code=404, detail="Código inválido")
-
-    s = db.query(Servicio).filter(Servicio.id == servicio_id, Servicio.emprendedor_id == emp.id).first()
+    emp = _del_catalogo(db, codigo)
+    s = emp.servicio(servicio_id)
     if not s:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
 
     # calcular fin por duración de servicio
-    from datetime import timedelta
     fin = inicio + timedelta(minutes=int(s.duracion_min or 30))
 
     # validar bloque (usa horarios.inicio/fin TIME + dia_semana 0..6)
     if not dentro_de_horario(db, emp.id, inicio, fin):
         raise HTTPException(status_code=409, detail="Horario fuera de bloque")
 
-    # validar conflicto con turnos
-    if hay_conflicto(db, emp.id, inicio, fin):
+    # validar conflicto con turnos y retenciones ajenas
+    token = (payload.get("retencion") or "").strip() or None
+    if hay_conflicto(db, emp.id, inicio, fin, retencion=token, servicio=s):
         raise HTTPException(status_code=409, detail="Horario no disponible")
 
     t = Turno(
@@ -175,8 +496,14 @@ def crear_turno_publico(payload: dict, db: Session = Depends(get_db)):
         estado="reservado",
     )
     db.add(t)
+    if token:
+        espera.tomar(db, token)   # si la retención era una oferta de la lista de espera
     db.commit()
     db.refresh(t)
+    publicar_turno("ocupado", t)
+    liberada = retenciones.store.liberar(db, token) if token else None
+    if liberada:
+        publicar_retencion("liberado", liberada)
 
     return {
         "id": t.id,
@@ -189,3 +516,191 @@ def crear_turno_publico(payload: dict, db: Session = Depends(get_db)):
         "nota": t.nota,
         "estado": t.estado,
     }
+
+# ================== POST /publico/turnos/cadena ==================
+@router.post("/turnos/cadena")
+def crear_turnos_cadena(payload: dict, db: Session = Depends(get_db)):
+    """
+    Reserva varios servicios seguidos como turnos enlazados (mismo grupo_id):
+    { "codigo", "servicios": [ids en orden], "inicio", "cliente_nombre",
+      "cliente_contacto", "nota"?, "retencion"? }
+    Todo o nada: se valida la cadena entera contra una sola ocupación y se
+    insertan todos en la misma transacción.
+    """
+    codigo = (payload.get("codigo") or "").strip()
+    ids = _ids_servicios(payload.get("servicios"))
+    try:
+        inicio: datetime = datetime.fromisoformat(str(payload.get("inicio")))
+    except Exception:
+        raise HTTPException(status_code=422, detail="Formato de 'inicio' inválido")
+
+    emp = _del_catalogo(db, codigo)
+    cadena = cargar_cadena(db, emp.id, ids)
+    if not cadena:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+    fin = inicio + cadena.duracion
+    if not compilar_agenda(db, emp.id, inicio.date(), inicio.date()).contiene(inicio, fin):
+        raise HTTPException(status_code=409, detail="Horario fuera de bloque")
+    token = (payload.get("retencion") or "").strip() or None
+    oc = cargar_ocupacion(db, emp.id, inicio, fin, retencion=token)
+    if not cadena.entra(oc, inicio):
+        raise HTTPException(status_code=409, detail="Horario no disponible")
+
+    grupo = uuid.uuid4().hex
+    turnos = [
+        Turno(
+            emprendedor_id=emp.id,
+            servicio_id=sv.id,
+            inicio=a,
+            fin=b,
+            cliente_nombre=(payload.get("cliente_nombre") or "Cliente").strip(),
+            cliente_contacto=(payload.get("cliente_contacto") or "").strip() or None,
+            nota=(payload.get("nota") or "").strip() or None,
+            estado="reservado",
+            grupo_id=grupo,
+        )
+        for sv, a, b in cadena.eslabones(inicio)
+    ]
+    db.add_all(turnos)
+    if token:
+        espera.tomar(db, token)
+    db.commit()
+    for t in turnos:
+        db.refresh(t)
+        publicar_turno("ocupado", t)
+    liberada = retenciones.store.liberar(db, token) if token else None
+    if liberada:
+        publicar_retencion("liberado", liberada)
+
+    return {
+        "grupo_id": grupo,
+        "inicio": inicio,
+        "fin": fin,
+        "turnos": [
+            {"id": t.id, "servicio_id": t.servicio_id, "inicio": t.inicio, "fin": t.fin, "estado": t.estado}
+            for t in turnos
+        ],
+    }
+
+# ================== Lista de espera: POST/GET/DELETE /publico/espera ==================
+def _get_espera(db: Session, token: str) -> EsperaTurno:
+    e = db.query(EsperaTurno).filter(EsperaTurno.token == token).first()
+    if not e:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    return e
+
+@router.post("/espera", status_code=201)
+def anotarse_espera(payload: dict, db: Session = Depends(get_db)):
+    """
+    Anota al cliente en la lista de espera de un servicio:
+    { "codigo", "servicio_id", "desde", "hasta", "cliente_nombre", "cliente_contacto" }
+    Si se libera un hueco dentro de [desde, hasta) se le ofrece con una retención
+    corta; lo ve en GET /publico/espera/{token} y reserva con POST /publico/turnos
+    pasando `retencion`.
+    """
+    codigo = (payload.get("codigo") or "").strip()
+    servicio_id = int(payload.get("servicio_id") or 0)
+    try:
+        desde = datetime.fromisoformat(str(payload.get("desde")))
+        hasta = datetime.fromisoformat(str(payload.get("hasta")))
+    except Exception:
+        raise HTTPException(status_code=422, detail="Formato de 'desde'/'hasta' inválido")
+    if hasta <= desde:
+        raise HTTPException(status_code=422, detail="'hasta' debe ser posterior a 'desde'")
+    if hasta - desde > espera.MAX_VENTANA:
+        raise HTTPException(status_code=422, detail=f"Ventana máxima: {espera.MAX_VENTANA.days} días")
+    emp = _del_catalogo(db, codigo)
+    if hasta <= ahora_en(emp.zona_horaria):
+        raise HTTPException(status_code=422, detail="La ventana ya pasó")
+    s = emp.servicio(servicio_id)
+    if not s:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+    espera.vencer(db, emp.id)
+    e = EsperaTurno(
+        token=espera.nuevo_token(),
+        emprendedor_id=emp.id,
+        servicio_id=s.id,
+        desde=desde,
+        hasta=hasta,
+        cliente_nombre=(payload.get("cliente_nombre") or "Cliente").strip(),
+        cliente_contacto=(payload.get("cliente_contacto") or "").strip() or None,
+    )
+    db.add(e)
+    db.commit()
+    db.refresh(e)
+    return espera.a_dict(e, con_token=True)
+
+@router.get("/espera/{token}")
+def ver_espera(token: str, db: Session = Depends(get_db)):
+    e = _get_espera(db, token)
+    if e.estado == "ofrecido" and espera.vencer(db, e.emprendedor_id):
+        db.refresh(e)
+    return espera.a_dict(e)
+
+@router.delete("/espera/{token}", status_code=204)
+def salir_espera(token: str, db: Session = Depends(get_db)):
+    """Baja de la lista; si tenía una oferta vigente, el hueco pasa al siguiente."""
+    e = _get_espera(db, token)
+    if e.estado not in ("esperando", "ofrecido"):
+        return
+    oferta = (e.oferta_inicio, e.oferta_fin, e.oferta_retencion) if e.estado == "ofrecido" else None
+    e.estado = "cancelado"
+    db.commit()
+    if oferta:
+        liberada = retenciones.store.liberar(db, oferta[2])
+        if liberada:
+            publicar_retencion("liberado", liberada)
+        espera.ofrecer(db, e.emprendedor_id, oferta[0], oferta[1])
+    return
+
+# ================== GET /publico/eventos/{emp_id} (SSE) ==================
+KEEPALIVE_S = 15.0
+
+@router.get("/eventos/{emp_id}")
+async def publico_eventos(
+    emp_id: int,
+    request: Request,
+    last_event_id: Optional[str] = Query(None),
+):
+    """
+    Stream Server-Sent Events con los cambios de disponibilidad de la agenda:
+      event: ocupado | liberado  → data {id, servicio_id, inicio, fin}
+      event: retenido            → data {id: "r<n>", inicio, fin, expira} (hold de checkout)
+      event: reset               → el cliente debe volver a pedir /publico/turnos
+    Reconexión: EventSource manda Last-Event-ID solo; también se acepta
+    ?last_event_id= para clientes que no pueden poner headers. Los ids son
+    "<época>-<seq>": uno de antes de un reinicio del proceso recibe reset.
+    """
+    ultimo = request.headers.get("last-event-id") or last_event_id
+
+    sub, pendientes, reset = bus.suscribir(emp_id, ultimo)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if reset:
+                yield "event: reset\ndata: {}\n\n"
+            for ev in pendientes:
+                yield formato_sse(ev, bus.epoca)
+            while not sub.desbordado:
+                try:
+                    ev = await asyncio.wait_for(sub.cola.get(), timeout=KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield formato_sse(ev, bus.epoca)
+            if sub.desbordado:
+                # cliente demasiado lento: que reconecte y resincronice
+                yield "event: reset\ndata: {}\n\n"
+        finally:
+            bus.desuscribir(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
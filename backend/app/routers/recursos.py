@@ -0,0 +1,77 @@
+# app/routers/recursos.py
+from __future__ import annotations
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Path
+from sqlalchemy.orm import Session
+
+from app import models
+from app.deps import get_db, get_current_user
+from app.eventos import bus
+from app.perfilado import RutaMedida
+from app.schemas import RecursoIn, RecursoOut
+
+router = APIRouter(prefix="/recursos", tags=["recursos"], route_class=RutaMedida)
+
+# ===== helpers =====
+def _get_emp_del_usuario(db: Session, user_id: int) -> models.Emprendedor:
+    emp = db.query(models.Emprendedor).filter(models.Emprendedor.usuario_id == user_id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Aún no activaste el plan Emprendedor.")
+    return emp
+
+def _get_recurso(db: Session, emp_id: int, recurso_id: int) -> models.Recurso:
+    r = db.query(models.Recurso).filter(models.Recurso.id == recurso_id, models.Recurso.emprendedor_id == emp_id).first()
+    if not r:
+        raise HTTPException(status_code=404, detail="Recurso no encontrado.")
+    return r
+
+# ===== endpoints =====
+@router.get("/mis", response_model=List[RecursoOut])
+def listar_mis_recursos(db: Session = Depends(get_db), current: models.Usuario = Depends(get_current_user)):
+    """Sillas/boxes/profesionales. Con N activos se atienden N turnos a la vez."""
+    emp = _get_emp_del_usuario(db, current.id)
+    return db.query(models.Recurso).filter(models.Recurso.emprendedor_id == emp.id).order_by(models.Recurso.id).all()
+
+@router.post("", status_code=201, response_model=RecursoOut)
+def crear_recurso(payload: RecursoIn, db: Session = Depends(get_db), current: models.Usuario = Depends(get_current_user)):
+    emp = _get_emp_del_usuario(db, current.id)
+    r = models.Recurso(emprendedor_id=emp.id, nombre=payload.nombre.strip(), activo=payload.activo)
+    db.add(r)
+    db.commit()
+    db.refresh(r)
+    bus.publicar(emp.id, "reset", {})   # cambió la capacidad: la disponibilidad pública se recalcula
+    return r
+
+@router.put("/{recurso_id}", response_model=RecursoOut)
+def actualizar_recurso(
+    payload: RecursoIn,
+    recurso_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    current: models.Usuario = Depends(get_current_user),
+):
+    emp = _get_emp_del_usuario(db, current.id)
+    r = _get_recurso(db, emp.id, recurso_id)
+    r.nombre = payload.nombre.strip()
+    r.activo = payload.activo
+    db.commit()
+    db.refresh(r)
+    bus.publicar(emp.id, "reset", {})
+    return r
+
+@router.delete("/{recurso_id}", status_code=204)
+def eliminar_recurso(
+    recurso_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    current: models.Usuario = Depends(get_current_user),
+):
+    """Los turnos asignados a este recurso quedan sin asignar (recurso_id NULL)."""
+    emp = _get_emp_del_usuario(db, current.id)
+    r = _get_recurso(db, emp.id, recurso_id)
+    # por ORM (no UPDATE masivo): así el delta-sync registra el cambio de cada turno
+    for t in db.query(models.Turno).filter(models.Turno.recurso_id == r.id):
+        t.recurso_id = None
+    db.delete(r)
+    db.commit()
+    bus.publicar(emp.id, "reset", {})
+    return None
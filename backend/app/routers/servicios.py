@@ -2,13 +2,16 @@
 from __future__ import annotations
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Request, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Query, Request, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from app import models
 from app.deps import get_db, get_current_user
+from app.perfilado import RutaMedida
+from app.crud import borrado
 
-router = APIRouter(prefix="/servicios", tags=["servicios"])
+router = APIRouter(prefix="/servicios", tags=["servicios"], route_class=RutaMedida)
 
 # ===== helpers =====
 def _get_emp_del_usuario(db: Session, user_id: int) -> models.Emprendedor:
@@ -26,8 +29,18 @@ def _to_dict(s: models.Servicio) -> Dict[str, Any]:
         "precio": s.precio,
         "color": s.color,
         "activo": s.activo,
+        "capacidad": s.capacidad,
     }
 
+def _capacidad(v: Any) -> int:
+    try:
+        n = int(v if v is not None else 1)
+    except Exception:
+        n = 0
+    if n < 1 or n > 500:
+        raise HTTPException(status_code=400, detail="La capacidad debe estar entre 1 y 500.")
+    return n
+
 def _get_json(request: Request) -> Dict[str, Any]:
     try:
         return request.json() if isinstance(request, dict) else {}
@@ -62,6 +75,7 @@ async def crear_servicio(
     dur_min = body.get("duracion_min", body.get("duracion_minutos"))
     precio = body.get("precio", 0)
     color = body.get("color")
+    capacidad = _capacidad(body.get("capacidad", 1))
 
     if not nombre:
         raise HTTPException(status_code=400, detail="El nombre es obligatorio.")
@@ -80,6 +94,7 @@ async def crear_servicio(
             precio=float(precio) if precio is not None else 0.0,
             color=color or None,
             activo=True,
+            capacidad=capacidad,
         )
         db.add(s)
         db.commit()
@@ -141,6 +156,10 @@ async def actualizar_servicio(
         s.activo = bool(body.get("activo"))
         changed = True
 
+    if "capacidad" in body:
+        s.capacidad = _capacidad(body.get("capacidad"))
+        changed = True
+
     if changed:
         try:
             db.add(s)
@@ -154,7 +173,9 @@ async def actualizar_servicio(
 
 @router.delete("/{servicio_id}", status_code=204)
 def eliminar_servicio(
+    tareas: BackgroundTasks,
     servicio_id: int = Path(..., ge=1),
+    background: bool = Query(False, description="Borrar los turnos en segundo plano (202)"),
     db: Session = Depends(get_db),
     current: models.Usuario = Depends(get_current_user),
 ):
@@ -166,9 +187,14 @@ def eliminar_servicio(
     )
     if not s:
         raise HTTPException(status_code=404, detail="Servicio no encontrado.")
+    # por conjunto y por lotes (crud/borrado.py): no se cargan los turnos en la sesión
+    n = borrado.contar_turnos(db, models.Turno.servicio_id == servicio_id)
+    if background or n > borrado.UMBRAL_FONDO or borrado.en_curso("servicio", servicio_id):
+        borrado.desactivar_servicio(db, servicio_id)
+        borrado.programar(tareas, db.get_bind(), "servicio", servicio_id, borrado.borrar_servicio)
+        return JSONResponse(status_code=202, content={"estado": "en_curso", "turnos": n})
     try:
-        db.delete(s)
-        db.commit()
+        borrado.borrar_servicio(db, servicio_id)
     except Exception as ex:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"No se pudo eliminar el servicio: {ex}")
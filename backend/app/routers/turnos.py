@@ -1,18 +1,32 @@
 ﻿# app/routers/turnos.py
 from __future__ import annotations
-from typing import List, Optional
-from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List, Literal, Optional
+from datetime import date, datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
-from app.models import Turno, Emprendedor, Servicio
-from app.schemas import TurnoCreate, TurnoOut
+from app.eventos import bus, publicar_turno
+from app.perfilado import RutaMedida
+from app.models import Turno, TurnoBorrado, Emprendedor, Servicio, TurnoSerie, TurnoSerieExcepcion
+from app.schemas import (
+    TurnoCreate, TurnoOut, TurnoCambiosOut,
+    TurnoSerieCreate, TurnoSerieOut, TurnoSerieExcepcionIn,
+)
 from app.crud.horarios import dentro_de_horario  # asumido existente en tu proyecto
+from app.crud.turnos import Candidato, hay_conflicto, validar_lote
+from app.crud.cambios import reservar_seq
+from app.crud.capacidad import recurso_del_emprendedor
+from app.crud.huecos import marcar as marcar_huecos
+from app.crud import analitica, cierres as crud_cierres, series as crud_series
+from app.tiempo import a_local, a_min
 
-router = APIRouter(prefix="/turnos", tags=["turnos"])
+router = APIRouter(prefix="/turnos", tags=["turnos"], route_class=RutaMedida)
 
 def _parse_iso(x: Optional[str], name: str) -> datetime:
     if not x:
@@ -52,13 +66,8 @@ def crear_turno_publico(payload: PublicTurnoCreate, db: Session = Depends(get_db
     if not dentro_de_horario(db, emp.id, payload.inicio, fin):
         raise HTTPException(status_code=409, detail="Horario fuera de bloque")
 
-    conflict = db.query(Turno).filter(
-        Turno.emprendedor_id == emp.id,
-        Turno.inicio == payload.inicio,
-        Turno.fin == fin,
-        Turno.estado == "reservado",
-    ).first()
-    if conflict:
+    # superposición con turnos, retenciones y ocurrencias de series
+    if hay_conflicto(db, emp.id, payload.inicio, fin, servicio=s):
         raise HTTPException(status_code=409, detail="Horario no disponible")
 
     t = Turno(
@@ -72,6 +81,7 @@ def crear_turno_publico(payload: PublicTurnoCreate, db: Session = Depends(get_db
         estado="reservado",
     )
     db.add(t); db.commit(); db.refresh(t)
+    publicar_turno("ocupado", t)
     return TurnoOut.model_validate(t)
 
 # =========================
@@ -88,15 +98,75 @@ def mis_turnos(
     if not emp:
         raise HTTPException(status_code=404, detail="Emprendedor no activado")
 
-    d1 = _parse_iso(desde, "desde")
-    d2 = _parse_iso(hasta, "hasta")
+    d1 = a_local(_parse_iso(desde, "desde"), emp.zona_horaria)
+    d2 = a_local(_parse_iso(hasta, "hasta"), emp.zona_horaria)
 
+    # rango por minutos enteros sobre ix_turnos_emp_min (ya ordenado por inicio)
+    m1, m2 = a_min(d1), a_min(d2)
     qs = (
         db.query(Turno)
-        .filter(Turno.emprendedor_id == emp.id, Turno.inicio >= d1, Turno.fin <= d2)
-        .order_by(Turno.inicio.asc())
+        .filter(Turno.emprendedor_id == emp.id, Turno.inicio_min >= m1, Turno.inicio_min < m2, Turno.fin_min <= m2)
+        .order_by(Turno.inicio_min.asc())
+    )
+    items = [TurnoOut.model_validate(t) for t in qs.all()]
+    ocs = [o for o in crud_series.ocurrencias_en_rango(db, emp.id, d1, d2) if o.inicio >= d1 and o.fin <= d2]
+    if ocs:
+        items.extend(_ocurrencia_out(o) for o in ocs)
+        items.sort(key=lambda t: t.inicio)
+    return items
+
+@router.get("/mis/changes", response_model=TurnoCambiosOut)
+def mis_turnos_cambios(
+    since: int = Query(0, ge=0),
+    limite: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Delta-sync de la agenda: turnos creados/modificados y borrados con
+    seq > since, en orden de seq. since=0 trae todo (sync inicial).
+    """
+    emp = db.query(Emprendedor).filter(Emprendedor.usuario_id == user.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Emprendedor no activado")
+
+    # cursor de otra base / ya purgado → resync completo desde 0
+    reset = since > emp.cambios_seq or (since > 0 and since < emp.cambios_horizonte)
+    if reset:
+        since = 0
+
+    turnos = (
+        db.query(Turno)
+        .filter(Turno.emprendedor_id == emp.id, Turno.seq > since)
+        .order_by(Turno.seq.asc())
+        .limit(limite + 1)
+        .all()
+    )
+    borrados = (
+        db.query(TurnoBorrado.seq, TurnoBorrado.turno_id)
+        .filter(TurnoBorrado.emprendedor_id == emp.id, TurnoBorrado.seq > since)
+        .order_by(TurnoBorrado.seq.asc())
+        .limit(limite + 1)
+        .all()
+    ) if since > 0 else []  # en un sync inicial no hay nada local que borrar
+
+    # merge por seq de las dos listas (cada seq es único por emprendedor)
+    items = sorted(
+        [(t.seq, t) for t in turnos] + [(seq, tid) for seq, tid in borrados],
+        key=lambda x: x[0],
+    )
+    mas = len(items) > limite
+    items = items[:limite]
+    cursor = max(emp.cambios_seq, since)
+    if items:
+        cursor = items[-1][0] if mas else max(cursor, items[-1][0])
+    return TurnoCambiosOut(
+        cursor=cursor,
+        reset=reset,
+        mas=mas,
+        cambios=[TurnoOut.model_validate(x) for _, x in items if isinstance(x, Turno)],
+        borrados=[x for _, x in items if not isinstance(x, Turno)],
     )
-    return [TurnoOut.model_validate(t) for t in qs.all()]
 
 class OwnerTurnoCreate(BaseModel):
     servicio_id: int
@@ -104,6 +174,7 @@ class OwnerTurnoCreate(BaseModel):
     cliente_nombre: Optional[str] = "Cliente"
     cliente_contacto: Optional[str] = None
     nota: Optional[str] = None
+    recurso_id: Optional[int] = None       # silla/profesional; sin él ocupa cualquiera libre
 
 @router.post("", response_model=TurnoOut)
 def crear_turno_owner(
@@ -119,22 +190,21 @@ def crear_turno_owner(
     if not s:
         raise HTTPException(status_code=404, detail="Servicio no encontrado")
 
+    if payload.recurso_id and not recurso_del_emprendedor(db, emp.id, payload.recurso_id):
+        raise HTTPException(status_code=404, detail="Recurso no encontrado")
+
     fin = payload.inicio + timedelta(minutes=s.duracion_min)
     if not dentro_de_horario(db, emp.id, payload.inicio, fin):
         raise HTTPException(status_code=409, detail="Fuera de horario")
 
-    conflict = db.query(Turno).filter(
-        Turno.emprendedor_id == emp.id,
-        Turno.inicio == payload.inicio,
-        Turno.fin == fin,
-        Turno.estado == "reservado",
-    ).first()
-    if conflict:
+    # superposición con turnos, retenciones y ocurrencias de series (o falta de lugar)
+    if hay_conflicto(db, emp.id, payload.inicio, fin, servicio=s, recurso_id=payload.recurso_id):
         raise HTTPException(status_code=409, detail="Horario no disponible")
 
     t = Turno(
         emprendedor_id=emp.id,
         servicio_id=s.id,
+        recurso_id=payload.recurso_id,
         inicio=payload.inicio,
         fin=fin,
         cliente_nombre=(payload.cliente_nombre or "Cliente").strip(),
@@ -143,8 +213,146 @@ def crear_turno_owner(
         estado="reservado",
     )
     db.add(t); db.commit(); db.refresh(t)
+    publicar_turno("ocupado", t)
     return TurnoOut.model_validate(t)
 
+# =========================
+# Lote (dueño): N turnos en una transacción
+# =========================
+class TurnoBatchIn(BaseModel):
+    items: List[OwnerTurnoCreate] = Field(..., min_length=1, max_length=500)
+    modo: Literal["todo_o_nada", "best_effort"] = "todo_o_nada"
+
+class TurnoBatchItemOut(BaseModel):
+    indice: int
+    ok: bool
+    status: int
+    error: Optional[str] = None
+    turno: Optional[TurnoOut] = None
+
+class TurnoBatchOut(BaseModel):
+    creados: int
+    fallidos: int
+    resultados: List[TurnoBatchItemOut]
+
+@router.post("/batch", response_model=TurnoBatchOut)
+def crear_turnos_lote(
+    payload: TurnoBatchIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Valida todos los candidatos juntos (servicios/horarios/ocupados cargados
+    una vez, más superposiciones dentro del lote) e inserta los válidos con
+    un solo executemany.
+    - todo_o_nada: si alguno falla no se crea ninguno (409 con el detalle).
+    - best_effort: se crean los válidos y se informa el resto.
+    """
+    emp = db.query(Emprendedor).filter(Emprendedor.usuario_id == user.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Emprendedor no activado")
+
+    cands = validar_lote(db, emp.id, [Candidato(it.servicio_id, it.inicio, it.recurso_id) for it in payload.items])
+    fallidos = [i for i, c in enumerate(cands) if c.error]
+    resultados = [
+        TurnoBatchItemOut(indice=i, ok=False, status=c.status, error=c.error)
+        for i, c in enumerate(cands) if c.error
+    ]
+    if fallidos and payload.modo == "todo_o_nada":
+        raise HTTPException(status_code=409, detail=TurnoBatchOut(
+            creados=0, fallidos=len(fallidos), resultados=resultados,
+        ).model_dump(mode="json"))
+
+    filas, indices = [], []
+    for i, (c, it) in enumerate(zip(cands, payload.items)):
+        if c.error:
+            continue
+        indices.append(i)
+        filas.append({
+            "emprendedor_id": emp.id,
+            "servicio_id": c.servicio_id,
+            "recurso_id": c.recurso_id,
+            "inicio": c.inicio,
+            "fin": c.fin,
+            "cliente_nombre": (it.cliente_nombre or "Cliente").strip(),
+            "cliente_contacto": (it.cliente_contacto or "-").strip(),
+            "nota": (it.nota or "").strip() or None,
+            "estado": "reservado",
+            "created_at": datetime.utcnow(),
+        })
+    if filas:
+        # el executemany no pasa por before_flush: los seq del delta-sync y la analítica se anotan acá
+        primero = reservar_seq(db, emp.id, len(filas))
+        analitica.tocado(db)
+        for k, f in enumerate(filas):
+            f["seq"] = primero + k
+        ids = db.execute(
+            insert(Turno).returning(Turno.id, sort_by_parameter_order=True), filas
+        ).scalars().all()
+        marcar_huecos(db, emp.id, min(f["inicio"] for f in filas).date(), max(f["inicio"] for f in filas).date())
+        db.commit()
+        for i, tid, f in zip(indices, ids, filas):
+            f["id"] = tid
+            publicar_turno("ocupado", SimpleNamespace(**f))
+            resultados.append(TurnoBatchItemOut(indice=i, ok=True, status=200, turno=TurnoOut.model_validate(f)))
+    resultados.sort(key=lambda r: r.indice)
+    return TurnoBatchOut(creados=len(filas), fallidos=len(fallidos), resultados=resultados)
+
+class CierreRangoIn(BaseModel):
+    desde: datetime
+    hasta: datetime
+    mover_min: Optional[int] = Field(None, ge=-60 * 24 * 366, le=60 * 24 * 366)   # None = cancelar
+    sin_lugar: Literal["error", "cancelar", "dejar"] = "error"
+    cerrar_agenda: bool = False          # además cerrar el rango en la agenda (excepción de horario)
+    motivo: Optional[str] = Field(None, max_length=120)
+
+class CierreRangoOut(BaseModel):
+    cancelados: int
+    movidos: int
+    dejados: int
+    fallidos: List[dict]
+    fechas_cerradas: List[date]
+
+MAX_DIAS_CIERRE = 366
+
+@router.post("/cerrar-rango", response_model=CierreRangoOut)
+def cerrar_rango(
+    payload: CierreRangoIn,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Cancela o corre (mover_min) de una vez todos los turnos reservados que
+    empiezan en [desde, hasta), en vez de borrarlos de a uno. Los corridos se
+    revalidan juntos contra horarios y ocupación; con sin_lugar="error" y
+    alguno que no entra no se toca nada (409 con el detalle). Un solo evento
+    "reset" para la agenda pública.
+    """
+    emp = db.query(Emprendedor).filter(Emprendedor.usuario_id == user.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Emprendedor no activado")
+    if payload.hasta <= payload.desde:
+        raise HTTPException(status_code=422, detail="'hasta' debe ser posterior a 'desde'")
+    if (payload.hasta - payload.desde).days >= MAX_DIAS_CIERRE:
+        raise HTTPException(status_code=422, detail=f"Rango máximo: {MAX_DIAS_CIERRE} días")
+
+    res = crud_cierres.cerrar_rango(
+        db, emp.id, payload.desde, payload.hasta, mover_min=payload.mover_min,
+        sin_lugar=payload.sin_lugar, cerrar_agenda=payload.cerrar_agenda,
+        motivo=(payload.motivo or "").strip() or None,
+    )
+    out = CierreRangoOut(
+        cancelados=len(res.cancelados), movidos=len(res.movidos), dejados=len(res.dejados),
+        fallidos=res.fallidos, fechas_cerradas=res.fechas_cerradas,
+    )
+    if res.fallidos and payload.sin_lugar == "error":
+        db.rollback()
+        raise HTTPException(status_code=409, detail=out.model_dump(mode="json"))
+    db.commit()
+    if out.cancelados or out.movidos or out.fechas_cerradas:
+        bus.publicar(emp.id, "reset", {"cancelados": out.cancelados, "movidos": out.movidos})
+    return out
+
 @router.delete("/{turno_id}", status_code=204)
 def borrar_turno(
     turno_id: int = Path(..., ge=1),
@@ -158,4 +366,153 @@ def borrar_turno(
     if not t:
         raise HTTPException(status_code=404, detail="Turno no encontrado")
     db.delete(t); db.commit()
+    publicar_turno("liberado", t)
+    return
+
+# =========================
+# Series recurrentes (dueño)
+# =========================
+def _ocurrencia_out(o: crud_series.Ocurrencia) -> TurnoOut:
+    s = o.serie
+    return TurnoOut(
+        id=None, serie_id=s.id, emprendedor_id=s.emprendedor_id, servicio_id=s.servicio_id or 0,
+        inicio=o.inicio, fin=o.fin, cliente_nombre=s.cliente_nombre, cliente_contacto=s.cliente_contacto,
+        nota=s.nota, estado="reservado",
+    )
+
+def _serie_out(s: TurnoSerie) -> TurnoSerieOut:
+    return TurnoSerieOut(
+        id=s.id, emprendedor_id=s.emprendedor_id, servicio_id=s.servicio_id, inicio=s.inicio,
+        duracion_min=s.duracion_min, frecuencia=s.frecuencia, intervalo=s.intervalo,
+        dias_semana=sorted((d + 1) % 7 for d in crud_series.dias_python(s)), hasta=s.hasta,
+        cliente_nombre=s.cliente_nombre, cliente_contacto=s.cliente_contacto, nota=s.nota,
+        regla=crud_series.regla_rrule(s), excepciones=sorted(e.fecha for e in s.excepciones),
+    )
+
+def _get_serie_owner(db: Session, user, serie_id: int) -> TurnoSerie:
+    emp = db.query(Emprendedor).filter(Emprendedor.usuario_id == user.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Emprendedor no activado")
+    s = db.query(TurnoSerie).filter(TurnoSerie.id == serie_id, TurnoSerie.emprendedor_id == emp.id).first()
+    if not s:
+        raise HTTPException(status_code=404, detail="Serie no encontrada")
+    return s
+
+@router.get("/series", response_model=List[TurnoSerieOut])
+def listar_series(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    emp = db.query(Emprendedor).filter(Emprendedor.usuario_id == user.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Emprendedor no activado")
+    qs = db.query(TurnoSerie).filter(TurnoSerie.emprendedor_id == emp.id).order_by(TurnoSerie.inicio.asc())
+    return [_serie_out(s) for s in qs.all()]
+
+@router.post("/series", response_model=TurnoSerieOut)
+def crear_serie(
+    payload: TurnoSerieCreate,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    emp = db.query(Emprendedor).filter(Emprendedor.usuario_id == user.id).first()
+    if not emp:
+        raise HTTPException(status_code=404, detail="Emprendedor no activado")
+    svc = db.query(Servicio).filter(Servicio.id == payload.servicio_id, Servicio.emprendedor_id == emp.id).first()
+    if not svc:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+    if payload.hasta and payload.hasta < payload.inicio.date():
+        raise HTTPException(status_code=400, detail="'hasta' es anterior al inicio")
+
+    s = TurnoSerie(
+        emprendedor_id=emp.id,
+        servicio_id=svc.id,
+        inicio=payload.inicio,
+        duracion_min=int(svc.duracion_min),
+        frecuencia=payload.frecuencia,
+        intervalo=payload.intervalo,
+        dias_semana=",".join(str(d) for d in sorted(set(payload.dias_semana))) if payload.dias_semana else None,
+        hasta=payload.hasta,
+        cliente_nombre=(payload.cliente_nombre or "Cliente").strip(),
+        cliente_contacto=(payload.cliente_contacto or "-").strip(),
+        nota=(payload.nota or "").strip() or None,
+    )
+    if payload.conteo:
+        fin_conteo = crud_series.hasta_por_conteo(s, payload.conteo)
+        s.hasta = min(s.hasta, fin_conteo) if s.hasta else fin_conteo
+
+    # todas las ocurrencias contra horarios, turnos y otras series, en un solo pase
+    fuera, conflicto = crud_series.validar_serie(db, s)
+    malas = sorted(set(fuera) | set(conflicto))
+    if malas and not payload.omitir_conflictos:
+        raise HTTPException(status_code=409, detail={
+            "mensaje": "Hay ocurrencias que no se pueden reservar",
+            "fuera_de_horario": [x.isoformat() for x in fuera],
+            "en_conflicto": [x.isoformat() for x in conflicto],
+        })
+    db.add(s)
+    db.flush()
+    for x in malas:
+        db.add(TurnoSerieExcepcion(serie_id=s.id, fecha=x.date()))
+    db.commit()
+    db.refresh(s)
+    bus.publicar(emp.id, "reset", {})   # la agenda cambió en muchas fechas: que el cliente recargue
+    return _serie_out(s)
+
+@router.delete("/series/{serie_id}", status_code=204)
+def borrar_serie(
+    serie_id: int = Path(..., ge=1),
+    desde: Optional[str] = Query(None, description="cortar la serie desde esta fecha (conserva lo anterior)"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    s = _get_serie_owner(db, user, serie_id)
+    corte = _parse_iso(desde, "desde").date() if desde else None
+    if corte and corte < s.inicio.date():
+        raise HTTPException(status_code=422, detail="'desde' es anterior al inicio de la serie")
+    if corte and corte > s.inicio.date():
+        if s.hasta is not None and s.hasta < corte:
+            return   # ya terminaba antes del corte: no hay nada que sacar
+        s.hasta = corte - timedelta(days=1)
+    else:
+        db.delete(s)
+    db.commit()
+    bus.publicar(s.emprendedor_id, "reset", {})
+    return
+
+@router.post("/series/{serie_id}/excepciones", status_code=201)
+def agregar_excepcion(
+    payload: TurnoSerieExcepcionIn,
+    serie_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Saca una fecha puntual de la serie (cancelar una sola ocurrencia)."""
+    s = _get_serie_owner(db, user, serie_id)
+    db.add(TurnoSerieExcepcion(serie_id=s.id, fecha=payload.fecha))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()   # ya estaba exceptuada
+    bus.publicar(s.emprendedor_id, "reset", {})
+    return {"serie_id": s.id, "fecha": payload.fecha}
+
+@router.delete("/series/{serie_id}/excepciones/{fecha}", status_code=204)
+def quitar_excepcion(
+    fecha: str,
+    serie_id: int = Path(..., ge=1),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Vuelve a activar una ocurrencia exceptuada (si el hueco sigue libre)."""
+    s = _get_serie_owner(db, user, serie_id)
+    f = _parse_iso(fecha, "fecha").date()
+    e = db.query(TurnoSerieExcepcion).filter(TurnoSerieExcepcion.serie_id == s.id, TurnoSerieExcepcion.fecha == f).first()
+    if not e:
+        raise HTTPException(status_code=404, detail="Excepción no encontrada")
+    ini = datetime.combine(f, s.inicio.time())
+    fin = ini + timedelta(minutes=s.duracion_min)
+    svc = db.get(Servicio, s.servicio_id) if s.servicio_id else None
+    if hay_conflicto(db, s.emprendedor_id, ini, fin, servicio=svc):
+        raise HTTPException(status_code=409, detail="Horario no disponible")
+    db.delete(e)
+    db.commit()
+    bus.publicar(s.emprendedor_id, "reset", {})
     return
@@ -1,6 +1,7 @@
 ﻿# app/routers/usuarios.py
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status, Header, UploadFile, File, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Header, UploadFile, File, Request, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr, field_validator
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -9,8 +10,10 @@ from datetime import datetime
 
 from app import models, schemas
 from app.deps import get_db
+from app.perfilado import RutaMedida
+from app.crud import borrado
 
-router = APIRouter(prefix="/usuarios", tags=["usuarios"])
+router = APIRouter(prefix="/usuarios", tags=["usuarios"], route_class=RutaMedida)
 
 # =============== Helpers ===============
 def sha256(s: str) -> str:
@@ -242,6 +245,29 @@ def me(authorization: Optional[str] = Header(default=None), db: Session = Depend
     u_out["email"] = _safe_email_for_output(u_out.get("email"))
     return schemas.UsuarioOut.model_validate(u_out)
 
+# =============== Baja de cuenta ===============
+@router.delete("/me", status_code=204)
+def borrar_me(
+    tareas: BackgroundTasks,
+    background: bool = Query(False, description="Borrar en segundo plano (202)"),
+    authorization: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    """Borra la cuenta y, si tiene, el negocio con toda su agenda (crud/borrado.py)."""
+    u = get_current_user(db, authorization)
+    uid = u.id
+    emp_id = db.query(models.Emprendedor.id).filter(models.Emprendedor.usuario_id == uid).scalar()
+    n = borrado.contar_turnos(db, models.Turno.emprendedor_id == emp_id) if emp_id else 0
+    if background or n > borrado.UMBRAL_FONDO or borrado.en_curso("usuario", uid):
+        u.is_active = False
+        db.commit()
+        if emp_id:
+            borrado.desactivar_emprendedor(db, emp_id)
+        borrado.programar(tareas, db.get_bind(), "usuario", uid, borrado.borrar_usuario)
+        return JSONResponse(status_code=202, content={"estado": "en_curso", "turnos": n})
+    borrado.borrar_usuario(db, uid)
+    return None
+
 # =============== Update perfil (ID) ===============
 @router.put("/{usuario_id}", response_model=schemas.UsuarioOut)
 @router.patch("/{usuario_id}", response_model=schemas.UsuarioOut)
@@ -1,7 +1,7 @@
 # app/schemas.py
 from __future__ import annotations
 from typing import Optional, List, Literal
-from datetime import datetime, time
+from datetime import datetime, time, date
 import re
 from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 
@@ -64,6 +64,7 @@ class EmprendedorBase(ORMModel):
     web: Optional[str] = None
     email_contacto: Optional[str] = None
     logo_url: Optional[str] = None
+    zona_horaria: Optional[str] = None   # IANA; None = la zona por defecto (app/tiempo.py)
 
 class EmprendedorCreate(ORMModel):
     usuario_id: int
@@ -91,6 +92,7 @@ class EmprendedorUpdate(ORMModel):
     web: Optional[str] = None
     email_contacto: Optional[str] = None
     logo_url: Optional[str] = None
+    zona_horaria: Optional[str] = None
 
 class EmprendedorOut(EmprendedorBase):
     id: int
@@ -101,12 +103,18 @@ class ActivacionEmprendedorOut(ORMModel):
     token: Optional[str] = None
     emprendedor: EmprendedorOut
 
+class EmprendedorHuecoOut(ORMModel):
+    """Resultado de GET /emprendedores/disponibles: el primer hueco libre en la ventana pedida."""
+    emprendedor: EmprendedorOut
+    proximo: datetime
+
 # ========= SERVICIOS =========
 class ServicioBase(ORMModel):
     nombre: str
     duracion_min: int = Field(ge=5, le=1440)
     precio: Optional[float] = 0.0
     color: Optional[str] = None
+    capacidad: int = Field(1, ge=1, le=500)   # lugares por turno (clase grupal)
 
 class ServicioCreate(ServicioBase):
     emprendedor_id: Optional[int] = None
@@ -116,11 +124,21 @@ class ServicioUpdate(ORMModel):
     duracion_min: Optional[int] = Field(default=None, ge=5, le=1440)
     precio: Optional[float] = None
     color: Optional[str] = None
+    capacidad: Optional[int] = Field(default=None, ge=1, le=500)
 
 class ServicioOut(ServicioBase):
     id: int
     emprendedor_id: int
 
+# ========= RECURSOS =========
+class RecursoIn(ORMModel):
+    nombre: str = Field(min_length=1, max_length=120)
+    activo: bool = True
+
+class RecursoOut(RecursoIn):
+    id: int
+    emprendedor_id: int
+
 # ========= HORARIOS =========
 class HorarioBase(ORMModel):
     dia_semana: int = Field(ge=0, le=6)
@@ -134,6 +152,22 @@ class HorarioOut(HorarioBase):
 class HorariosReplaceIn(ORMModel):
     items: List[HorarioBase]
 
+class BloqueHorario(ORMModel):
+    desde: time
+    hasta: time
+
+class HorarioExcepcionIn(ORMModel):
+    """Cierre u horario especial para una fecha (o un rango fecha..hasta, p.ej. vacaciones).
+
+    Reemplaza las excepciones que ya hubiera en esas fechas. `cerrado=False`
+    con `bloques` define el horario especial de cada día del rango.
+    """
+    fecha: date
+    hasta: Optional[date] = None
+    cerrado: bool = True
+    bloques: List[BloqueHorario] = []
+    motivo: Optional[str] = Field(None, max_length=120)
+
 # ========= TURNOS =========
 class TurnoBase(ORMModel):
     inicio: datetime
@@ -147,9 +181,166 @@ class TurnoCreate(TurnoBase):
     emprendedor_id: int
 
 class TurnoOut(TurnoBase):
-    id: int
+    id: Optional[int] = None          # None = ocurrencia de una serie (no materializada)
     servicio_id: int
     emprendedor_id: int
     creado_por_user_id: Optional[int] = None
     created_at: Optional[datetime] = None
     estado: Optional[Literal["reservado", "confirmado", "cancelado"]] = "reservado"
+    seq: Optional[int] = None
+    serie_id: Optional[int] = None
+    recurso_id: Optional[int] = None
+    grupo_id: Optional[str] = None
+
+class TurnoCambiosOut(ORMModel):
+    """Delta-sync: aplicar primero `borrados` y después `cambios` (upsert por id)."""
+    cursor: int                  # mandar como ?since= en la próxima llamada
+    reset: bool = False          # el cursor no sirve más: descartar la cache local
+    mas: bool = False            # quedan cambios: volver a pedir con el nuevo cursor
+    cambios: List[TurnoOut]
+    borrados: List[int]
+
+class TurnoSerieCreate(ORMModel):
+    servicio_id: int
+    inicio: datetime                                  # primera ocurrencia
+    frecuencia: Literal["diaria", "semanal"] = "semanal"
+    intervalo: int = Field(1, ge=1, le=52)
+    dias_semana: Optional[List[int]] = None           # 0=Dom..6=Sáb; default: el día de `inicio`
+    hasta: Optional[date] = None
+    conteo: Optional[int] = Field(None, ge=1, le=1000)
+    cliente_nombre: Optional[str] = "Cliente"
+    cliente_contacto: Optional[str] = None
+    nota: Optional[str] = None
+    omitir_conflictos: bool = False                   # en vez de 409, excluir esas fechas
+
+    @field_validator("dias_semana")
+    @classmethod
+    def _dias_validos(cls, v):
+        if v is not None and any(d < 0 or d > 6 for d in v):
+            raise ValueError("dias_semana va de 0 (domingo) a 6 (sábado)")
+        return v
+
+class TurnoSerieOut(ORMModel):
+    id: int
+    emprendedor_id: int
+    servicio_id: Optional[int] = None
+    inicio: datetime
+    duracion_min: int
+    frecuencia: str
+    intervalo: int
+    dias_semana: List[int]
+    hasta: Optional[date] = None
+    cliente_nombre: Optional[str] = None
+    cliente_contacto: Optional[str] = None
+    nota: Optional[str] = None
+    regla: str
+    excepciones: List[date] = []
+
+class TurnoSerieExcepcionIn(ORMModel):
+    fecha: date
+
+# ========= ESTADÍSTICAS =========
+class StatsRango(ORMModel):
+    desde: datetime
+    hasta: datetime
+
+class StatsPorDiaItem(ORMModel):
+    fecha: date
+    cantidad: int
+
+class StatsPorServicioItem(ORMModel):
+    servicio_id: int
+    servicio_nombre: str
+    cantidad: int
+    minutos_totales: int
+
+class StatsResumenOut(ORMModel):
+    rango: StatsRango
+    total_turnos: int
+    por_dia: List[StatsPorDiaItem] = []
+    por_servicio: List[StatsPorServicioItem] = []
+
+class StatsOcupacionDiaItem(ORMModel):
+    fecha: date
+    turnos: int
+    minutos_reservados: int
+    minutos_agenda: int
+    ocupacion: float
+    ingresos: float
+
+class StatsOcupacionServicioItem(ORMModel):
+    servicio_id: int
+    servicio_nombre: str
+    cantidad: int
+    cancelados: int
+    minutos_totales: int
+    ingresos: float
+
+class StatsOcupacionOut(ORMModel):
+    rango: StatsRango
+    total_turnos: int                 # incluye cancelados
+    cancelados: int
+    tasa_cancelacion: float
+    minutos_reservados: int
+    minutos_agenda: int               # horario × recursos activos
+    ocupacion: float
+    ingresos: float
+    por_dia: List[StatsOcupacionDiaItem] = []
+    por_servicio: List[StatsOcupacionServicioItem] = []
+    demanda: List[List[int]] = []     # 7 × 24: [día de la semana 0=Dom][hora] → turnos
+
+# ========= ADMIN: ANALÍTICA =========
+class AdminRankingItem(ORMModel):
+    emprendedor_id: int
+    nombre: str
+    codigo_cliente: Optional[str] = None
+    rubro: str
+    turnos: int
+    turnos_prev: int
+    cancelados: int
+    ingresos: float
+    ingresos_prev: float
+    crecimiento: Optional[float] = None   # (turnos - turnos_prev) / turnos_prev
+    puesto_turnos: int
+    puesto_ingresos: int
+    puesto_crecimiento: int
+    puesto_rubro: int                     # por ingresos dentro del rubro
+
+class AdminRankingOut(ORMModel):
+    desde: date
+    hasta: date
+    desde_prev: date
+    hasta_prev: date
+    total: int
+    items: List[AdminRankingItem] = []
+
+class AdminRubroItem(ORMModel):
+    rubro: str
+    emprendedores: int
+    activos: int
+    turnos: int
+    turnos_prev: int
+    ingresos: float
+    crecimiento: Optional[float] = None
+    participacion: float                  # de los ingresos de la plataforma
+    puesto: int
+
+class AdminRubrosOut(ORMModel):
+    desde: date
+    hasta: date
+    items: List[AdminRubroItem] = []
+
+class AdminCohorteMes(ORMModel):
+    mes: str                              # YYYY-MM
+    activos: int
+    tasa: float
+
+class AdminCohorte(ORMModel):
+    cohorte: str                          # mes de alta, YYYY-MM
+    emprendedores: int
+    meses: List[AdminCohorteMes] = []
+
+class AdminCohortesOut(ORMModel):
+    desde: date
+    hasta: date
+    items: List[AdminCohorte] = []
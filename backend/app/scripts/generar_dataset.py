@@ -0,0 +1,330 @@
+# app/scripts/generar_dataset.py
+"""
+Generador de datasets sintéticos grandes y reproducibles (carga / benchmarks).
+
+Reutiliza el "realismo" de seed_min_final (OWNERS, SERVICIOS_RUBRO, BLOQUES,
+CLIENTES) pero inserta con insert() + executemany en transacciones por
+chunks, sin pasar por la sesión ORM. Misma semilla ⇒ mismo dataset.
+
+Ejemplos:
+    python -m app.scripts.generar_dataset --tenants 50 --meses 3
+    # ~10M turnos (≈ 3300 emprendedores × 13 meses, un par de minutos en SQLite)
+    python -m app.scripts.generar_dataset --db sqlite:///./bench.db --reset \\
+        --tenants 3300 --meses 12 --seed 7 --hoy 2026-01-15
+"""
+from __future__ import annotations
+import argparse
+import random
+import time as _time
+from dataclasses import dataclass, field
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, create_engine, event, func, insert, select, update
+from sqlalchemy.engine import Engine
+
+from app import models
+from app.database import Base
+from app.tiempo import min_de_dia
+from app.scripts.seed_min_final import OWNERS, SERVICIOS_RUBRO, BLOQUES, CLIENTES, sha256
+
+ABC_CODIGO = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+# Peso relativo de cada hora de inicio (picos de media mañana y salida del trabajo)
+PICOS_HORA = {9: 0.8, 10: 1.5, 11: 1.7, 12: 1.1, 13: 0.7, 16: 0.9, 17: 1.6, 18: 1.9, 19: 1.3}
+
+
+@dataclass
+class ConfigDataset:
+    tenants: int = 12
+    servicios_max: int = 4            # tope de servicios por emprendedor (según rubro)
+    meses: int = 3                    # meses hacia atrás, incluyendo el actual
+    futuro: int = 1                   # meses hacia adelante (turnos "reservado")
+    densidad: float = 0.55            # prob. base de ocupar cada hueco de 15' (× pico de la hora)
+    cancelacion: float = 0.08         # proporción de turnos cancelados
+    seed: int = 42
+    chunk: int = 50_000               # filas por transacción
+    hoy: Optional[date] = None        # fija "hoy" para reproducir datasets entre días
+    picos: Dict[int, float] = field(default_factory=lambda: dict(PICOS_HORA))
+
+
+# ===== Helpers =====
+def _sumar_meses(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def rango_fechas(cfg: ConfigDataset) -> Tuple[date, date]:
+    hoy = cfg.hoy or date.today()
+    inicio = _sumar_meses(date(hoy.year, hoy.month, 1), -(cfg.meses - 1))
+    fin = _sumar_meses(date(hoy.year, hoy.month, 1), cfg.futuro + 1) - timedelta(days=1)
+    return inicio, fin
+
+
+def _codigo(rng: random.Random, usados: set) -> str:
+    while True:
+        c = "".join(rng.choice(ABC_CODIGO) for _ in range(8))
+        if c not in usados:
+            usados.add(c)
+            return c
+
+
+def _bloques_por_dia() -> Dict[int, List[Tuple[int, int]]]:
+    """BLOQUES → {dia_semana(0=Dom): [(ini_min, fin_min), ...]}."""
+    out: Dict[int, List[Tuple[int, int]]] = {}
+    for dia, ini, fin in BLOQUES:
+        out.setdefault(dia, []).append((ini.hour * 60 + ini.minute, fin.hour * 60 + fin.minute))
+    return out
+
+
+def _max_id(conn, model) -> int:
+    return conn.execute(select(func.coalesce(func.max(model.id), 0))).scalar_one()
+
+
+def _pragmas_rapidos(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=OFF")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.close()
+
+
+# ===== Generación de turnos (por emprendedor) =====
+COLS_TURNO = (
+    "emprendedor_id", "servicio_id", "inicio", "fin",
+    "cliente_nombre", "cliente_contacto", "estado", "created_at", "seq",
+    "inicio_min", "fin_min",
+)
+
+
+def _formateador(engine: Engine, dias: List[date]) -> Callable[[int, int], object]:
+    """fmt(i_dia, minuto) → valor para la columna DateTime.
+
+    En SQLite devuelve directamente el string que guarda SQLAlchemy
+    ('YYYY-MM-DD HH:MM:SS.ffffff'), así el executemany va crudo al driver.
+    """
+    if engine.dialect.name == "sqlite":
+        pref = [d.isoformat() + " " for d in dias]
+        hhmm = [f"{m // 60:02d}:{m % 60:02d}:00.000000" for m in range(24 * 60)]
+        return lambda i, m: pref[i] + hhmm[m]
+    bases = [datetime(d.year, d.month, d.day) for d in dias]
+    minutos = [timedelta(minutes=m) for m in range(24 * 60)]
+    return lambda i, m: bases[i] + minutos[m]
+
+
+def _insertador_turnos(engine: Engine) -> Callable[[object, list], None]:
+    if engine.dialect.name == "sqlite":
+        sql = f"INSERT INTO turnos ({', '.join(COLS_TURNO)}) VALUES ({', '.join('?' * len(COLS_TURNO))})"
+        return lambda conn, filas: conn.exec_driver_sql(sql, filas)
+    stmt = insert(models.Turno)
+    return lambda conn, filas: conn.execute(stmt, [dict(zip(COLS_TURNO, f)) for f in filas])
+
+
+def _turnos_emprendedor(
+    rng: random.Random,
+    cfg: ConfigDataset,
+    emp_id: int,
+    servicios: List[Tuple[int, int]],           # (servicio_id, duracion_min)
+    dias: List[date],
+    i_desde: int,
+    hoy: date,
+    fmt: Callable[[int, int], object],
+) -> Iterator[tuple]:
+    """Recorre cada bloque del día en pasos de 15' y decide si hay turno.
+
+    La probabilidad de ocupar un hueco es densidad × peso de la hora (picos);
+    un turno ocupa su duración y los cancelados no bloquean el lugar.
+    """
+    bloques = _bloques_por_dia()
+    base_min = [min_de_dia(d) for d in dias]
+    peso_hora = [min(1.0, cfg.densidad * cfg.picos.get(h, 1.0)) for h in range(24)]
+    pesos_svc = [max(1, 10 - i) for i in range(len(servicios))]
+    pesos_svc[0] += 2
+    acum_svc, tot = [], 0
+    for p in pesos_svc:
+        tot += p
+        acum_svc.append(tot)
+
+    # cada emprendedor tiene su propio "nivel de demanda"
+    factor = rng.uniform(0.7, 1.3)
+    rnd = rng.random
+    n_clientes = len(CLIENTES)
+    seq = 0
+    for i in range(i_desde, len(dias)):
+        d = dias[i]
+        bs = bloques.get((d.weekday() + 1) % 7)
+        if not bs:
+            continue
+        estado_ok = "confirmado" if d < hoy else "reservado"
+        for b0, b1 in bs:
+            t = b0
+            while t < b1:
+                if rnd() < peso_hora[t // 60] * factor:
+                    sid, dur = servicios[bisect_right(acum_svc, rnd() * tot)]
+                    if t + dur <= b1:
+                        cancelado = rnd() < cfg.cancelacion
+                        seq += 1
+                        yield (
+                            emp_id, sid, fmt(i, t), fmt(i, t + dur),
+                            CLIENTES[int(rnd() * n_clientes)], "-",
+                            "cancelado" if cancelado else estado_ok,
+                            fmt(max(i - int(rnd() * 21), 0), 480 + int(rnd() * 720)),
+                            seq,  # un seq distinto por turno: el cursor del delta-sync es un seq
+                            base_min[i] + t, base_min[i] + t + dur,
+                        )
+                        if not cancelado:
+                            t += dur
+                        # si se canceló, el mismo hueco puede volver a reservarse
+                        continue
+                t += 15
+
+
+# ===== Run =====
+def generar(engine: Engine, cfg: ConfigDataset, reset: bool = False, verbose: bool = True) -> dict:
+    """Genera el dataset sobre `engine`. Devuelve un resumen con conteos y tiempos."""
+    t0 = _time.perf_counter()
+    _pragmas_rapidos(engine)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    hoy = cfg.hoy or date.today()
+    desde, hasta = rango_fechas(cfg)
+    rng = random.Random(cfg.seed)
+    pwd = sha256("emprendedor")
+    ahora = datetime(hoy.year, hoy.month, hoy.day)
+
+    # --- catálogo: usuarios, emprendedores, servicios, horarios ---
+    with engine.begin() as conn:
+        u0 = _max_id(conn, models.Usuario)
+        e0 = _max_id(conn, models.Emprendedor)
+        s0 = _max_id(conn, models.Servicio)
+        codigos = set(conn.execute(select(models.Emprendedor.codigo_cliente)).scalars())
+
+        usuarios, emps, servicios, horarios = [], [], [], []
+        servicios_de: Dict[int, List[Tuple[int, int]]] = {}
+        sid = s0
+        for i in range(cfg.tenants):
+            email, _, nombre, rubro, desc = OWNERS[i % len(OWNERS)]
+            local, dominio = email.split("@")
+            uid, eid = u0 + i + 1, e0 + i + 1
+            usuarios.append({
+                "id": uid, "email": f"{local}+{uid}@{dominio}", "nombre": "Dueño", "apellido": f"Gen {uid}",
+                "dni": None, "hashed_password": pwd, "rol": "emprendedor", "is_active": True, "created_at": ahora,
+            })
+            emps.append({
+                "id": eid, "usuario_id": uid, "nombre": f"{nombre} #{eid}", "descripcion": desc,
+                "codigo_cliente": _codigo(rng, codigos), "rubro": rubro, "created_at": ahora,
+                "cambios_seq": 1,
+            })
+            servicios_de[eid] = []
+            for nombre_s, dur, precio in SERVICIOS_RUBRO.get(rubro, [])[: cfg.servicios_max]:
+                sid += 1
+                servicios.append({
+                    "id": sid, "emprendedor_id": eid, "nombre": nombre_s, "duracion_min": int(dur),
+                    "precio": float(precio), "color": None, "activo": True,
+                })
+                servicios_de[eid].append((sid, int(dur)))
+            for dia, ini, fin in BLOQUES:
+                horarios.append({"emprendedor_id": eid, "dia_semana": dia, "inicio": ini, "fin": fin})
+
+        for tabla, filas in (
+            (models.Usuario, usuarios), (models.Emprendedor, emps),
+            (models.Servicio, servicios), (models.Horario, horarios),
+        ):
+            for k in range(0, len(filas), cfg.chunk):
+                conn.execute(insert(tabla), filas[k:k + cfg.chunk])
+
+    # --- turnos: streaming por chunks, una transacción por chunk ---
+    margen = 21  # días previos para created_at
+    dias = [desde + timedelta(days=k) for k in range(-margen, (hasta - desde).days + 1)]
+    fmt = _formateador(engine, dias)
+    insertar = _insertador_turnos(engine)
+    total, buf = 0, []
+    ultimo_seq: Dict[int, int] = {}
+
+    def _flush():
+        nonlocal total, buf
+        with engine.begin() as conn:
+            insertar(conn, buf)
+        total += len(buf)
+        buf = []
+        if verbose:
+            print(f"  … {total:,} turnos ({_time.perf_counter() - t0:.1f}s)".replace(",", "."))
+
+    for e in emps:
+        if not servicios_de[e["id"]]:
+            continue
+        rng_emp = random.Random(f"{cfg.seed}:{e['codigo_cliente']}")
+        for fila in _turnos_emprendedor(rng_emp, cfg, e["id"], servicios_de[e["id"]], dias, margen, hoy, fmt):
+            buf.append(fila)
+            ultimo_seq[e["id"]] = fila[8]
+            if len(buf) >= cfg.chunk:
+                _flush()
+    if buf:
+        _flush()
+    if ultimo_seq:
+        with engine.begin() as conn:
+            conn.execute(
+                update(models.Emprendedor).where(models.Emprendedor.id == bindparam("eid"))
+                .values(cambios_seq=bindparam("ultimo")),
+                [{"eid": k, "ultimo": v} for k, v in ultimo_seq.items()],
+            )
+
+    return {
+        "tenants": cfg.tenants,
+        "servicios": len(servicios),
+        "horarios": len(horarios),
+        "turnos": total,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "codigos": [e["codigo_cliente"] for e in emps[:5]],
+        "segundos": round(_time.perf_counter() - t0, 2),
+    }
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> Tuple[str, bool, ConfigDataset]:
+    from app.database import DATABASE_URL
+
+    p = argparse.ArgumentParser(description="Genera un dataset sintético grande y reproducible.")
+    p.add_argument("--db", default=DATABASE_URL, help="URL SQLAlchemy (default: DATABASE_URL)")
+    p.add_argument("--reset", action="store_true", help="DROP + CREATE de todas las tablas antes de generar")
+    p.add_argument("--tenants", type=int, default=12)
+    p.add_argument("--servicios-max", type=int, default=4)
+    p.add_argument("--meses", type=int, default=3, help="meses hacia atrás (incluye el actual)")
+    p.add_argument("--futuro", type=int, default=1, help="meses hacia adelante")
+    p.add_argument("--densidad", type=float, default=0.55, help="prob. de ocupar cada hueco de 15' (0..1)")
+    p.add_argument("--cancelacion", type=float, default=0.08)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--chunk", type=int, default=50_000)
+    p.add_argument("--hoy", type=date.fromisoformat, default=None, help="YYYY-MM-DD (fija el dataset)")
+    a = p.parse_args(argv)
+    cfg = ConfigDataset(
+        tenants=a.tenants, servicios_max=a.servicios_max, meses=a.meses, futuro=a.futuro,
+        densidad=a.densidad, cancelacion=a.cancelacion, seed=a.seed, chunk=a.chunk, hoy=a.hoy,
+    )
+    return a.db, a.reset, cfg
+
+
+def main(argv: Optional[List[str]] = None):
+    url, reset, cfg = _parse_args(argv)
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, future=True)
+    print(f"Generando dataset en {url} (seed={cfg.seed}, tenants={cfg.tenants}, meses={cfg.meses}+{cfg.futuro})")
+    r = generar(engine, cfg, reset=reset)
+    print("=======================================")
+    print(f" Dataset listo en {r['segundos']}s")
+    print(f"   Emprendedores: {r['tenants']} · Servicios: {r['servicios']} · Turnos: {r['turnos']:,}".replace(",", "."))
+    print(f"   Rango: {r['desde']} → {r['hasta']}")
+    print(f"   Códigos de ejemplo: {', '.join(r['codigos'])}")
+    print("=======================================")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# backend/app/scripts/indexar_huecos.py
+"""
+Reconstruye el índice de huecos libres (crud/huecos.py) de todos los
+emprendedores. Pensado para correr una vez al desplegar (o con la app
+apagada): el refresco incremental cubre los cambios y el hilo de fondo de
+la app suma los días que entran al horizonte.
+
+    python -m app.scripts.indexar_huecos [--db URL] [--todo]
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud import huecos
+
+
+def indexar(engine, todo: bool = False, lote: int = 200) -> int:
+    """todo=True recalcula el horizonte completo de todos; si no, sólo los atrasados."""
+    n = 0
+    with Session(engine) as db:
+        if todo:
+            ids = db.scalars(select(models.Emprendedor.id).order_by(models.Emprendedor.id)).all()
+            for k, emp_id in enumerate(ids, start=1):
+                huecos.refrescar(db, emp_id)
+                if k % lote == 0:
+                    db.commit()
+            db.commit()
+            return len(ids)
+        while True:
+            hechos = huecos.extender(db, limite=lote)
+            n += hechos
+            if hechos < lote:
+                return n
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.database import DATABASE_URL
+
+    p = argparse.ArgumentParser(description="Reconstruye el índice de huecos libres del directorio.")
+    p.add_argument("--db", default=DATABASE_URL, help="URL SQLAlchemy (default: DATABASE_URL)")
+    p.add_argument("--todo", action="store_true", help="recalcular todos, no sólo los atrasados")
+    a = p.parse_args(argv)
+    connect_args = {"check_same_thread": False} if a.db.startswith("sqlite") else {}
+    engine = create_engine(a.db, connect_args=connect_args, future=True)
+    t0 = time.perf_counter()
+    n = indexar(engine, todo=a.todo)
+    print(f"Índice de huecos: {n} emprendedores en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
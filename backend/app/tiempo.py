@@ -0,0 +1,98 @@
+# app/tiempo.py
+"""
+Tiempo de la agenda como enteros: minutos desde 1970-01-01 00:00 de reloj
+de pared (hora local del emprendedor, sin offset), no UTC.
+
+Las columnas DateTime de la agenda son naive y representan la hora local
+del negocio; Turno.inicio_min / fin_min guardan lo mismo como entero para
+que los filtros por rango comparen enteros en el índice (no strings ISO) y
+los solapamientos y la disponibilidad se calculen sobre listas de int.
+Con minutos de reloj de pared la aritmética de calendario es directa:
+día = m // 1440, minuto del día = m % 1440, 1970-01-01 fue jueves.
+
+La zona de cada emprendedor (Emprendedor.zona_horaria, IANA; sin valor →
+ZONA_DEFAULT) sólo hace falta para saber qué hora es "ahora" en su agenda
+(ahora_en) o para pasar a un instante absoluto.
+"""
+from __future__ import annotations
+import logging
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+log = logging.getLogger("turnera.tiempo")
+
+EPOCA = datetime(1970, 1, 1)
+_ORD_EPOCA = EPOCA.toordinal()
+MIN_DIA = 24 * 60
+# un turno no cruza de día (AgendaCompilada.contiene lo exige): acota los rangos por inicio_min
+MAX_TURNO_MIN = MIN_DIA
+ZONA_DEFAULT = os.getenv("ZONA_HORARIA", "America/Argentina/Buenos_Aires")
+
+
+# ===== Minutos =====
+def a_min(dt: datetime) -> int:
+    """datetime naive (hora local) → minutos desde EPOCA (descarta segundos)."""
+    return (dt.toordinal() - _ORD_EPOCA) * MIN_DIA + dt.hour * 60 + dt.minute
+
+
+def de_min(m: int) -> datetime:
+    return EPOCA + timedelta(minutes=m)
+
+
+def dia_de(m: int) -> date:
+    return date.fromordinal(_ORD_EPOCA + m // MIN_DIA)
+
+
+def min_de_dia(d: date) -> int:
+    """Minuto en que empieza el día d."""
+    return (d.toordinal() - _ORD_EPOCA) * MIN_DIA
+
+
+def dia_semana(m: int) -> int:
+    """0=Dom..6=Sáb (convención de Horario.dia_semana); 1970-01-01 fue jueves."""
+    return (m // MIN_DIA + 4) % 7
+
+
+# ===== Zonas =====
+@lru_cache(maxsize=64)
+def zona(nombre: Optional[str]) -> Optional[ZoneInfo]:
+    """ZoneInfo de la zona (o de ZONA_DEFAULT); None si la base de zonas no la tiene
+    (p. ej. Windows sin el paquete tzdata): se usa la hora del servidor."""
+    try:
+        return ZoneInfo(nombre or ZONA_DEFAULT)
+    except (ZoneInfoNotFoundError, ValueError):
+        log.warning("Zona horaria desconocida: %s (se usa la hora del servidor)", nombre or ZONA_DEFAULT)
+        return None
+
+
+def zona_valida(nombre: str) -> bool:
+    try:
+        ZoneInfo(nombre)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def a_local(dt: datetime, nombre: Optional[str] = None) -> datetime:
+    """Un datetime con offset (p. ej. "...Z") pasa a hora local naive de la zona; uno naive
+    ya es hora local y queda igual."""
+    if dt.tzinfo is None:
+        return dt
+    z = zona(nombre)
+    return dt.astimezone(z).replace(tzinfo=None) if z else dt.astimezone().replace(tzinfo=None)
+
+
+def ahora_en(nombre: Optional[str] = None) -> datetime:
+    """Hora local (naive) de la zona, comparable con inicio/fin de la agenda."""
+    z = zona(nombre)
+    return datetime.now(z).replace(tzinfo=None) if z else datetime.now()
+
+
+def ahora_emprendedor(db, emp_id: int) -> datetime:
+    """ahora_en() con la zona guardada del emprendedor."""
+    from app.models import Emprendedor   # models importa este módulo
+
+    return ahora_en(db.query(Emprendedor.zona_horaria).filter(Emprendedor.id == emp_id).scalar())
@@ -0,0 +1,394 @@
+# bench/carga.py
+"""
+Prueba de carga HTTP: levanta uvicorn con app.main:app sobre una copia de un
+dataset del benchmark y lo maneja con miles de usuarios virtuales
+(asyncio + httpx, sin servicios externos).
+
+Escenarios (mezcla configurable):
+  - cliente: código → servicios → horarios → turnos de un día → reserva
+  - cliente_hold: igual, pero retiene el hueco (POST /publico/retenciones)
+    antes del checkout y confirma con el token
+  - dueno:   polling de /turnos/mis + "dashboard" (/emprendedores/mi, /servicios/mis)
+
+Reporta throughput, percentiles de latencia por paso, tasa de errores y de
+409, y al final verifica que ningún emprendedor tenga más turnos en curso
+de los que admiten sus recursos activos y la capacidad de cada servicio.
+
+Uso (desde backend/):
+    python -m bench.carga --usuarios 500 --duracion 30
+    python -m bench.carga --workers 1 2 4 --usuarios 2000 --dataset medio
+    python -m bench.carga --mix cliente=0.9,dueno=0.1 --pausa 200
+    python -m bench.carga --mix cliente_hold=0.8,dueno=0.2 --checkout 2000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from bench.comun import BENCH_DIR, preparar_dataset, guardar_resultado
+from app.auth import create_access_token
+from app.scripts.seed_min_final import BLOQUES
+
+BACKEND_DIR = BENCH_DIR.parent
+
+
+# ===== Servidor =====
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_servidor(db_path: Path, workers: int, puerto: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(puerto),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+    limite = time.time() + 30
+    while time.time() < limite:
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/healthz", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de responder /healthz")
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn no respondió /healthz a tiempo")
+
+
+def bajar_servidor(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ===== Datos de los escenarios =====
+class Datos:
+    def __init__(self, db_path: Path, resumen: Dict[str, Any], duenos: int):
+        con = sqlite3.connect(db_path)
+        self.emps: List[Tuple[int, str]] = con.execute(
+            "SELECT id, codigo_cliente FROM emprendedores ORDER BY id"
+        ).fetchall()
+        owners = con.execute(
+            "SELECT usuario_id FROM emprendedores ORDER BY id LIMIT ?", (duenos,)
+        ).fetchall()
+        con.close()
+        self.tokens = [
+            {"Authorization": "Bearer " + create_access_token({"sub": str(u)})} for (u,) in owners
+        ]
+        # días a reservar: la semana siguiente al fin del dataset (agenda libre al empezar)
+        hasta = datetime.fromisoformat(resumen["hasta"])
+        self.checkout_ms = 0.0  # think time entre elegir el hueco y confirmar
+        self.dias = [hasta + timedelta(days=k) for k in range(1, 15) if (hasta + timedelta(days=k)).weekday() != 6]
+        self.bloques: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for dia, ini, fin in BLOQUES:
+            self.bloques[dia].append((ini.hour * 60 + ini.minute, fin.hour * 60 + fin.minute))
+
+
+# ===== Métricas =====
+class Metricas:
+    def __init__(self):
+        self.lat: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Counter] = defaultdict(Counter)
+        self.errores_red = Counter()
+        self.reservas_ok = 0
+
+    def registrar(self, paso: str, ms: float, status: int):
+        self.lat[paso].append(ms)
+        self.status[paso][status] += 1
+
+    @staticmethod
+    def _pct(xs: List[float], p: float) -> float:
+        if not xs:
+            return 0.0
+        xs = sorted(xs)
+        return xs[min(len(xs) - 1, int(p * (len(xs) - 1) + 0.5))]
+
+    def resumen(self, segundos: float) -> Dict[str, Any]:
+        todas = [x for xs in self.lat.values() for x in xs]
+        total = len(todas) + sum(self.errores_red.values())
+        st_total = sum((c for c in self.status.values()), Counter())
+        err = sum(v for k, v in st_total.items() if k >= 500) + sum(self.errores_red.values())
+        pasos = {}
+        for paso, xs in sorted(self.lat.items()):
+            pasos[paso] = {
+                "n": len(xs),
+                "p50_ms": round(self._pct(xs, 0.50), 2),
+                "p95_ms": round(self._pct(xs, 0.95), 2),
+                "p99_ms": round(self._pct(xs, 0.99), 2),
+                "status": dict(self.status[paso]),
+            }
+        return {
+            "requests": total,
+            "rps": round(total / segundos, 1) if segundos else 0.0,
+            "p50_ms": round(self._pct(todas, 0.50), 2),
+            "p95_ms": round(self._pct(todas, 0.95), 2),
+            "p99_ms": round(self._pct(todas, 0.99), 2),
+            "tasa_error": round(err / total, 4) if total else 0.0,
+            "tasa_409": round(st_total.get(409, 0) / total, 4) if total else 0.0,
+            "reservas_ok": self.reservas_ok,
+            # reservas que fallaron DESPUÉS del checkout (el cliente llenó el formulario en vano)
+            "reservas_perdidas": self.status["reservar"].get(409, 0),
+            "errores_red": dict(self.errores_red),
+            "pasos": pasos,
+        }
+
+
+# ===== Escenarios =====
+async def _req(cli: httpx.AsyncClient, m: Metricas, paso: str, metodo: str, url: str, **kw) -> Optional[httpx.Response]:
+    t0 = time.perf_counter()
+    try:
+        r = await cli.request(metodo, url, **kw)
+    except httpx.HTTPError as ex:
+        m.errores_red[type(ex).__name__] += 1
+        return None
+    m.registrar(paso, (time.perf_counter() - t0) * 1000.0, r.status_code)
+    return r
+
+
+def _inicios_libres(datos: Datos, dia: datetime, dur: int, ocupados: List[Tuple[datetime, datetime]]) -> List[datetime]:
+    out = []
+    for b0, b1 in datos.bloques.get((dia.weekday() + 1) % 7, []):
+        for m in range(b0, b1 - dur + 1, 15):
+            ini = dia + timedelta(minutes=m)
+            fin = ini + timedelta(minutes=dur)
+            if all(not (ini < f and fin > i) for i, f in ocupados):
+                out.append(ini)
+    return out
+
+
+async def _elegir_hueco(cli: httpx.AsyncClient, datos: Datos, m: Metricas, rng: random.Random):
+    """código → servicios → horarios → disponibilidad del día. Devuelve (codigo, svc, libres) o None."""
+    emp_id, codigo = rng.choice(datos.emps)
+    if not await _req(cli, m, "codigo", "GET", f"/publico/emprendedores/by-codigo/{codigo}"):
+        return None
+    r = await _req(cli, m, "servicios", "GET", f"/publico/servicios/{codigo}")
+    if r is None or r.status_code != 200 or not r.json():
+        return None
+    svc = rng.choice(r.json())
+    await _req(cli, m, "horarios", "GET", f"/publico/horarios/{emp_id}")
+
+    dia = rng.choice(datos.dias)
+    r = await _req(cli, m, "disponibilidad", "GET", f"/publico/turnos/{emp_id}",
+                   params={"desde": dia.isoformat(), "hasta": (dia + timedelta(days=1)).isoformat()})
+    if r is None or r.status_code != 200:
+        return None
+    ocupados = [(datetime.fromisoformat(t["inicio"]), datetime.fromisoformat(t["fin"])) for t in r.json()]
+    libres = _inicios_libres(datos, dia, int(svc["duracion_min"]), ocupados)
+    return (codigo, svc, libres) if libres else None
+
+
+async def _checkout(datos: Datos, rng: random.Random):
+    """Tiempo que el cliente tarda en completar el formulario."""
+    if datos.checkout_ms:
+        await asyncio.sleep(rng.expovariate(1000.0 / datos.checkout_ms))
+
+
+async def escenario_cliente(cli: httpx.AsyncClient, datos: Datos, m: Metricas, rng: random.Random):
+    elegido = await _elegir_hueco(cli, datos, m, rng)
+    if not elegido:
+        return
+    codigo, svc, libres = elegido
+    await _checkout(datos, rng)
+    r = await _req(cli, m, "reservar", "POST", "/publico/turnos", json={
+        "codigo": codigo, "servicio_id": svc["id"], "inicio": rng.choice(libres).isoformat(),
+        "cliente_nombre": "Carga", "cliente_contacto": "-",
+    })
+    if r is not None and r.status_code == 200:
+        m.reservas_ok += 1
+
+
+async def escenario_cliente_hold(cli: httpx.AsyncClient, datos: Datos, m: Metricas, rng: random.Random):
+    elegido = await _elegir_hueco(cli, datos, m, rng)
+    if not elegido:
+        return
+    codigo, svc, libres = elegido
+    # el 409 (si lo hay) llega al elegir, antes de llenar el formulario
+    for inicio in rng.sample(libres, min(3, len(libres))):
+        r = await _req(cli, m, "retener", "POST", "/publico/retenciones", json={
+            "codigo": codigo, "servicio_id": svc["id"], "inicio": inicio.isoformat(),
+        })
+        if r is not None and r.status_code == 200:
+            break
+    else:
+        return
+    await _checkout(datos, rng)
+    r = await _req(cli, m, "reservar", "POST", "/publico/turnos", json={
+        "codigo": codigo, "servicio_id": svc["id"], "inicio": inicio.isoformat(),
+        "cliente_nombre": "Carga", "cliente_contacto": "-", "retencion": r.json()["token"],
+    })
+    if r is not None and r.status_code == 200:
+        m.reservas_ok += 1
+
+
+async def escenario_dueno(cli: httpx.AsyncClient, datos: Datos, m: Metricas, rng: random.Random):
+    if not datos.tokens:
+        return
+    h = rng.choice(datos.tokens)
+    dia = rng.choice(datos.dias)
+    semana = {"desde": (dia - timedelta(days=dia.weekday())).isoformat(),
+              "hasta": (dia + timedelta(days=7 - dia.weekday())).isoformat()}
+    await _req(cli, m, "dueno_mis", "GET", "/turnos/mis", params=semana, headers=h)
+    if rng.random() < 0.3:  # abrir el dashboard completo
+        await _req(cli, m, "dueno_emp", "GET", "/emprendedores/mi", headers=h)
+        await _req(cli, m, "dueno_servicios", "GET", "/servicios/mis", headers=h)
+
+
+ESCENARIOS = {"cliente": escenario_cliente, "cliente_hold": escenario_cliente_hold, "dueno": escenario_dueno}
+
+
+async def usuario_virtual(base: str, datos: Datos, m: Metricas, mix: Dict[str, float],
+                          hasta: float, pausa_ms: float, seed: int, limites: httpx.Limits):
+    rng = random.Random(seed)
+    nombres, pesos = list(mix), list(mix.values())
+    async with httpx.AsyncClient(base_url=base, timeout=30, limits=limites) as cli:
+        await asyncio.sleep(rng.random() * 1.0)  # rampa suave
+        while time.perf_counter() < hasta:
+            await ESCENARIOS[rng.choices(nombres, weights=pesos)[0]](cli, datos, m, rng)
+            if pausa_ms:
+                await asyncio.sleep(rng.expovariate(1000.0 / pausa_ms))
+
+
+async def correr_carga(base: str, datos: Datos, usuarios: int, duracion: float,
+                       mix: Dict[str, float], pausa_ms: float, seed: int) -> Dict[str, Any]:
+    m = Metricas()
+    limites = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+    t0 = time.perf_counter()
+    hasta = t0 + duracion
+    await asyncio.gather(*[
+        usuario_virtual(base, datos, m, mix, hasta, pausa_ms, seed * 100_003 + i, limites)
+        for i in range(usuarios)
+    ])
+    return m.resumen(time.perf_counter() - t0)
+
+
+# ===== Integridad =====
+def solapamientos(db_path: Path, desde: datetime) -> int:
+    """Turnos de más desde `desde` (reservados y confirmados), con el criterio de
+    app/crud/capacidad.py: inscriptos por encima de la capacidad de su sesión grupal
+    (servicio, inicio) y sesiones que empiezan con los recursos activos ya ocupados."""
+    con = sqlite3.connect(db_path)
+    recursos = dict(con.execute(
+        "SELECT emprendedor_id, COUNT(*) FROM recursos WHERE activo = 1 GROUP BY emprendedor_id"))
+    cupo = dict(con.execute("SELECT id, COALESCE(capacidad, 1) FROM servicios"))
+    filas = con.execute(
+        "SELECT emprendedor_id, servicio_id, inicio, fin FROM turnos "
+        "WHERE estado IN ('reservado', 'confirmado') AND inicio >= ?",
+        (desde.strftime("%Y-%m-%d %H:%M:%S"),),
+    ).fetchall()
+    con.close()
+
+    # una sesión por (servicio grupal, inicio); los demás turnos son una sesión cada uno
+    sesiones: Dict[int, List[Tuple[str, str]]] = defaultdict(list)
+    inscriptos: Counter = Counter()
+    excesos = 0
+    for emp, sid, ini, fin in filas:
+        cap = int(cupo.get(sid) or 1)
+        if cap > 1:
+            k = (emp, sid, ini)
+            inscriptos[k] += 1
+            if inscriptos[k] > cap:
+                excesos += 1
+            if inscriptos[k] > 1:
+                continue
+        sesiones[emp].append((ini, fin))
+    for emp, ss in sesiones.items():
+        n = max(1, recursos.get(emp, 0))
+        # a igual instante el fin (-1) va antes que el inicio (+1): turnos contiguos no se pisan
+        en_curso = 0
+        for _, d in sorted([(a, 1) for a, _ in ss] + [(b, -1) for _, b in ss]):
+            en_curso += d
+            if d > 0 and en_curso > n:
+                excesos += 1
+    return excesos
+
+
+# ===== CLI =====
+def _parse_mix(s: str) -> Dict[str, float]:
+    out = {}
+    for parte in s.split(","):
+        k, _, v = parte.partition("=")
+        if k.strip() not in ESCENARIOS:
+            raise argparse.ArgumentTypeError(f"escenario desconocido: {k}")
+        out[k.strip()] = float(v or 1)
+    return out
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Carga HTTP concurrente contra uvicorn local.")
+    p.add_argument("--dataset", default="chico")
+    p.add_argument("--workers", nargs="+", type=int, default=[1], help="se prueba cada cantidad de workers")
+    p.add_argument("--usuarios", type=int, default=200)
+    p.add_argument("--duracion", type=float, default=20.0, help="segundos por corrida")
+    p.add_argument("--mix", type=_parse_mix, default=_parse_mix("cliente=0.8,dueno=0.2"))
+    p.add_argument("--pausa", type=float, default=0.0, help="think time medio entre escenarios (ms)")
+    p.add_argument("--checkout", type=float, default=0.0, help="tiempo medio de checkout antes de confirmar (ms)")
+    p.add_argument("--duenos", type=int, default=50, help="dueños distintos que hacen polling")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--no-guardar", action="store_true")
+    a = p.parse_args(argv)
+
+    ds = preparar_dataset(a.dataset)
+    origen = Path(ds["url"].replace("sqlite:///", "", 1))
+    corridas: Dict[str, Any] = {}
+
+    for w in a.workers:
+        with tempfile.TemporaryDirectory(prefix="carga-") as tmp:
+            db_path = Path(tmp) / "carga.db"
+            shutil.copy(origen, db_path)
+            datos = Datos(db_path, ds["resumen"], a.duenos)
+            datos.checkout_ms = a.checkout
+            puerto = _puerto_libre()
+            proc = levantar_servidor(db_path, w, puerto)
+            try:
+                print(f"\n== {w} worker(s), {a.usuarios} usuarios, {a.duracion:.0f}s ==")
+                r = asyncio.run(correr_carga(f"http://127.0.0.1:{puerto}", datos, a.usuarios,
+                                             a.duracion, a.mix, a.pausa, a.seed))
+            finally:
+                bajar_servidor(proc)
+            r["solapamientos"] = solapamientos(db_path, min(datos.dias))
+            corridas[f"workers={w}"] = r
+
+        print(f"  {r['rps']:.1f} req/s · p50 {r['p50_ms']} ms · p95 {r['p95_ms']} ms · p99 {r['p99_ms']} ms")
+        print(f"  errores {r['tasa_error']:.2%} · 409 {r['tasa_409']:.2%} · reservas OK {r['reservas_ok']}"
+              f" · perdidas tras checkout {r['reservas_perdidas']} · solapamientos {r['solapamientos']}")
+        for paso, st in r["pasos"].items():
+            print(f"    {paso:16s} n={st['n']:6d} p50 {st['p50_ms']:8.1f} p95 {st['p95_ms']:8.1f} {st['status']}")
+
+    if len(corridas) > 1:
+        print("\nSaturación (req/s por workers):")
+        for k, r in corridas.items():
+            print(f"  {k:12s} {r['rps']:8.1f} req/s  p95 {r['p95_ms']:8.1f} ms  errores {r['tasa_error']:.2%}")
+
+    if not a.no_guardar:
+        path = guardar_resultado(corridas, {
+            "dataset": a.dataset, "usuarios": a.usuarios, "duracion": a.duracion,
+            "mix": a.mix, "pausa_ms": a.pausa, "checkout_ms": a.checkout,
+        }, prefijo="carga")
+        print(f"\nResultado guardado en {path}")
+    return 1 if any(r["solapamientos"] for r in corridas.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
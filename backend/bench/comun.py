@@ -0,0 +1,154 @@
+# bench/comun.py
+"""
+Piezas compartidas por los benchmarks: datasets cacheados en disco (generados
+con app.scripts.generar_dataset), medición de tiempos y resultados en JSON.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATOS_DIR = BENCH_DIR / "datos"
+RESULTADOS_DIR = BENCH_DIR / "resultados"
+
+# "hoy" fijo: mismo dataset sin importar el día en que se corre
+HOY_BENCH = date(2026, 1, 15)
+
+# Tamaños de dataset (tenants × meses); densidad/cancelación = defaults del generador
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "chico": {"tenants": 20, "meses": 3, "futuro": 1},
+    "medio": {"tenants": 200, "meses": 6, "futuro": 1},
+    "grande": {"tenants": 1000, "meses": 12, "futuro": 1},
+}
+
+# La app lee DATABASE_URL al importarse: apuntamos a una base descartable
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DATOS_DIR / '_app.db'}")
+DATOS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+# ===== Datasets =====
+def _config(nombre: str):
+    from app.scripts.generar_dataset import ConfigDataset
+
+    return ConfigDataset(hoy=HOY_BENCH, **PRESETS[nombre])
+
+
+def preparar_dataset(nombre: str, regenerar: bool = False) -> Dict[str, Any]:
+    """Devuelve {"url", "resumen"} del dataset; lo genera sólo si no existe en cache."""
+    from sqlalchemy import create_engine
+    from app.scripts.generar_dataset import generar
+
+    from app.database import Base
+
+    cfg = _config(nombre)
+    # la clave incluye el esquema: agregar una columna invalida la cache
+    esquema = {t.name: sorted(c.name for c in t.columns) for t in Base.metadata.sorted_tables}
+    clave = hashlib.sha1(
+        json.dumps([asdict(cfg), esquema], default=str, sort_keys=True).encode()
+    ).hexdigest()[:10]
+    db_path = DATOS_DIR / f"{nombre}-{clave}.db"
+    meta_path = db_path.with_suffix(".json")
+    url = f"sqlite:///{db_path}"
+
+    if regenerar or not db_path.exists() or not meta_path.exists():
+        for p in (db_path, meta_path):
+            if p.exists():
+                p.unlink()
+        for viejo in DATOS_DIR.glob(f"{nombre}-*.*"):   # caches de esquemas anteriores
+            if viejo.stem != db_path.stem:
+                viejo.unlink()
+        print(f"[bench] generando dataset '{nombre}' → {db_path.name}")
+        engine = create_engine(url, future=True)
+        resumen = generar(engine, cfg, reset=True, verbose=False)
+        engine.dispose()
+        meta_path.write_text(json.dumps(resumen, indent=2), encoding="utf-8")
+    resumen = json.loads(meta_path.read_text(encoding="utf-8"))
+    return {"url": url, "resumen": resumen}
+
+
+# ===== Medición =====
+def medir(fn: Callable[[int], Any], repeticiones: int, calentamiento: int = 3) -> Dict[str, float]:
+    """Corre fn(i) y devuelve estadísticas en milisegundos."""
+    for i in range(calentamiento):
+        fn(i)
+    tiempos = []
+    for i in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(calentamiento + i)
+        tiempos.append((time.perf_counter() - t0) * 1000.0)
+    tiempos.sort()
+    p95 = tiempos[min(len(tiempos) - 1, int(round(0.95 * (len(tiempos) - 1))))]
+    return {
+        "n": len(tiempos),
+        "min_ms": round(tiempos[0], 4),
+        "mediana_ms": round(statistics.median(tiempos), 4),
+        "media_ms": round(statistics.fmean(tiempos), 4),
+        "p95_ms": round(p95, 4),
+        "max_ms": round(tiempos[-1], 4),
+        "ops_s": round(1000.0 / statistics.fmean(tiempos), 1) if tiempos else 0.0,
+    }
+
+
+# ===== Resultados =====
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def guardar_resultado(casos: Dict[str, Any], extra: Dict[str, Any], prefijo: str = "bench") -> Path:
+    RESULTADOS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = RESULTADOS_DIR / f"{prefijo}-{stamp}.json"
+    data = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        **extra,
+        "casos": casos,
+    }
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def ultimo_resultado(prefijo: str = "bench", excluir: Optional[Path] = None) -> Optional[Path]:
+    if not RESULTADOS_DIR.exists():
+        return None
+    files = sorted(p for p in RESULTADOS_DIR.glob(f"{prefijo}-*.json") if p != excluir)
+    return files[-1] if files else None
+
+
+def comparar(actual: Dict[str, Any], base: Dict[str, Any], umbral: float, metrica: str = "mediana_ms") -> list:
+    """Filas (caso, base, actual, delta, regresion) para los casos presentes en ambos."""
+    filas = []
+    for caso, st in actual.items():
+        b = base.get(caso)
+        if not b or not b.get(metrica):
+            continue
+        delta = (st[metrica] - b[metrica]) / b[metrica]
+        filas.append((caso, b[metrica], st[metrica], delta, delta > umbral))
+    return filas
+
+
+def imprimir_comparacion(filas: list, umbral: float) -> int:
+    regresiones = 0
+    print(f"{'caso':58s} {'base':>10s} {'actual':>10s} {'delta':>8s}")
+    for caso, b, a, delta, reg in filas:
+        marca = "  ← REGRESIÓN" if reg else ""
+        regresiones += int(reg)
+        print(f"{caso:58s} {b:10.3f} {a:10.3f} {delta:+8.1%}{marca}")
+    print(f"{regresiones} regresión(es) por encima de {umbral:.0%}")
+    return regresiones
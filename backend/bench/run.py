@@ -0,0 +1,350 @@
+# bench/run.py
+"""
+Benchmarks de los caminos calientes contra la app en proceso (TestClient)
+y un SQLite en archivo generado con app.scripts.generar_dataset.
+
+Uso (desde backend/):
+    python -m bench.run                           # dataset "chico"
+    python -m bench.run --datasets chico medio    # varios tamaños
+    python -m bench.run --solo turnos_mis publico # filtra casos por prefijo
+    python -m bench.run --comparar                # contra el último resultado
+    python -m bench.run --comparar bench/resultados/bench-XXXX.json --umbral 0.10
+
+Cada corrida se guarda en bench/resultados/bench-<fecha>.json. Con
+--comparar, el proceso termina con código 1 si algún caso empeora su
+mediana más que --umbral (default 15%).
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import warnings
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bench.comun import (
+    PRESETS, preparar_dataset, medir, guardar_resultado, ultimo_resultado,
+    comparar, imprimir_comparacion,
+)
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import models  # noqa: E402
+from app.auth import create_access_token  # noqa: E402
+from app.crud import analitica, borrado, cierres, espera, huecos  # noqa: E402
+from app.crud.horarios import dentro_de_horario  # noqa: E402
+from app.crud.turnos import hay_conflicto  # noqa: E402
+from app.deps import get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.scripts.seed_min_final import BLOQUES  # noqa: E402
+
+Caso = Tuple[str, Callable[[int], Any], int]
+
+
+# ===== Contexto por dataset =====
+class Contexto:
+    def __init__(self, url: str, resumen: Dict[str, Any]):
+        self.resumen = resumen
+        self.engine = create_engine(url, connect_args={"check_same_thread": False}, future=True)
+        self.Session = sessionmaker(bind=self.engine, autoflush=False, autocommit=False, future=True)
+
+        def _get_db():
+            db = self.Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = _get_db
+        self.client = TestClient(app)
+
+        with self.Session() as db:
+            self.emp = db.scalars(select(models.Emprendedor).order_by(models.Emprendedor.id)).first()
+            self.owner = db.get(models.Usuario, self.emp.usuario_id)
+            self.servicio = db.scalars(
+                select(models.Servicio).where(models.Servicio.emprendedor_id == self.emp.id).order_by(models.Servicio.id)
+            ).first()
+            db.expunge_all()
+        self.auth = {"Authorization": "Bearer " + create_access_token({"sub": str(self.owner.id)})}
+        self.hasta = datetime.fromisoformat(resumen["hasta"])
+
+    def cerrar(self):
+        self.client.close()
+        app.dependency_overrides.pop(get_db, None)
+        self.engine.dispose()
+
+    def slots_libres(self, n: int) -> List[datetime]:
+        """Inicios válidos (dentro de BLOQUES) posteriores al dataset: nunca tienen conflicto."""
+        dur = int(self.servicio.duracion_min)
+        out, d = [], self.hasta + timedelta(days=7)
+        while len(out) < n:
+            dia = (d.weekday() + 1) % 7
+            for b_dia, ini, fin in BLOQUES:
+                if b_dia != dia:
+                    continue
+                t = datetime(d.year, d.month, d.day, ini.hour, ini.minute)
+                lim = datetime(d.year, d.month, d.day, fin.hour, fin.minute)
+                while t + timedelta(minutes=dur) <= lim:
+                    out.append(t)
+                    t += timedelta(minutes=dur)
+            d += timedelta(days=1)
+        return out[:n]
+
+    def rango_ocupado(self) -> datetime:
+        """Un lunes dentro del rango del dataset (días con turnos)."""
+        d = self.hasta - timedelta(days=35)
+        while d.weekday() != 0:
+            d += timedelta(days=1)
+        return datetime(d.year, d.month, d.day)
+
+
+# ===== Casos =====
+def casos(ctx: Contexto, rep: int, solo: Optional[List[str]] = None) -> List[Caso]:
+    """Casos a medir. Los datos que arma cada uno (filas de espera, servicios con
+    historia, índice de huecos) sólo se cargan si el caso pasa el filtro --solo."""
+    c = ctx.client
+    emp, svc = ctx.emp, ctx.servicio
+    lunes = ctx.rango_ocupado()
+    out: List[Caso] = []
+
+    def quiere(*nombres: str) -> bool:
+        return not solo or any(n.startswith(s) for n in nombres for s in solo)
+
+    # --- reserva pública (POST /publico/turnos) ---
+    n_slots = rep + 10
+    slots = ctx.slots_libres(n_slots) if quiere("publico_reservar") else []
+
+    def _reservar(i):
+        r = c.post("/publico/turnos", json={
+            "codigo": emp.codigo_cliente, "servicio_id": svc.id,
+            "inicio": slots[i].isoformat(), "cliente_nombre": "Bench",
+        })
+        assert r.status_code == 200, r.text
+    out.append(("publico_reservar", _reservar, rep))
+
+    # --- lote del dueño (POST /turnos/batch, 50 turnos por llamada) ---
+    n_lote = 50
+    slots_lote = ctx.slots_libres(n_slots + (rep + 3) * n_lote)[n_slots:] if quiere(f"turnos_batch/{n_lote}") else []
+
+    def _lote(i):
+        items = [{"servicio_id": svc.id, "inicio": x.isoformat()} for x in slots_lote[i * n_lote:(i + 1) * n_lote]]
+        r = c.post("/turnos/batch", json={"items": items}, headers=ctx.auth)
+        assert r.status_code == 200, r.text
+    out.append((f"turnos_batch/{n_lote}", _lote, rep))
+
+    # --- validaciones de agenda (funciones puras contra la DB) ---
+    db = ctx.Session()
+    ini = lunes + timedelta(hours=10)
+    fin = ini + timedelta(minutes=int(svc.duracion_min))
+    out.append(("crud/dentro_de_horario", lambda i: dentro_de_horario(db, emp.id, ini, fin), rep * 5))
+    out.append(("crud/hay_conflicto", lambda i: hay_conflicto(db, emp.id, ini, fin), rep * 5))
+
+    # --- lista de espera: matcheo de un hueco liberado contra una fila grande ---
+    n_espera = 50_000
+    if quiere(f"crud/espera_match_{n_espera // 1000}k"):
+        rnd = random.Random(42)
+        t0 = lunes - timedelta(days=60)
+        filas = []
+        for k in range(n_espera):
+            d = t0 + timedelta(minutes=30 * rnd.randrange(120 * 48))
+            filas.append({
+                "token": f"bench-{k}", "emprendedor_id": emp.id, "servicio_id": svc.id,
+                "desde": d, "hasta": d + timedelta(hours=rnd.choice((2, 8, 24, 72, 24 * 7))),
+                "estado": "esperando", "created_at": d,
+            })
+        db.execute(insert(models.EsperaTurno), filas)
+        db.commit()
+        instantes = [lunes + timedelta(days=i % 28, hours=9 + i % 8) for i in range(rep * 5 + 3)]
+        out.append((f"crud/espera_match_{n_espera // 1000}k", lambda i: espera.primer_candidato(
+            db, emp.id, instantes[i], instantes[i] + timedelta(minutes=int(svc.duracion_min))), rep * 5))
+
+    # --- cierre de un rango (set-based); rollback después de cada corrida ---
+    rango = (ctx.hasta - timedelta(weeks=7), ctx.hasta + timedelta(days=1))   # ~300 turnos en "chico"
+
+    def _cierre(i, **kw):
+        cierres.cerrar_rango(db, emp.id, rango[0], rango[1], **kw)
+        db.rollback()
+    out.append(("crud/cerrar_rango_cancelar_7sem", lambda i: _cierre(i), rep))
+    out.append(("crud/cerrar_rango_mover_7sem", lambda i: _cierre(i, mover_min=364 * 24 * 60, sin_lugar="dejar"), rep))
+
+    # --- agenda del dueño en distintos rangos ---
+    for dias in (1, 7, 30, 90):
+        params = {"desde": lunes.isoformat(), "hasta": (lunes + timedelta(days=dias)).isoformat()}
+
+        def _mis(i, params=params):
+            r = c.get("/turnos/mis", params=params, headers=ctx.auth)
+            assert r.status_code == 200, r.text
+        out.append((f"turnos_mis/{dias}d", _mis, rep))
+
+    # --- delta-sync: refresco en régimen (cursor al día) y sync inicial paginado ---
+    estado = {"since": 0}
+
+    def _changes(i, params):
+        r = c.get("/turnos/mis/changes", params=params, headers=ctx.auth)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    def _al_dia(i):
+        estado["since"] = _changes(i, {"since": estado["since"], "limite": 5000})["cursor"]
+    out.append(("turnos_changes/sin_cambios", _al_dia, rep))
+    out.append(("turnos_changes/inicial_500", lambda i: _changes(i, {"since": 0, "limite": 500}), rep))
+
+    # --- catálogo público ---
+    semana = {"desde": lunes.isoformat(), "hasta": (lunes + timedelta(days=7)).isoformat()}
+    for nombre, url, params in (
+        ("publico/emp_by_codigo", f"/publico/emprendedores/by-codigo/{emp.codigo_cliente}", None),
+        ("publico/servicios", f"/publico/servicios/{emp.codigo_cliente}", None),
+        ("publico/horarios", f"/publico/horarios/{emp.id}", None),
+        ("publico/turnos_semana", f"/publico/turnos/{emp.id}", semana),
+        ("publico/disponibilidad_dia", f"/publico/disponibilidad/{emp.id}",
+         {"fecha": lunes.date().isoformat(), "servicio_id": svc.id}),
+        ("publico/disponibilidad_4sem_empaque", f"/publico/disponibilidad/{emp.id}",
+         {"fecha": lunes.date().isoformat(), "hasta": (lunes + timedelta(days=27)).date().isoformat(),
+          "servicio_id": svc.id, "orden": "empaque"}),
+        ("publico/bundle", f"/publico/bundle/{emp.codigo_cliente}", None),
+    ):
+        def _get(i, url=url, params=params):
+            r = c.get(url, params=params)
+            assert r.status_code == 200, r.text
+        out.append((nombre, _get, rep))
+
+    # --- directorio ---
+    for nombre, params in (
+        ("emprendedores/listado", {}),
+        ("emprendedores/q", {"q": "Barber"}),
+        ("emprendedores/rubro", {"rubro": "Peluquería"}),
+    ):
+        def _dir(i, params=params):
+            r = c.get("/emprendedores/", params=params)
+            assert r.status_code == 200, r.text
+        out.append((nombre, _dir, rep))
+
+    # --- próximo hueco libre (índice armado antes de medir) ---
+    if quiere("emprendedores/disponibles_dia", "emprendedores/disponibles_tarde"):
+        huecos.extender(db)
+    manana = (datetime.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    for nombre, params in (
+        ("emprendedores/disponibles_dia", {"desde": manana.isoformat(), "hasta": (manana + timedelta(days=1)).isoformat()}),
+        ("emprendedores/disponibles_tarde", {"desde": (manana + timedelta(hours=18)).isoformat(),
+                                             "hasta": (manana + timedelta(days=1)).isoformat(), "rubro": "Peluquería"}),
+    ):
+        def _disp(i, params=params):
+            r = c.get("/emprendedores/disponibles", params=params)
+            assert r.status_code == 200, r.text
+        out.append((nombre, _disp, rep))
+
+    # --- estadísticas del dueño ---
+    for nombre, url, params in (
+        ("estadisticas/mis_resumen_mes", "/estadisticas/mis/resumen",
+         {"desde": datetime(lunes.year, lunes.month, 1).isoformat()}),
+        ("estadisticas/mis_ocupacion_anio", "/estadisticas/mis/ocupacion",
+         {"desde": (ctx.hasta - timedelta(days=365)).isoformat(), "hasta": ctx.hasta.isoformat()}),
+    ):
+        def _stats(i, url=url, params=params):
+            r = c.get(url, params=params, headers=ctx.auth)
+            assert r.status_code == 200, r.text
+        out.append((nombre, _stats, max(rep // 2, 5)))
+
+    # --- analítica del admin sobre toda la plataforma: recalculada (cache vacía) y desde la cache ---
+    mes = (date(ctx.hasta.year, ctx.hasta.month, 1), ctx.hasta.date())
+    anio_admin = (ctx.hasta.date() - timedelta(days=364), ctx.hasta.date())
+    for nombre, fn in (
+        ("ranking_mes", lambda: analitica.ranking(db, *mes, "ingresos")),
+        ("rubros_mes", lambda: analitica.rubros(db, *mes)),
+        ("cohortes_anio", lambda: analitica.cohortes(db, *anio_admin)),
+    ):
+        def _frio(i, fn=fn):
+            analitica.CACHE.invalidar(forzar=True)
+            fn()
+        out.append((f"admin/analitica_{nombre}", _frio, max(rep // 2, 5)))
+    out.append(("admin/analitica_ranking_cache", lambda i: analitica.ranking(db, *mes, "ingresos"), rep))
+
+    # --- baja de un servicio con historia (por lotes); al final: deja tombstones ---
+    n_hist = 5000
+    if quiere(f"crud/borrar_servicio_{n_hist // 1000}k"):
+        otro = db.scalars(select(models.Emprendedor.id).where(models.Emprendedor.id != emp.id)
+                          .order_by(models.Emprendedor.id)).first()
+        a0 = datetime(2020, 1, 1, 9)
+        descartables = []
+        for _ in range(rep + 3):
+            s = models.Servicio(emprendedor_id=otro, nombre="Bench baja", duracion_min=30, precio=0)
+            db.add(s)
+            db.flush()
+            descartables.append(s.id)
+            db.execute(insert(models.Turno), [
+                {"emprendedor_id": otro, "servicio_id": s.id, "inicio": a0 + timedelta(minutes=30 * k),
+                 "fin": a0 + timedelta(minutes=30 * k + 30), "estado": "confirmado"}
+                for k in range(n_hist)
+            ])
+        db.commit()
+        out.append((f"crud/borrar_servicio_{n_hist // 1000}k",
+                    lambda i: borrado.borrar_servicio(db, descartables[i]), rep))
+    return out
+
+
+# ===== Runner =====
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Benchmarks de caminos calientes (TestClient + SQLite).")
+    p.add_argument("--datasets", nargs="+", default=["chico"], choices=sorted(PRESETS))
+    p.add_argument("--repeticiones", type=int, default=50)
+    p.add_argument("--solo", nargs="*", default=None, help="prefijos de casos a correr")
+    p.add_argument("--regenerar", action="store_true", help="regenera los datasets aunque estén en cache")
+    p.add_argument("--comparar", nargs="?", const="ultimo", default=None,
+                   help="JSON base (sin valor: el último resultado guardado)")
+    p.add_argument("--umbral", type=float, default=0.15, help="regresión tolerada sobre la mediana (0.15 = 15%%)")
+    p.add_argument("--no-guardar", action="store_true")
+    a = p.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    resultados: Dict[str, Any] = {}
+    datasets: Dict[str, Any] = {}
+    for nombre in a.datasets:
+        ds = preparar_dataset(nombre, regenerar=a.regenerar)
+        datasets[nombre] = ds["resumen"]
+        # los casos escriben (reservas, lotes): se trabaja sobre una copia descartable
+        tmp = tempfile.TemporaryDirectory(prefix="bench-")
+        copia = Path(tmp.name) / "bench.db"
+        shutil.copy(ds["url"].replace("sqlite:///", "", 1), copia)
+        ctx = Contexto(f"sqlite:///{copia}", ds["resumen"])
+        try:
+            print(f"\n== dataset '{nombre}': {ds['resumen']['tenants']} emprendedores, "
+                  f"{ds['resumen']['turnos']:,} turnos ==".replace(",", "."))
+            for caso, fn, rep in casos(ctx, a.repeticiones, a.solo):
+                if a.solo and not any(caso.startswith(s) for s in a.solo):
+                    continue
+                st = medir(fn, rep)
+                resultados[f"{nombre}/{caso}"] = st
+                print(f"  {caso:40s} mediana {st['mediana_ms']:8.3f} ms  p95 {st['p95_ms']:8.3f} ms  "
+                      f"({st['ops_s']:.0f} ops/s)")
+        finally:
+            ctx.cerrar()
+            tmp.cleanup()
+
+    path = None
+    if not a.no_guardar:
+        path = guardar_resultado(resultados, {"datasets": datasets, "repeticiones": a.repeticiones})
+        print(f"\nResultado guardado en {path}")
+
+    if a.comparar:
+        base_path = ultimo_resultado(excluir=path) if a.comparar == "ultimo" else Path(a.comparar)
+        if not base_path or not base_path.exists():
+            print("No hay resultado base para comparar.")
+            return 0
+        base = json.loads(base_path.read_text(encoding="utf-8"))["casos"]
+        print(f"\nComparación contra {base_path.name}:")
+        filas = comparar(resultados, base, a.umbral)
+        return 1 if imprimir_comparacion(filas, a.umbral) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
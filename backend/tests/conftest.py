@@ -0,0 +1,78 @@
+# tests/conftest.py
+"""
+Fixtures de los tests de regresión: la app entera sobre una base SQLite
+temporal (una por corrida) y un emprendedor armado por test, con código
+propio, dos servicios y horario de 9 a 18 todos los días.
+"""
+from __future__ import annotations
+import itertools
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import time
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+_DB = Path(tempfile.mkdtemp(prefix="turnera-tests-")) / "tests.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB}"
+os.environ.setdefault("INVALIDACIONES_MS", "0")   # sin hilo de sondeo: un solo proceso
+os.environ.setdefault("HUECOS_EXTENDER_S", "0")   # el índice de huecos se extiende a mano
+os.environ.setdefault("TOMBSTONES_PURGA_S", "0")   # y los tombstones se purgan a mano
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402
+from app.auth import create_access_token  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+
+_numeros = itertools.count(1)
+
+
+@dataclass
+class Negocio:
+    id: int
+    codigo: str
+    servicios: Dict[str, int]
+    headers: Dict[str, str]
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as s:
+        yield s
+
+
+@pytest.fixture
+def negocio(client) -> Negocio:
+    n = next(_numeros)
+    with SessionLocal() as s:
+        u = models.Usuario(email=f"dueno{n}@test.com", nombre="Dueño", hashed_password="x", rol="emprendedor")
+        s.add(u)
+        s.flush()
+        e = models.Emprendedor(usuario_id=u.id, nombre=f"Negocio {n}", codigo_cliente=f"T{n:05d}")
+        s.add(e)
+        s.flush()
+        servicios = {
+            "corte": models.Servicio(emprendedor_id=e.id, nombre="Corte", duracion_min=60, precio=100),
+            "color": models.Servicio(emprendedor_id=e.id, nombre="Color", duracion_min=30, precio=300),
+        }
+        s.add_all(servicios.values())
+        s.add_all(models.Horario(emprendedor_id=e.id, dia_semana=d, inicio=time(9), fin=time(18)) for d in range(7))
+        s.commit()
+        return Negocio(
+            id=e.id,
+            codigo=e.codigo_cliente,
+            servicios={k: v.id for k, v in servicios.items()},
+            headers={"Authorization": "Bearer " + create_access_token({"sub": str(u.id)})},
+        )
@@ -0,0 +1,54 @@
+# tests/test_batch.py
+"""Alta en lote (POST /turnos/batch): todo_o_nada no deja nada a medias."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models import Emprendedor, Turno
+
+
+def _dia():
+    return (datetime.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _estado(db, negocio):
+    db.expire_all()
+    n = db.scalar(select(func.count()).select_from(Turno).where(Turno.emprendedor_id == negocio.id))
+    return n, db.get(Emprendedor, negocio.id).cambios_seq
+
+
+def _items(negocio, horas):
+    d = _dia()
+    return [{"servicio_id": negocio.servicios["corte"], "inicio": d.replace(hour=h).isoformat()} for h in horas]
+
+
+def test_todo_o_nada_con_un_conflicto_no_crea_ni_consume_seq(client, db, negocio):
+    r = client.post("/turnos/batch", headers=negocio.headers, json={"items": _items(negocio, [12])})
+    assert r.status_code == 200 and r.json()["creados"] == 1
+    antes = _estado(db, negocio)
+
+    # la fila 1 pisa el turno de las 12; las otras dos son válidas
+    r = client.post("/turnos/batch", headers=negocio.headers, json={
+        "items": _items(negocio, [10, 12, 14]), "modo": "todo_o_nada"})
+    assert r.status_code == 409, r.text
+    detalle = r.json()["detail"]
+    assert detalle["creados"] == 0 and [x["indice"] for x in detalle["resultados"]] == [1]
+    assert _estado(db, negocio) == antes
+
+
+def test_todo_o_nada_con_filas_que_se_pisan_entre_si(client, db, negocio):
+    antes = _estado(db, negocio)
+    r = client.post("/turnos/batch", headers=negocio.headers, json={
+        "items": _items(negocio, [10, 10]), "modo": "todo_o_nada"})
+    assert r.status_code == 409, r.text
+    assert _estado(db, negocio) == antes
+
+
+def test_best_effort_consume_un_seq_por_turno_creado(client, db, negocio):
+    client.post("/turnos/batch", headers=negocio.headers, json={"items": _items(negocio, [12])})
+    n0, seq0 = _estado(db, negocio)
+    r = client.post("/turnos/batch", headers=negocio.headers, json={
+        "items": _items(negocio, [10, 12, 14]), "modo": "best_effort"})
+    assert r.status_code == 200, r.text
+    assert r.json()["creados"] == 2 and r.json()["fallidos"] == 1
+    assert _estado(db, negocio) == (n0 + 2, seq0 + 2)
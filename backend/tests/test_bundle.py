@@ -0,0 +1,90 @@
+# tests/test_bundle.py
+"""Bundle público: ETag sin recalcular, 304 con If-None-Match, ETag nuevo cuando cambia la agenda y modo NDJSON."""
+import json
+from datetime import timedelta
+
+import pytest
+
+from app.routers import publico
+
+
+@pytest.fixture(autouse=True)
+def reloj_fijo(monkeypatch):
+    """El ETag incluye el minuto actual: se congela para que no cambie entre pedidos."""
+    ahora = publico.ahora_en()
+    monkeypatch.setattr(publico, "ahora_en", lambda zona=None: ahora)
+    return ahora
+
+
+def _slots(bundle, servicio_id):
+    return next(s["slots"] for s in bundle["disponibilidad"]["servicios"] if s["servicio_id"] == servicio_id)
+
+
+def test_bundle_etag_y_304(client, negocio):
+    url = f"/publico/bundle/{negocio.codigo}"
+    r = client.get(url)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    slot = _slots(r.json(), negocio.servicios["corte"])[-1]   # el último: lejos de "ahora"
+
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert client.get(url, headers={"If-None-Match": f'"otro", {etag}'}).status_code == 304
+
+    r = client.post("/publico/turnos", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"],
+        "inicio": slot["inicio"], "cliente_nombre": "Ana", "cliente_contacto": "ana@test.com",
+    })
+    assert r.status_code in (200, 201), r.text
+
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert slot["inicio"] not in {s["inicio"] for s in _slots(r.json(), negocio.servicios["corte"])}
+
+
+def test_304_no_calcula_la_disponibilidad(client, negocio, monkeypatch):
+    url = f"/publico/bundle/{negocio.codigo}"
+    etag = client.get(url).headers["etag"]
+
+    def no_llamar(*a, **kw):
+        raise AssertionError("un 304 no tiene que calcular la disponibilidad")
+
+    monkeypatch.setattr(publico, "_bundle_disponibilidad", no_llamar)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_cambia_con_excepciones_y_retenciones(client, negocio, reloj_fijo):
+    url = f"/publico/bundle/{negocio.codigo}"
+    r = client.get(url)
+    etag = r.headers["etag"]
+    slot = _slots(r.json(), negocio.servicios["corte"])[-1]
+
+    r = client.post("/publico/retenciones", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": slot["inicio"]})
+    assert r.status_code == 200, r.text
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+
+    manana = (reloj_fijo + timedelta(days=1)).date().isoformat()
+    r = client.post("/horarios/mis/excepciones", json={"fecha": manana, "cerrado": True}, headers=negocio.headers)
+    assert r.status_code == 200, r.text
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert not [s for s in _slots(r.json(), negocio.servicios["corte"]) if s["inicio"].startswith(manana)]
+
+
+def test_bundle_stream_ndjson(client, negocio):
+    url = f"/publico/bundle/{negocio.codigo}"
+    r = client.get(url, params={"stream": "true"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lineas = [json.loads(x) for x in r.text.splitlines()]
+    assert len(lineas) == 2
+    assert lineas[0]["perfil"]["codigo_cliente"] == negocio.codigo
+    assert {s["id"] for s in lineas[0]["servicios"]} == set(negocio.servicios.values())
+    assert set(lineas[1]) == {"disponibilidad"}
+    assert lineas[1]["disponibilidad"] == client.get(url).json()["disponibilidad"]
@@ -0,0 +1,85 @@
+# tests/test_cambios.py
+"""Delta-sync (GET /turnos/mis/changes): paginación sin perder turnos."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import migraciones
+from app.crud import cambios
+from app.database import engine
+from app.models import Emprendedor, Turno, TurnoBorrado
+
+
+def _paginar(client, headers, since=0, limite=10):
+    ids, vueltas = set(), 0
+    while True:
+        r = client.get("/turnos/mis/changes", params={"since": since, "limite": limite}, headers=headers)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        ids |= {t["id"] for t in body["cambios"]}
+        since = body["cursor"]
+        vueltas += 1
+        assert vueltas < 50, "el cursor no avanza"
+        if not body["mas"]:
+            return ids, since
+
+
+def _turnos(db, negocio, n):
+    base = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    ts = [Turno(emprendedor_id=negocio.id, servicio_id=negocio.servicios["corte"], cliente_nombre="x",
+                inicio=base + timedelta(days=k), fin=base + timedelta(days=k, hours=1), estado="reservado")
+          for k in range(n)]
+    db.add_all(ts)
+    db.commit()
+    return {t.id for t in ts}
+
+
+def test_paginacion_trae_todo(client, db, negocio):
+    ids = _turnos(db, negocio, 25)
+    assert _paginar(client, negocio.headers)[0] == ids
+
+
+def test_seq_repetidos_se_renumeran(client, db, negocio):
+    ids = _turnos(db, negocio, 25)
+    # como dejaba el backfill viejo: todo el histórico con seq = 1
+    db.execute(update(Turno).where(Turno.emprendedor_id == negocio.id).values(seq=1))
+    db.execute(update(Emprendedor).where(Emprendedor.id == negocio.id).values(cambios_seq=1))
+    db.commit()
+    with engine.begin() as conn:
+        assert migraciones.numerar_seq(conn)
+        assert not migraciones.numerar_seq(conn)
+
+    assert _paginar(client, negocio.headers)[0] == ids
+    # un cursor de antes de renumerar fuerza el sync completo
+    r = client.get("/turnos/mis/changes", params={"since": 1}, headers=negocio.headers).json()
+    assert r["reset"] and {t["id"] for t in r["cambios"]} == ids
+
+
+def test_migracion_de_seq_corre_una_vez(client, db, negocio):
+    _turnos(db, negocio, 3)
+    migraciones.aplicar(engine)   # ya anotada al arrancar la app: no vuelve a escanear
+    db.execute(update(Turno).where(Turno.emprendedor_id == negocio.id).values(seq=1))
+    db.commit()
+    migraciones.aplicar(engine)
+    assert {t.seq for t in db.query(Turno).filter(Turno.emprendedor_id == negocio.id)} == {1}
+    with engine.begin() as conn:
+        assert migraciones.numerar_seq(conn)
+
+
+def test_purga_de_tombstones_fuerza_reset(client, db, negocio):
+    ids = _turnos(db, negocio, 3)
+    _, cursor = _paginar(client, negocio.headers)
+    borrado = db.get(Turno, min(ids))
+    db.delete(borrado)
+    db.commit()
+    db.execute(update(TurnoBorrado).where(TurnoBorrado.emprendedor_id == negocio.id)
+               .values(borrado_at=datetime.utcnow() - timedelta(days=cambios.TOMBSTONES_DIAS + 1)))
+    db.commit()
+
+    assert cambios.purgar_tombstones(db) >= 1
+    assert db.query(TurnoBorrado).filter(TurnoBorrado.emprendedor_id == negocio.id).count() == 0
+    r = client.get("/turnos/mis/changes", params={"since": cursor}, headers=negocio.headers).json()
+    assert r["reset"] and {t["id"] for t in r["cambios"]} == ids - {min(ids)}
+    # un cursor al día no se resetea
+    r = client.get("/turnos/mis/changes", params={"since": r["cursor"]}, headers=negocio.headers).json()
+    assert not r["reset"] and r["cambios"] == []
@@ -0,0 +1,38 @@
+# tests/test_capacidad.py
+"""Clases grupales: un servicio con capacidad N admite N inscriptos por sesión."""
+from datetime import datetime, timedelta
+
+from app.models import Servicio
+
+
+def _inicio(hora=10):
+    return (datetime.now() + timedelta(days=3)).replace(hour=hora, minute=0, second=0, microsecond=0).isoformat()
+
+
+def _reservar(client, negocio, servicio, inicio, n):
+    return client.post("/publico/turnos", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios[servicio], "inicio": inicio,
+        "cliente_nombre": f"Alumno {n}", "cliente_contacto": f"a{n}@test.com"})
+
+
+def _grupal(db, negocio, capacidad):
+    db.get(Servicio, negocio.servicios["color"]).capacidad = capacidad
+    db.commit()
+
+
+def test_grupal_admite_capacidad_y_rechaza_el_siguiente(client, db, negocio):
+    _grupal(db, negocio, 3)
+    inicio = _inicio()
+    for n in range(3):
+        r = _reservar(client, negocio, "color", inicio, n)
+        assert r.status_code == 200, r.text
+    assert _reservar(client, negocio, "color", inicio, 3).status_code == 409
+
+
+def test_la_sesion_grupal_ocupa_el_unico_recurso(client, db, negocio):
+    _grupal(db, negocio, 3)
+    inicio = _inicio(hora=15)
+    assert _reservar(client, negocio, "color", inicio, 0).status_code == 200
+    # con lugares libres en la clase, otro servicio no entra a la misma hora
+    assert _reservar(client, negocio, "corte", inicio, 1).status_code == 409
+    assert _reservar(client, negocio, "color", inicio, 2).status_code == 200
@@ -0,0 +1,26 @@
+# tests/test_catalogo.py
+"""Catálogo público en memoria: las escrituras masivas también lo invalidan."""
+from sqlalchemy import select
+
+from app.models import Invalidacion
+
+
+def test_vaciar_horarios_invalida_el_catalogo(client, db, negocio):
+    assert len(client.get(f"/publico/horarios/{negocio.id}").json()) == 7   # queda en el catálogo
+    r = client.post("/horarios/mis", json=[], headers=negocio.headers)
+    assert r.status_code == 200, r.text
+
+    assert client.get(f"/publico/horarios/{negocio.id}").json() == []
+    bundle = client.get(f"/publico/bundle/{negocio.codigo}").json()
+    assert bundle["horarios"] == []
+    assert all(not s["slots"] for s in bundle["disponibilidad"]["servicios"])
+    # y los demás workers reciben el aviso
+    assert db.execute(select(Invalidacion.id).where(
+        Invalidacion.entidad == "catalogo", Invalidacion.clave == negocio.id)).first() is not None
+
+
+def test_cambio_de_servicio_refresca_el_catalogo(client, negocio):
+    assert {s["nombre"] for s in client.get(f"/publico/servicios/{negocio.codigo}").json()} == {"Corte", "Color"}
+    r = client.put(f"/servicios/{negocio.servicios['color']}", json={"activo": False}, headers=negocio.headers)
+    assert r.status_code == 200, r.text
+    assert [s["nombre"] for s in client.get(f"/publico/servicios/{negocio.codigo}").json()] == ["Corte"]
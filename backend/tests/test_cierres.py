@@ -0,0 +1,53 @@
+# tests/test_cierres.py
+"""Cierre de rango (POST /turnos/cerrar-rango) corriendo turnos."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import Turno
+
+
+def _dia():
+    return (datetime.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _reservar(db, negocio, inicios):
+    ts = [Turno(emprendedor_id=negocio.id, servicio_id=negocio.servicios["corte"], cliente_nombre="x",
+                inicio=a, fin=a + timedelta(hours=1), estado="reservado") for a in inicios]
+    db.add_all(ts)
+    db.commit()
+    return [t.id for t in ts]
+
+
+def _agenda(db, negocio):
+    db.expire_all()
+    return db.execute(
+        select(Turno.id, Turno.inicio).where(Turno.emprendedor_id == negocio.id, Turno.estado == "reservado")
+        .order_by(Turno.inicio, Turno.id)
+    ).all()
+
+
+def test_dejar_no_corre_nada_encima_de_un_dejado(client, db, negocio):
+    d = _dia()
+    t1, t2, t3 = _reservar(db, negocio, [d.replace(hour=9), d.replace(hour=10), d.replace(hour=11)])
+    r = client.post("/turnos/cerrar-rango", headers=negocio.headers, json={
+        "desde": d.replace(hour=9).isoformat(), "hasta": d.replace(hour=10, minute=30).isoformat(),
+        "mover_min": 60, "sin_lugar": "dejar",
+    })
+    assert r.status_code == 200, r.text
+    # t2 no entra a las 11 (t3) y se queda a las 10, así que t1 tampoco puede ir a las 10
+    assert r.json()["movidos"] == 0 and r.json()["dejados"] == 2
+    assert [(i, a.hour) for i, a in _agenda(db, negocio)] == [(t1, 9), (t2, 10), (t3, 11)]
+
+
+def test_dejar_corre_los_que_entran(client, db, negocio):
+    d = _dia()
+    t1, t2, t3 = _reservar(db, negocio, [d.replace(hour=9), d.replace(hour=10), d.replace(hour=12)])
+    r = client.post("/turnos/cerrar-rango", headers=negocio.headers, json={
+        "desde": d.replace(hour=9).isoformat(), "hasta": d.replace(hour=10, minute=30).isoformat(),
+        "mover_min": 120, "sin_lugar": "dejar",
+    })
+    assert r.status_code == 200, r.text
+    # t1 → 11 entra; t2 → 12 choca con t3 y se queda a las 10
+    assert r.json()["movidos"] == 1 and r.json()["dejados"] == 1
+    assert [(i, a.hour) for i, a in _agenda(db, negocio)] == [(t2, 10), (t1, 11), (t3, 12)]
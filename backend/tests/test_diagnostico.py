@@ -0,0 +1,47 @@
+# tests/test_diagnostico.py
+from __future__ import annotations
+
+from app import models, perfilado
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.instrumentacion import ajustes
+
+
+def _admin(email: str = "admin-diag@test.com") -> dict:
+    with SessionLocal() as s:
+        u = models.Usuario(email=email, nombre="Admin", hashed_password="x", rol="admin")
+        s.add(u)
+        s.commit()
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(u.id)})}
+
+
+def test_ajustes_sql_no_aceptan_ruta_de_log(client):
+    headers = _admin()
+    antes, lenta_ms = ajustes.log_lentas, ajustes.lenta_ms
+
+    r = client.put("/diagnostico/sql", json={"log_lentas": "/tmp/otro.log"}, headers=headers)
+    assert r.status_code == 422
+    assert ajustes.log_lentas == antes
+
+    r = client.put("/diagnostico/sql", json={"lenta_ms": 250}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["lenta_ms"] == 250
+    assert r.json()["log_lentas"] == antes
+    ajustes.lenta_ms = lenta_ms
+
+
+def test_token_de_perfilado_atado_a_quien_lo_pidio(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(perfilado, "PERFILES_DIR", str(tmp_path))
+    dueno, otro = _admin("admin-perfil@test.com"), _admin("admin-perfil-2@test.com")
+    token = client.post("/diagnostico/perfilado/token", headers=dueno).json()["token"]
+
+    # sin sesión o con la de otro usuario el token no perfila
+    assert "X-Perfil" not in client.get("/diagnostico/sql", headers={"X-Perfilar": token}).headers
+    assert "X-Perfil" not in client.get("/diagnostico/sql", headers={**otro, "X-Perfilar": token}).headers
+    # cambiar el usuario del token rompe la firma
+    ajeno = ".".join(["0", *token.split(".")[1:]])
+    assert "X-Perfil" not in client.get("/diagnostico/sql", headers={**dueno, "X-Perfilar": ajeno}).headers
+
+    r = client.get("/diagnostico/sql", headers={**dueno, "X-Perfilar": token})
+    assert r.status_code == 200
+    assert (tmp_path / r.headers["X-Perfil"]).is_file()
@@ -0,0 +1,42 @@
+# tests/test_espera.py
+"""Lista de espera: el hueco que libera una cancelación se ofrece al primero de la fila."""
+from datetime import datetime, timedelta
+
+
+def _dia():
+    return (datetime.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _anotarse(client, negocio, desde, hasta, n):
+    r = client.post("/publico/espera", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"],
+        "desde": desde.isoformat(), "hasta": hasta.isoformat(),
+        "cliente_nombre": f"Espera {n}", "cliente_contacto": f"e{n}@test.com"})
+    assert r.status_code == 201, r.text
+    return r.json()["token"]
+
+
+def test_cancelar_ofrece_el_hueco_al_primero_de_la_fila(client, negocio):
+    d = _dia()
+    r = client.post("/publico/turnos", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": d.replace(hour=10).isoformat(),
+        "cliente_nombre": "Cliente", "cliente_contacto": "c@test.com"})
+    assert r.status_code == 200, r.text
+    turno_id = r.json()["id"]
+    primero = _anotarse(client, negocio, d.replace(hour=9), d.replace(hour=12), 1)
+    segundo = _anotarse(client, negocio, d.replace(hour=9), d.replace(hour=12), 2)
+
+    assert client.delete(f"/turnos/{turno_id}", headers=negocio.headers).status_code == 204
+
+    e1 = client.get(f"/publico/espera/{primero}").json()
+    assert e1["estado"] == "ofrecido"
+    assert datetime.fromisoformat(e1["oferta"]["inicio"]) == d.replace(hour=10)
+    assert client.get(f"/publico/espera/{segundo}").json()["estado"] == "esperando"
+
+    # la oferta retiene el hueco: sólo se reserva con su retención
+    cuerpo = {"codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": e1["oferta"]["inicio"],
+              "cliente_nombre": "Espera 1", "cliente_contacto": "e1@test.com"}
+    assert client.post("/publico/turnos", json=cuerpo).status_code == 409
+    r = client.post("/publico/turnos", json={**cuerpo, "retencion": e1["oferta"]["retencion"]})
+    assert r.status_code == 200, r.text
+    assert client.get(f"/publico/espera/{primero}").json()["estado"] == "tomado"
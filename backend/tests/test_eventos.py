@@ -0,0 +1,39 @@
+# tests/test_eventos.py
+"""Bus de eventos SSE: reconexión con Last-Event-ID a través de un reinicio."""
+import asyncio
+
+from app.eventos import BusEventos, formato_sse
+
+
+def _suscribir(bus, ultimo):
+    async def _run():
+        sub, pendientes, reset = bus.suscribir(1, ultimo)
+        bus.desuscribir(sub)
+        return [ev[0] for ev in pendientes], reset
+    return asyncio.run(_run())
+
+
+def test_reconexion_en_la_misma_epoca_reenvia_lo_perdido():
+    bus = BusEventos()
+    for k in range(3):
+        bus.publicar(1, "ocupado", {"id": k})
+    ultimo = formato_sse((1, "ocupado", {}), bus.epoca).split("\n")[0].removeprefix("id: ")
+    assert ultimo == f"{bus.epoca}-1"
+    assert _suscribir(bus, ultimo) == ([2, 3], False)
+    assert _suscribir(bus, None) == ([], False)
+
+
+def test_id_de_antes_del_reinicio_da_reset():
+    viejo = BusEventos()
+    for k in range(5):
+        viejo.publicar(1, "ocupado", {"id": k})
+    ultimo = f"{viejo.epoca}-2"
+
+    # proceso nuevo: el seq vuelve a empezar y el 2 ya es otro evento
+    nuevo = BusEventos()
+    for k in range(3):
+        nuevo.publicar(1, "liberado", {"id": k})
+    assert nuevo.epoca != viejo.epoca
+    assert _suscribir(nuevo, ultimo) == ([], True)
+    assert _suscribir(nuevo, "2") == ([], True)          # id sin época (clientes de antes)
+    assert _suscribir(nuevo, f"{nuevo.epoca}-9") == ([], True)
@@ -0,0 +1,35 @@
+# tests/test_huecos.py
+from __future__ import annotations
+
+from sqlalchemy import select, update
+
+from app import models
+from app.crud import huecos
+from app.tiempo import ahora_en
+
+
+def _hasta(db, emp_id):
+    db.expire_all()
+    return db.scalar(select(models.Emprendedor.huecos_hasta).where(models.Emprendedor.id == emp_id))
+
+
+def test_buscar_disponibles_no_escribe(client, db, negocio):
+    db.execute(update(models.Emprendedor).where(models.Emprendedor.id == negocio.id).values(huecos_hasta=None))
+    db.commit()
+
+    r = client.get("/emprendedores/disponibles")
+    assert r.status_code == 200
+    assert _hasta(db, negocio.id) is None
+
+    huecos.extender(db)
+    assert _hasta(db, negocio.id) is not None
+
+
+def test_extender_usa_el_hoy_de_cada_zona(db, negocio):
+    for zona in ("Pacific/Kiritimati", "Pacific/Pago_Pago"):   # UTC+14 y UTC-11: días distintos
+        db.execute(update(models.Emprendedor).where(models.Emprendedor.id == negocio.id)
+                   .values(zona_horaria=zona, huecos_hasta=None))
+        db.commit()
+        huecos.extender(db)
+        assert _hasta(db, negocio.id) == huecos._tope(ahora_en(zona).date())
+        assert huecos.extender(db) == 0   # ya al día en su zona: no se vuelve a extender
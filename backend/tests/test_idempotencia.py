@@ -0,0 +1,66 @@
+# tests/test_idempotencia.py
+"""Idempotency-Key en POST /publico/turnos: replay de la respuesta y un solo turno."""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.models import Turno
+from app.routers import publico
+
+
+def _payload(negocio, dias=2, hora=10):
+    inicio = (datetime.now() + timedelta(days=dias)).replace(hour=hora, minute=0, second=0, microsecond=0)
+    return {"codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": inicio.isoformat(),
+            "cliente_nombre": "Ana", "cliente_contacto": "ana@test.com"}
+
+
+def _turnos(db, negocio):
+    db.expire_all()
+    return db.query(Turno).filter(Turno.emprendedor_id == negocio.id).count()
+
+
+def test_misma_clave_devuelve_la_misma_respuesta(client, db, negocio):
+    body, headers = _payload(negocio), {"Idempotency-Key": f"k-replay-{negocio.id}"}
+    r1 = client.post("/publico/turnos", json=body, headers=headers)
+    assert r1.status_code in (200, 201), r1.text
+    r2 = client.post("/publico/turnos", json=body, headers=headers)
+    assert r2.status_code == r1.status_code
+    assert r2.content == r1.content
+    assert r2.headers.get("idempotent-replayed") == "true"
+    assert _turnos(db, negocio) == 1
+
+    # la misma clave con otro contenido no se ejecuta
+    r3 = client.post("/publico/turnos", json=_payload(negocio, hora=12), headers=headers)
+    assert r3.status_code == 422
+    assert _turnos(db, negocio) == 1
+
+
+def test_pedidos_concurrentes_con_la_misma_clave_se_ejecutan_una_vez(client, db, negocio, monkeypatch):
+    original = publico.dentro_de_horario
+    llamadas = []
+
+    def lento(*a, **kw):   # mantiene el primer pedido en vuelo mientras llega el segundo
+        llamadas.append(1)
+        time.sleep(0.3)
+        return original(*a, **kw)
+
+    monkeypatch.setattr(publico, "dentro_de_horario", lento)
+    body, headers = _payload(negocio), {"Idempotency-Key": f"k-concurrente-{negocio.id}"}
+    respuestas = []
+
+    def enviar():
+        respuestas.append(client.post("/publico/turnos", json=body, headers=headers))
+
+    hilos = [threading.Thread(target=enviar) for _ in range(2)]
+    for h in hilos:
+        h.start()
+        time.sleep(0.05)
+    for h in hilos:
+        h.join()
+
+    assert [r.status_code for r in respuestas] == [respuestas[0].status_code] * 2
+    assert respuestas[0].status_code in (200, 201), respuestas[0].text
+    assert respuestas[0].content == respuestas[1].content
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in respuestas) == 1
+    assert len(llamadas) == 1
+    assert _turnos(db, negocio) == 1
@@ -0,0 +1,47 @@
+# tests/test_metricas.py
+"""Ocupación y demanda (GET /estadisticas/mis/ocupacion) sobre un día armado a mano."""
+from datetime import datetime, timedelta
+
+from app.models import Servicio, Turno
+
+
+def _dia():
+    return (datetime.now() + timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_ocupacion_demanda_y_sesiones_grupales(client, db, negocio):
+    d = _dia()
+    corte, color = negocio.servicios["corte"], negocio.servicios["color"]
+    db.get(Servicio, color).capacidad = 3
+
+    def turno(sid, hora, minutos, estado="reservado"):
+        a = d.replace(hour=hora)
+        return Turno(emprendedor_id=negocio.id, servicio_id=sid, cliente_nombre="x",
+                     inicio=a, fin=a + timedelta(minutes=minutos), estado=estado)
+
+    db.add_all([
+        turno(corte, 10, 60),
+        turno(color, 12, 30), turno(color, 12, 30, "confirmado"),   # una sesión grupal, dos inscriptos
+        turno(corte, 14, 60, "cancelado"),
+    ])
+    db.commit()
+
+    r = client.get("/estadisticas/mis/ocupacion", headers=negocio.headers, params={
+        "desde": d.isoformat(), "hasta": d.replace(hour=23, minute=59).isoformat()})
+    assert r.status_code == 200, r.text
+    o = r.json()
+
+    # 60 del corte + 30 de la clase (una vez) sobre 9 h de agenda con un recurso
+    assert o["minutos_reservados"] == 90 and o["minutos_agenda"] == 9 * 60
+    assert o["ocupacion"] == round(90 / 540, 4)
+    assert o["total_turnos"] == 4 and o["cancelados"] == 1 and o["tasa_cancelacion"] == 0.25
+    assert [(x["turnos"], x["minutos_reservados"]) for x in o["por_dia"]] == [(3, 90)]
+
+    # demanda[dow][hora] con 0 = domingo; cuenta inscriptos y no los cancelados
+    dow = (d.weekday() + 1) % 7
+    celdas = {(i, h): n for i, fila in enumerate(o["demanda"]) for h, n in enumerate(fila) if n}
+    assert celdas == {(dow, 10): 1, (dow, 12): 2}
+
+    por_servicio = {x["servicio_id"]: x for x in o["por_servicio"]}
+    assert por_servicio[color]["cantidad"] == 2 and por_servicio[color]["minutos_totales"] == 30
+    assert por_servicio[corte]["cantidad"] == 1 and por_servicio[corte]["cancelados"] == 1
@@ -0,0 +1,40 @@
+# tests/test_retenciones.py
+"""Retenciones de checkout: un hueco retenido no lo toma otro cliente."""
+from datetime import datetime, timedelta
+
+
+def _inicio(dias=3, hora=11):
+    return (datetime.now() + timedelta(days=dias)).replace(hour=hora, minute=0, second=0, microsecond=0).isoformat()
+
+
+def _reserva(negocio, inicio, **extra):
+    return {"codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": inicio,
+            "cliente_nombre": "Cliente", "cliente_contacto": "c@test.com", **extra}
+
+
+def test_hueco_retenido_rechaza_a_otro_cliente(client, negocio):
+    inicio = _inicio()
+    r = client.post("/publico/retenciones", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": inicio})
+    assert r.status_code == 200, r.text
+    token = r.json()["token"]
+
+    # otro cliente: ni retener ni reservar el mismo hueco (ni uno que lo pise)
+    assert client.post("/publico/retenciones", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["color"], "inicio": inicio}).status_code == 409
+    assert client.post("/publico/turnos", json=_reserva(negocio, inicio)).status_code == 409
+
+    # quien retuvo reserva con su token, y la retención se libera
+    r = client.post("/publico/turnos", json=_reserva(negocio, inicio, retencion=token))
+    assert r.status_code == 200, r.text
+    assert client.delete(f"/publico/retenciones/{token}").status_code == 204
+
+
+def test_liberar_la_retencion_devuelve_el_hueco(client, negocio):
+    inicio = _inicio(hora=15)
+    token = client.post("/publico/retenciones", json={
+        "codigo": negocio.codigo, "servicio_id": negocio.servicios["corte"], "inicio": inicio}).json()["token"]
+    assert client.post("/publico/turnos", json=_reserva(negocio, inicio)).status_code == 409
+
+    assert client.delete(f"/publico/retenciones/{token}").status_code == 204
+    assert client.post("/publico/turnos", json=_reserva(negocio, inicio)).status_code == 200
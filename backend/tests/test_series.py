@@ -0,0 +1,42 @@
+# tests/test_series.py
+"""Turnos recurrentes: cortar una serie (DELETE /turnos/series/{id}?desde=)."""
+from datetime import date, datetime, timedelta
+
+
+def _serie(client, negocio, dias_hasta):
+    inicio = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    r = client.post("/turnos/series", headers=negocio.headers, json={
+        "servicio_id": negocio.servicios["corte"], "inicio": inicio.isoformat(), "frecuencia": "diaria",
+        "hasta": (inicio.date() + timedelta(days=dias_hasta)).isoformat(),
+    })
+    assert r.status_code in (200, 201), r.text
+    return r.json()
+
+
+def _hasta(client, negocio, serie_id):
+    series = client.get("/turnos/series", headers=negocio.headers).json()
+    return next(s["hasta"] for s in series if s["id"] == serie_id)
+
+
+def test_cortar_despues_del_fin_no_alarga_la_serie(client, negocio):
+    s = _serie(client, negocio, 5)
+    corte = date.fromisoformat(s["hasta"]) + timedelta(days=30)
+    r = client.delete(f"/turnos/series/{s['id']}", params={"desde": corte.isoformat()}, headers=negocio.headers)
+    assert r.status_code == 204
+    assert _hasta(client, negocio, s["id"]) == s["hasta"]
+
+
+def test_cortar_en_el_medio(client, negocio):
+    s = _serie(client, negocio, 10)
+    corte = date.fromisoformat(s["inicio"][:10]) + timedelta(days=3)
+    r = client.delete(f"/turnos/series/{s['id']}", params={"desde": corte.isoformat()}, headers=negocio.headers)
+    assert r.status_code == 204
+    assert _hasta(client, negocio, s["id"]) == (corte - timedelta(days=1)).isoformat()
+
+
+def test_cortar_antes_del_inicio_es_error(client, negocio):
+    s = _serie(client, negocio, 5)
+    corte = date.fromisoformat(s["inicio"][:10]) - timedelta(days=2)
+    r = client.delete(f"/turnos/series/{s['id']}", params={"desde": corte.isoformat()}, headers=negocio.headers)
+    assert r.status_code == 422
+    assert _hasta(client, negocio, s["id"]) == s["hasta"]
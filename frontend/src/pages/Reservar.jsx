@@ -1,9 +1,11 @@
 // src/pages/Reservar.jsx
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import { useParams, useNavigate, useLocation, Link } from "react-router-dom";
 import { addMinutes, endOfDay, format, isSameDay, startOfDay } from "date-fns";
 import es from "date-fns/locale/es";
-import api from "../services/api";
+import api, { clavesPorIntento, postIdempotente } from "../services/api";
+import { suscribirAgenda } from "../services/eventos";
+import { bundlePublico } from "../services/publico";
 import PublicCalendar from "../components/PublicCalendar";
 import { useUser } from "../context/UserContext.jsx";
 
@@ -24,7 +26,7 @@ const msgFrom = (e, fb = "Ocurrió un error") => {
   return fb;
 };
 
-const normServicio = (s) => ({ id: s?.id, nombre: s?.nombre ?? "Servicio", duracion_min: Number(s?.duracion_min ?? 30) || 30 });
+const normServicio = (s) => ({ id: s?.id, nombre: s?.nombre ?? "Servicio", duracion_min: Number(s?.duracion_min ?? 30) || 30, capacidad: Number(s?.capacidad ?? 1) || 1 });
 const cutHHMM = (t) => String(t || "").slice(0, 5);
 const normHorario = (h) => ({
   dia_semana: Number(h?.dia_semana ?? 0),
@@ -34,10 +36,40 @@ const normHorario = (h) => ({
 });
 const normTurno = (t) => (t?.inicio && t?.fin ? { inicio: new Date(t.inicio), fin: new Date(t.fin) } : null);
 
+// fecha "YYYY-MM-DD" → bloques que reemplazan al patrón semanal ([] = cerrado)
+const mapExcepciones = (xs) => {
+  const map = {};
+  asArr(xs).forEach((x) => {
+    map[x.fecha] = asArr(x.bloques).map((b) => ({ hora_desde: cutHHMM(b.desde), hora_hasta: cutHHMM(b.hasta), intervalo_min: 30 }));
+  });
+  return map;
+};
+// slots del bundle por servicio: sirven de primera respuesta hasta que llega la disponibilidad por empaque
+const slotsDelBundle = (dispo) => {
+  const map = {};
+  asArr(dispo?.servicios).forEach((s) => {
+    map[s.servicio_id] = asArr(s.slots).map((x) => ({
+      start: new Date(x.inicio), blockEnd: new Date(x.fin), libres: Number(x.libres) || 0, sugerido: false,
+    }));
+  });
+  return { desde: dispo?.desde, hasta: dispo?.hasta, map };
+};
+
 /* ===== API ===== */
-async function apiEmpByCode(codigo) { const { data } = await api.get(`/publico/emprendedores/by-codigo/${codigo}`); return data; }
-async function apiServiciosByCode(codigo) { const { data } = await api.get(`/publico/servicios/${codigo}`); return asArr(data).map(normServicio); }
-async function apiHorarios(empId) { const { data } = await api.get(`/publico/horarios/${empId}`); return asArr(data).map(normHorario); }
+async function apiExcepciones(empId) {
+  const { data } = await api.get(`/publico/horarios/${empId}/excepciones`);
+  return mapExcepciones(data);
+}
+async function apiDisponibilidad(empId, { fecha, servicioId, retencion }) {
+  const { data } = await api.get(`/publico/disponibilidad/${empId}`, {
+    params: { fecha, servicio_id: servicioId, orden: "empaque", ...(retencion ? { retencion } : {}) },
+  });
+  // vienen ordenados por empaque (mejor primero): se marcan los 3 mejores y se muestran por hora
+  return asArr(data?.slots).map((s, i) => ({
+    start: new Date(s.inicio), blockEnd: new Date(s.bloque_fin), libres: Number(s.libres) || 0,
+    sugerido: i < 3 && Number(s.libres) > 0 && !s.desperdicio,
+  })).sort((a, b) => a.start - b.start);
+}
 async function apiTurnos(empId, { desde, hasta }) { const { data } = await api.get(`/publico/turnos/${empId}`, { params: { desde, hasta } }); return asArr(data); }
 
 /* ===== Overlay premium ===== */
@@ -164,34 +196,45 @@ export default function Reservar() {
   const [emp, setEmp] = useState(null);
   const [servicios, setServicios] = useState([]);
   const [horarios, setHorarios] = useState([]);
+  const [excepciones, setExcepciones] = useState({});
   const [turnos, setTurnos] = useState([]);
+  const [bundle, setBundle] = useState(null); // slots de los próximos días (GET /publico/bundle)
 
   const [fecha, setFecha] = useState(null);
   const [servicioId, setServicioId] = useState("");
   const [slot, setSlot] = useState(null);
+  const [retencion, setRetencion] = useState(null); // { id, token, expira } del hueco elegido
   const [nota, setNota] = useState("");
 
   const [overlay, setOverlay] = useState({ show:false, mode:"loading", title:"", caption:"" });
+  const clavesReserva = useRef(clavesPorIntento());
 
   const isAuth =
     !!(localStorage.getItem("accessToken") ||
        localStorage.getItem("token") ||
        localStorage.getItem("access_token"));
 
-  // Carga inicial por código
+  // Carga inicial por código: un solo pedido (bundle en NDJSON). La ficha, los
+  // servicios y los horarios se dibujan con la primera línea; la disponibilidad
+  // de los próximos días y sus excepciones llegan con la segunda.
   useEffect(() => {
     (async () => {
       const code = (codigo || "").trim().toUpperCase();
       if (!looksLikeCode(code)) { navigate("/ingresar-codigo", { replace: true }); return; }
       try {
         setOverlay({ show:true, mode:"loading", title:"Cargando…", caption:"Preparando todo" });
-        const e = await apiEmpByCode(code); setEmp(e);
-        const svcs = await apiServiciosByCode(code); setServicios(svcs);
-        const hs = await apiHorarios(e.id); setHorarios(hs);
-        const now = new Date();
-        const desde = toNaive(startOfDay(new Date(now.getFullYear(), now.getMonth(), 1)));
-        const hasta = toNaive(endOfDay(new Date(now.getFullYear(), now.getMonth() + 1, 0)));
-        const tv = await apiTurnos(e.id, { desde, hasta }); setTurnos(tv);
+        const b = await bundlePublico(code, {
+          onCabecera: (c) => {
+            setEmp(c.perfil);
+            setServicios(asArr(c.servicios).map(normServicio));
+            setHorarios(asArr(c.horarios).map(normHorario));
+            setOverlay((o) => ({ ...o, show:false }));
+          },
+        });
+        setExcepciones(mapExcepciones(b.disponibilidad?.excepciones));
+        setBundle(slotsDelBundle(b.disponibilidad));
+        // el calendario muestra un mes: las excepciones más allá del bundle, fuera del camino de carga
+        apiExcepciones(b.perfil.id).then(setExcepciones).catch(() => {});
       } catch (err) {
         setOverlay({ show:true, mode:"success", title:"No se pudo cargar", caption: msgFrom(err, "Intentá nuevamente.") });
       } finally {
@@ -201,29 +244,103 @@ export default function Reservar() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [codigo]);
 
+  // Disponibilidad en vivo: otros clientes reservan/liberan mientras se mira la agenda
+  useEffect(() => {
+    if (!emp?.id) return;
+    const recargar = async () => {
+      const now = new Date();
+      const desde = toNaive(startOfDay(new Date(now.getFullYear(), now.getMonth(), 1)));
+      const hasta = toNaive(endOfDay(new Date(now.getFullYear(), now.getMonth() + 1, 0)));
+      try { setTurnos(await apiTurnos(emp.id, { desde, hasta })); } catch {}
+      try { setExcepciones(await apiExcepciones(emp.id)); } catch {}
+    };
+    return suscribirAgenda(emp.id, {
+      onOcupado: (t) => {
+        setTurnos((prev) => (asArr(prev).some((x) => x.id === t.id) ? prev : [...asArr(prev), t]));
+        // las retenciones vencen solas en el server: acá también
+        if (t.expira) {
+          const ms = new Date(t.expira).getTime() - Date.now();
+          setTimeout(() => setTurnos((prev) => asArr(prev).filter((x) => x.id !== t.id)), Math.max(ms, 0));
+        }
+      },
+      onLiberado: (t) => setTurnos((prev) => asArr(prev).filter((x) => x.id !== t.id)),
+      onReset: recargar,
+    });
+  }, [emp?.id]);
+
   const noHayHorarios = (horarios?.length || 0) === 0;
-  const isDayEnabled = (date) => {
-    if (noHayHorarios) return true;
+  // Bloques efectivos de una fecha: la excepción de esa fecha (si hay) o el patrón semanal
+  const bloquesDe = (date) => {
+    const exc = excepciones[format(date, "yyyy-MM-dd")];
+    if (exc) return exc;
     const day = date.getDay();
-    return horarios.some((h) => (h.activo !== false) && Number(h.dia_semana) === day);
+    return noHayHorarios
+      ? [{ dia_semana: day, hora_desde: "08:00", hora_hasta: "18:00", intervalo_min: 30, activo: true }]
+      : (horarios || []).filter((h) => (h.activo !== false) && Number(h.dia_semana) === day);
   };
+  const isDayEnabled = (date) => bloquesDe(date).length > 0;
 
   const ocupadosDelDia = useMemo(() => {
     if (!fecha) return [];
-    return asArr(turnos).map(normTurno).filter(Boolean).filter((t) => isSameDay(t.inicio, fecha));
-  }, [fecha, turnos]);
+    return asArr(turnos)
+      .filter((t) => !retencion || t.id !== retencion.id) // la retención propia no ocupa para mí
+      .map(normTurno).filter(Boolean).filter((t) => isSameDay(t.inicio, fecha));
+  }, [fecha, turnos, retencion]);
+
+  // Elegir un hueco lo retiene unos minutos: nadie más lo puede tomar mientras se confirma
+  async function elegirSlot(s) {
+    setSlot(s);
+    if (!emp?.codigo_cliente || !servicioSel) return;
+    try {
+      const { data } = await api.post("/publico/retenciones", {
+        codigo: emp.codigo_cliente,
+        servicio_id: Number(servicioSel.id),
+        inicio: toNaive(s.start),
+        reemplaza: retencion?.token,
+      });
+      setRetencion(data);
+    } catch (e) {
+      setRetencion(null);
+      if (e?.response?.status === 409) {
+        setSlot(null);
+        setOverlay({ show:true, mode:"success", title:"Ese horario se acaba de ocupar", caption:"Elegí otro, por favor." });
+        setTimeout(() => setOverlay((o)=>({ ...o, show:false })), 1800);
+      }
+    }
+  }
+
+  // Si se deselecciona el hueco, se libera la retención
+  useEffect(() => {
+    if (slot || !retencion?.token) return;
+    api.delete(`/publico/retenciones/${retencion.token}`).catch(() => {});
+    setRetencion(null);
+  }, [slot, retencion]);
 
   const servicioSel = useMemo(
     () => (servicios || []).find((s) => String(s.id) === String(servicioId)) || null,
     [servicioId, servicios]
   );
 
+  // Disponibilidad calculada en el server (recursos y lugares por servicio); se
+  // vuelve a pedir cuando cambia la agenda (eventos SSE actualizan `turnos`).
+  const [dispo, setDispo] = useState(null);
+  useEffect(() => {
+    if (!emp?.id || !fecha || !servicioSel) { setDispo(null); return; }
+    let vivo = true;
+    const dia = format(fecha, "yyyy-MM-dd");
+    if (bundle && dia >= bundle.desde && dia <= bundle.hasta && !turnos.length) {
+      setDispo(asArr(bundle.map[servicioSel.id]).filter((s) => isSameDay(s.start, fecha)));
+    }
+    apiDisponibilidad(emp.id, { fecha: format(fecha, "yyyy-MM-dd"), servicioId: servicioSel.id, retencion: retencion?.token })
+      .then((xs) => { if (vivo) setDispo(xs); })
+      .catch(() => { if (vivo) setDispo(null); });
+    return () => { vivo = false; };
+  }, [emp?.id, fecha, servicioSel, turnos, retencion?.token, bundle]);
+
   const slots = useMemo(() => {
     if (!fecha || !servicioSel) return [];
-    const day = fecha.getDay();
-    const bloques = noHayHorarios
-      ? [{ dia_semana: day, hora_desde: "08:00", hora_hasta: "18:00", intervalo_min: 30, activo: true }]
-      : (horarios || []).filter((h) => (h.activo !== false) && Number(h.dia_semana) === day);
+    if (dispo) return dispo.filter((s) => s.libres > 0);
+    const bloques = bloquesDe(fecha);
 
     const dur = Number(servicioSel.duracion_min || 30) || 30;
     const list = [];
@@ -244,7 +361,8 @@ export default function Reservar() {
     });
 
     return list;
-  }, [fecha, horarios, noHayHorarios, servicioSel, ocupadosDelDia]);
+  // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [fecha, horarios, excepciones, noHayHorarios, servicioSel, ocupadosDelDia, dispo]);
 
   async function crearReserva() {
     if (!emp?.codigo_cliente || !servicioSel || !slot || !isAuth) return;
@@ -258,16 +376,20 @@ export default function Reservar() {
       inicio: toNaive(slot.start),
       cliente_nombre,
       cliente_contacto,
+      ...(retencion?.token ? { retencion: retencion.token } : {}),
     };
 
     try {
       setOverlay({ show:true, mode:"loading", title:"Procesando…", caption:"Guardando tu turno" });
 
+      // una key por contenido mientras dure el intento: los reintentos por red (acá o
+      // volviendo a confirmar) reciben la respuesta del primero en vez de crear otro turno
       const withNota = nota ? { ...basePayload, nota: sanitize(nota) } : basePayload;
-      try { await api.post("/publico/turnos", withNota); }
-      catch (e) { if (e?.response?.status === 422) { await api.post("/publico/turnos", basePayload); } else { throw e; } }
+      try { await postIdempotente("/publico/turnos", withNota, clavesReserva.current.para(withNota)); }
+      catch (e) { if (e?.response?.status === 422) { await postIdempotente("/publico/turnos", basePayload, clavesReserva.current.para(basePayload)); } else { throw e; } }
+      clavesReserva.current.listo();
 
-      setServicioId(""); setSlot(null); setNota("");
+      setRetencion(null); setServicioId(""); setSlot(null); setNota("");
       setOverlay({
         show:true,
         mode:"success",
@@ -436,7 +558,7 @@ export default function Reservar() {
                           <button
                             key={i}
                             type="button"
-                            onClick={() => setSlot(s)}
+                            onClick={() => elegirSlot(s)}
                             className={cx(
                               "rounded-xl border px-3 py-2 text-sm font-medium transition",
                               sel ? "border-sky-600 bg-sky-50 text-sky-900 shadow-sm"
@@ -445,6 +567,12 @@ export default function Reservar() {
                             title={`Hasta ${format(s.blockEnd, "HH:mm")}`}
                           >
                             {format(s.start, "HH:mm", { locale: es })}
+                            {s.sugerido && (
+                              <span className="ml-1 text-xs font-normal text-emerald-600">· sugerido</span>
+                            )}
+                            {servicioSel?.capacidad > 1 && s.libres != null && (
+                              <span className="ml-1 text-xs font-normal text-slate-500">· {s.libres} lug.</span>
+                            )}
                           </button>
                         );
                       })}
@@ -2,7 +2,8 @@
 import React, { useEffect, useMemo, useRef, useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import Calendario from "../components/Calendario.jsx";
-import api from "../services/api";
+import api, { clavesPorIntento } from "../services/api";
+import { suscribirAgenda } from "../services/eventos";
 import { useUser } from "../context/UserContext.jsx";
 import { isEmprendedor as empCheck } from "../utils/roles";
 import { format, startOfMonth, endOfMonth, startOfDay, endOfDay, addMinutes, isSameDay } from "date-fns";
@@ -10,6 +11,7 @@ import es from "date-fns/locale/es";
 import {
   listarTurnosOwner,
   crearTurnoOwner,
+  exceptuarOcurrencia,
   borrarTurno,
 } from "../services/turnos";
 
@@ -71,7 +73,8 @@ function mapTurnoParaCalendario(t, servicios = []) {
   const cliente = rawCliente.length ? rawCliente : null;
 
   return {
-    id: t.id ?? t.turno_id ?? t.uuid,
+    // las ocurrencias de una serie no tienen id propio: se identifican por serie + fecha
+    id: t.id ?? t.turno_id ?? t.uuid ?? (t.serie_id ? `s${t.serie_id}-${format(start, "yyyy-MM-dd")}` : undefined),
     title: cliente ? `${cliente} · ${nombreServicio}` : nombreServicio,
     start,
     end,
@@ -485,6 +488,26 @@ export default function Turnos() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Agenda en vivo: refresca el rango visible cuando entra o se libera un turno
+  const refrescarRef = useRef(null);
+  refrescarRef.current = () => fetchTurnosRange(rStart, rEnd);
+  useEffect(() => {
+    if (!isEmp) return;
+    let cerrar = () => {};
+    let activo = true;
+    (async () => {
+      try {
+        const { data } = await api.get("/emprendedores/mi");
+        if (!activo || !data?.id) return;
+        let t = null;
+        const refrescar = () => { clearTimeout(t); t = setTimeout(() => refrescarRef.current?.(), 300); };
+        const off = suscribirAgenda(data.id, { onOcupado: refrescar, onLiberado: refrescar, onReset: refrescar });
+        cerrar = () => { clearTimeout(t); off(); };
+      } catch {}
+    })();
+    return () => { activo = false; cerrar(); };
+  }, [isEmp]);
+
   // Remap cuando cambian servicios
   useEffect(() => {
     setEventos(rawTurnos.map((t) => mapTurnoParaCalendario(t, servicios)));
@@ -519,15 +542,18 @@ export default function Turnos() {
   }
 
   // ==== CRUD
+  const clavesAlta = useRef(clavesPorIntento()); // misma Idempotency-Key si se reintenta lo mismo
   const crearTurno = async (payload) => {
     try {
       setLoading(true);
       setMsg("Creando turno…");
+      const naive = { ...payload, inicio: toLocalNaive(payload.inicio), fin: toLocalNaive(payload.fin) };
       try {
-        await crearTurnoOwner(payload);
+        await crearTurnoOwner(payload, clavesAlta.current.para(payload));
       } catch {
-        await crearTurnoOwner({ ...payload, inicio: toLocalNaive(payload.inicio), fin: toLocalNaive(payload.fin) });
+        await crearTurnoOwner(naive, clavesAlta.current.para(naive));
       }
+      clavesAlta.current.listo();
       setMsg("Turno creado.");
       await fetchTurnosRange(rStart, rEnd);
       setOpenNew(false);
@@ -566,7 +592,11 @@ export default function Turnos() {
     try {
       setLoading(true);
       setMsg("Eliminando turno…");
-      await borrarTurno(selected.id);
+      if (selected.raw?.serie_id && selected.raw?.id == null) {
+        await exceptuarOcurrencia(selected.raw.serie_id, format(selected.start, "yyyy-MM-dd"));
+      } else {
+        await borrarTurno(selected.id);
+      }
       await fetchTurnosRange(rStart, rEnd);
       setSelected(null);
       setMsg("Turno cancelado.");
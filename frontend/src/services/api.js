@@ -74,6 +74,26 @@ export function errorMessage(err) {
   return err?.message || "No disponible por el momento.";
 }
 
+// ---------- Idempotency-Key (reintentos seguros de POST de reserva) ----------
+export function nuevaIdempotencyKey() {
+  try { if (crypto?.randomUUID) return crypto.randomUUID(); } catch {}
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+export const conIdempotencia = (key) => ({ headers: { "Idempotency-Key": key } });
+// Una key por contenido mientras dure el intento: si el usuario vuelve a confirmar
+// lo mismo (después de un error de red) sale con la misma key; listo() las descarta.
+export function clavesPorIntento() {
+  const claves = new Map();
+  return {
+    para(body) {
+      const firma = JSON.stringify(body);
+      if (!claves.has(firma)) claves.set(firma, nuevaIdempotencyKey());
+      return claves.get(firma);
+    },
+    listo() { claves.clear(); },
+  };
+}
+
 // ---------- Axios instance ----------
 const api = axios.create({ baseURL: API_URL });
 
@@ -120,6 +140,27 @@ export async function apiPut(path, data)   { const r = await api.put(path, data)
 export async function apiPatch(path, data) { const r = await api.patch(path, data); return r?.data; }
 export async function apiDelete(path)      { const r = await api.delete(path); return r?.data; }
 
+// POST de reserva con reintentos: la misma key en todos los intentos, así si la
+// red corta después de que el server creó el turno, el reintento recibe esa
+// misma respuesta (replay) en vez de crear otro. Se reintenta sin respuesta
+// (red), con 502/503/504 y con el 409 "en curso" de otro pedido con la misma
+// key (trae Retry-After; un 409 de horario ocupado no se reintenta).
+const REINTENTABLE = new Set([502, 503, 504]);
+export async function postIdempotente(path, data, key = nuevaIdempotencyKey(), { intentos = 3 } = {}) {
+  for (let n = 1; ; n++) {
+    try {
+      return await api.post(path, data, conIdempotencia(key));
+    } catch (e) {
+      const st = e?.response?.status;
+      const enCurso = st === 409 && e?.response?.headers?.["retry-after"];
+      const reintentar = e?.response ? REINTENTABLE.has(st) || !!enCurso : !!e?.request;
+      if (!reintentar || n >= intentos) throw e;
+      const espera = Number(e?.response?.headers?.["retry-after"]) * 1000 || 400 * 2 ** (n - 1);
+      await new Promise((ok) => setTimeout(ok, espera));
+    }
+  }
+}
+
 // ---------- Endpoints base ----------
 /** /usuarios/me -> actualiza LS user y devuelve objeto usuario */
 export async function me() {
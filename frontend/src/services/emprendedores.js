@@ -13,6 +13,20 @@ export async function miEmprendedor() {
   }
 }
 
+/* Directorio: quién tiene un hueco libre en [desde, hasta) ("hoy después de las 18") */
+export async function buscarDisponibles({ desde, hasta, q, rubro, duracion_min, limit = 20, offset = 0 } = {}) {
+  const { data } = await api.get("/emprendedores/disponibles", {
+    params: { desde, hasta, q, rubro, duracion_min, limit, offset },
+  });
+  return Array.isArray(data) ? data : [];
+}
+
+/* Baja del negocio con toda su agenda: 204, o 202 { estado: "en_curso" } en segundo plano */
+export async function borrarMiEmprendedor({ background = false } = {}) {
+  const r = await api.delete("/emprendedores/mi", { params: background ? { background: true } : undefined });
+  return r?.status === 202 ? r.data : null;
+}
+
 /* ==== Creación tolerante (para auto-recuperar 404) ==== */
 async function crearEmprendedorMin({ nombre = "Mi Negocio", descripcion = null } = {}) {
   try {
@@ -0,0 +1,22 @@
+// src/services/eventos.js
+// Suscripción SSE a los cambios de agenda de un emprendedor
+// (GET /publico/eventos/{empId}). EventSource reconecta solo y manda
+// Last-Event-ID; si el server no puede reenviar lo perdido emite "reset".
+import api from "./api";
+
+export function suscribirAgenda(empId, { onOcupado, onLiberado, onReset } = {}) {
+  if (!empId || typeof window === "undefined" || !window.EventSource) return () => {};
+  const base = (api.defaults.baseURL || "").replace(/\/+$/, "");
+  const es = new EventSource(`${base}/publico/eventos/${empId}`);
+
+  const parse = (fn) => (ev) => {
+    if (!fn) return;
+    try { fn(JSON.parse(ev.data || "{}")); } catch {}
+  };
+  es.addEventListener("ocupado", parse(onOcupado));
+  es.addEventListener("retenido", parse(onOcupado)); // hold de checkout: trae `expira`
+  es.addEventListener("liberado", parse(onLiberado));
+  es.addEventListener("reset", () => onReset?.());
+
+  return () => es.close();
+}
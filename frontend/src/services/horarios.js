@@ -109,3 +109,39 @@ export async function reemplazarHorarios(emprendedorId, payload /* { bloques: [.
   }
   return Promise.reject(last);
 }
+
+/* =========================
+   Excepciones por fecha (dueño): feriados, cierres, horario especial
+   - payload: { fecha: "YYYY-MM-DD", hasta?, cerrado, bloques?: [{desde, hasta}], motivo? }
+   ========================= */
+export async function obtenerExcepciones({ desde, hasta } = {}) {
+  try {
+    const { data } = await api.get(`/horarios/mis/excepciones`, { params: { desde, hasta } });
+    return Array.isArray(data) ? data : [];
+  } catch (e) {
+    throw typeof e === "string" ? e : errorMessage(e);
+  }
+}
+
+export async function guardarExcepcion(payload) {
+  const body = {
+    ...payload,
+    bloques: (payload?.bloques || [])
+      .map(b => ({ desde: hhmm(b?.desde), hasta: hhmm(b?.hasta) }))
+      .filter(b => toMin(b.desde) < toMin(b.hasta)),
+  };
+  try {
+    const { data } = await api.post(`/horarios/mis/excepciones`, body);
+    return data; // { items, turnos_afectados }
+  } catch (e) {
+    throw typeof e === "string" ? e : errorMessage(e);
+  }
+}
+
+export async function borrarExcepcion(fecha, hasta) {
+  try {
+    await api.delete(`/horarios/mis/excepciones/${fecha}`, { params: hasta ? { hasta } : {} });
+  } catch (e) {
+    throw typeof e === "string" ? e : errorMessage(e);
+  }
+}
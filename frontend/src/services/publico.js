@@ -17,3 +17,63 @@ export async function crearTurnoPublico(payload) {
   const { data } = await api.post(`/publico/turnos`, payload);
   return data;
 }
+// Varios servicios seguidos ("corte + color"): servicios = [ids en orden]
+export async function disponibilidadCadena(emprendedor_id, { fecha, hasta, servicios }) {
+  const { data } = await api.get(`/publico/disponibilidad/${emprendedor_id}/cadena`, {
+    params: { fecha, hasta, servicios: servicios.join(",") },
+  });
+  return data;
+}
+export async function crearTurnosCadena(payload) {
+  const { data } = await api.post(`/publico/turnos/cadena`, payload);
+  return data;
+}
+// Lista de espera: devuelve {token, ...}; con una oferta vigente, reservar con
+// crearTurnoPublico({ ..., inicio: oferta.inicio, retencion: oferta.retencion })
+export async function anotarseEspera(payload) {
+  const { data } = await api.post(`/publico/espera`, payload);
+  return data;
+}
+export async function estadoEspera(token) {
+  const { data } = await api.get(`/publico/espera/${token}`);
+  return data;
+}
+export async function salirEspera(token) {
+  await api.delete(`/publico/espera/${token}`);
+}
+// Página de reserva en un pedido (GET /publico/bundle/{codigo}?stream=true): NDJSON
+// en dos líneas, ficha/servicios/horarios primero y la disponibilidad después.
+// onCabecera se llama con la primera línea apenas llega, así la ficha se dibuja
+// sin esperar el cálculo; la promesa resuelve con las dos líneas juntas.
+export async function bundlePublico(codigo, { onCabecera } = {}) {
+  const base = (api.defaults.baseURL || "").replace(/\/+$/, "");
+  const res = await fetch(`${base}/publico/bundle/${encodeURIComponent(codigo)}?stream=true`);
+  if (!res.ok) {
+    let data = null;
+    try { data = await res.json(); } catch {}
+    throw { response: { status: res.status, data } }; // misma forma que un error de axios
+  }
+  const out = {};
+  const agregar = (linea) => {
+    if (!linea.trim()) return;
+    const parte = JSON.parse(linea);
+    Object.assign(out, parte);
+    if (parte.perfil) onCabecera?.(parte);
+  };
+  if (!res.body?.getReader) {
+    (await res.text()).split("\n").forEach(agregar);
+    return out;
+  }
+  const reader = res.body.getReader();
+  const dec = new TextDecoder();
+  let buf = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += dec.decode(value, { stream: true });
+    let i;
+    while ((i = buf.indexOf("\n")) >= 0) { agregar(buf.slice(0, i)); buf = buf.slice(i + 1); }
+  }
+  agregar(buf + dec.decode());
+  return out;
+}
@@ -0,0 +1,23 @@
+// src/services/recursos.js
+// Recursos del dueño (sillas, boxes, profesionales): con N activos se atienden N turnos a la vez.
+import api from "./api";
+
+export async function listarRecursos() {
+  const { data } = await api.get("/recursos/mis");
+  return Array.isArray(data) ? data : [];
+}
+
+export async function crearRecurso({ nombre, activo = true }) {
+  const { data } = await api.post("/recursos", { nombre, activo });
+  return data;
+}
+
+export async function actualizarRecurso(id, { nombre, activo = true }) {
+  const { data } = await api.put(`/recursos/${id}`, { nombre, activo });
+  return data;
+}
+
+export async function eliminarRecurso(id) {
+  await api.delete(`/recursos/${id}`);
+  return true;
+}
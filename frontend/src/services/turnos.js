@@ -1,15 +1,52 @@
 // src/services/turnos.js
-import api from "./api";
+import api, { nuevaIdempotencyKey, postIdempotente } from "./api";
 
 /* ===== OWNER (panel) ===== */
 export async function listarTurnosOwner({ desde, hasta }) {
   const { data } = await api.get("/turnos/mis", { params: { desde, hasta } });
   return Array.isArray(data?.items) ? data.items : Array.isArray(data) ? data : [];
 }
-export async function crearTurnoOwner(payload) {
-  const { data } = await api.post("/turnos", payload);
+// Delta-sync: { cursor, reset, mas, cambios, borrados }. Aplicar borrados y después cambios.
+export async function cambiosTurnosOwner(since = 0, limite = 500) {
+  const { data } = await api.get("/turnos/mis/changes", { params: { since, limite } });
   return data;
 }
+// idemKey: una por intento de alta (reusarla si el usuario vuelve a confirmar lo mismo)
+export async function crearTurnoOwner(payload, idemKey = nuevaIdempotencyKey()) {
+  const { data } = await postIdempotente("/turnos", payload, idemKey);
+  return data;
+}
+// Lote: items = [{ servicio_id, inicio, cliente_nombre?, ... }]; modo "todo_o_nada" | "best_effort"
+export async function crearTurnosLoteOwner(items, modo = "todo_o_nada", idemKey = nuevaIdempotencyKey()) {
+  const { data } = await postIdempotente("/turnos/batch", { items, modo }, idemKey);
+  return data;
+}
+
+/* ===== Series recurrentes (dueño) ===== */
+export async function listarSeriesOwner() {
+  const { data } = await api.get("/turnos/series");
+  return Array.isArray(data) ? data : [];
+}
+export async function crearSerieOwner(payload) {
+  const { data } = await api.post("/turnos/series", payload);
+  return data;
+}
+// Cancela una sola ocurrencia (fecha "YYYY-MM-DD")
+export async function exceptuarOcurrencia(serieId, fecha) {
+  const { data } = await api.post(`/turnos/series/${serieId}/excepciones`, { fecha });
+  return data;
+}
+export async function borrarSerie(serieId, desde) {
+  const { data } = await api.delete(`/turnos/series/${serieId}`, { params: desde ? { desde } : undefined });
+  return data;
+}
+/* Cierre de un rango: cancela (o corre mover_min minutos) todos los turnos de [desde, hasta).
+   opciones: { mover_min, sin_lugar: "error"|"cancelar"|"dejar", cerrar_agenda, motivo } */
+export async function cerrarRango(desde, hasta, opciones = {}) {
+  const { data } = await api.post("/turnos/cerrar-rango", { desde, hasta, ...opciones });
+  return data;
+}
+
 export async function borrarTurno(id) {
   const { data } = await api.delete(`/turnos/${id}`);
   return data;
@@ -127,6 +127,16 @@ export async function uploadAvatar(file) {
   return r?.data ?? null;
 }
 
+/**
+ * Baja de cuenta (y del negocio, si tiene)
+ * DELETE /usuarios/me  → 204, o 202 { estado: "en_curso" } si se borra en segundo plano
+ */
+export async function borrarCuenta({ background = false } = {}) {
+  const r = await api.delete("/usuarios/me", { params: background ? { background: true } : undefined });
+  setSession(null, null);
+  return r?.status === 202 ? r.data : null;
+}
+
 /**
  * (Helper) ¿estoy autenticado?
  */
@@ -142,5 +152,6 @@ export default {
   updatePerfilSmart,
   logoutFront,
   uploadAvatar,
+  borrarCuenta,
   isLoggedIn,
 };